@@ -0,0 +1,142 @@
+'''
+Content-addressed store for rendered figure artifacts.
+
+A recorded scene is canonicalised and hashed; figures that draw exactly the
+same thing share one stored EPS/PNG, which is rendered once and then
+copied (reflinked where the filesystem supports it) to every output name
+that needs it. Outputs never share an inode with the store, so tools that
+later rewrite an output in place cannot change the stored artifact.
+'''
+
+import hashlib
+import os
+import secrets
+import shutil
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+# ioctl request cloning one file's extents into another (Btrfs, XFS)
+_FICLONE = 0x40049409
+
+def _number(value):
+    # Fixed precision so float noise from different drawing orders hashes alike
+    text = f"{value:.6f}"
+    return "0.000000" if text == "-0.000000" else text
+
+def canonical_digest(scene):
+    """
+    Hash the rendered content of a scene.
+
+    Covers the page size, world window, background and every drawn item
+    (kind, vertices, colors, width, circle, holes) in painting order. Items that
+    draw nothing are ignored.
+
+    Args:
+        scene: RecordingScreen or compatible scene
+
+    Returns:
+        str: Hex SHA-256 digest
+    """
+    digest = hashlib.sha256()
+    header = [scene.width, scene.height, *scene.world, *scene.background]
+    digest.update(" ".join(_number(v) for v in header).encode())
+    for item in scene.items:
+        if len(item.points) < 2:
+            continue
+        color = item.fill if item.kind == "polygon" else item.outline
+        parts = [item.kind, _number(item.width if item.kind == "line" else 0)]
+        parts.extend(_number(c) for c in color)
+        parts.extend(_number(v) for point in item.points for v in point)
+        if item.circle is not None:
+            # Full circles are written as arcs, so they differ from a polyline
+            parts.append("circle")
+            parts.extend(_number(v) for v in item.circle)
+        for hole in item.holes:
+            parts.append("hole")
+            parts.extend(_number(v) for point in hole.points for v in point)
+            if hole.circle is not None:
+                parts.append("circle")
+                parts.extend(_number(v) for v in hole.circle)
+        digest.update(b"\n" + " ".join(parts).encode())
+    return digest.hexdigest()
+
+class ArtifactStore:
+    """
+    Directory of artifacts named by content digest.
+
+    Args:
+        root (str): Store directory, created on demand
+        reflink (bool, optional): Clone stored artifacts into place where the
+            filesystem supports it, falling back to a plain copy. If False,
+            always copy
+    """
+
+    def __init__(self, root=".artifacts", reflink=True):
+        self.root = Path(root)
+        self.reflink = reflink
+        self.hits = 0
+        self.misses = 0
+
+    def path_for(self, key, suffix):
+        return self.root / f"{key}{suffix}"
+
+    def materialize(self, key, suffix, target, build):
+        """
+        Place the artifact for key at target, building it only if missing.
+
+        Args:
+            key (str): Content digest (plus any render settings)
+            suffix (str): File extension, e.g. '.eps'
+            target (str): Output path to create
+            build: Callable writing the artifact to the path it is given
+
+        Returns:
+            bool: True if an existing artifact was reused
+        """
+        stored = self.path_for(key, suffix)
+        reused = stored.exists()
+        if reused:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self.root.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.root / f".{key}.{secrets.token_hex(8)}{suffix}"
+            # Created like any other output, so the umask sets its permissions
+            os.close(os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666))
+            try:
+                build(tmp_path)
+                # Atomic, so concurrent workers building the same key are safe
+                os.replace(tmp_path, stored)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        self._place(stored, Path(target))
+        return reused
+
+    def _place(self, stored, target):
+        # Replace rather than truncate, in case target is still hard-linked to
+        # the store by an older version of this module
+        tmp_path = target.with_name(f".{target.name}.{secrets.token_hex(8)}.tmp")
+        try:
+            if not (self.reflink and _reflink(stored, tmp_path)):
+                shutil.copyfile(stored, tmp_path)
+            os.replace(tmp_path, target)
+        except BaseException:
+            if tmp_path.exists():
+                tmp_path.unlink()
+            raise
+
+def _reflink(source, target):
+    """Clone source into a new file at target; False if unsupported"""
+    if fcntl is None:
+        return False
+    with open(source, "rb") as src, open(target, "wb") as dst:
+        try:
+            fcntl.ioctl(dst.fileno(), _FICLONE, src.fileno())
+            return True
+        except OSError:
+            return False
@@ -0,0 +1,196 @@
+'''
+Contact sheets and sprite atlases built straight from the renderer.
+
+Figures are drawn with the headless backend and kept as display lists;
+no per-figure PNG is written. The sheet is laid out as a grid or as packed
+shelves, then each shelf is rasterized and streamed into one PNG encoder
+row by row, so at most one shelf of figures is in memory as pixels however
+large the sheet. A JSON index records where each figure sits.
+
+    python3 src/atlas.py --output gallery.png --dpi 72 --columns 6
+'''
+
+import argparse
+import json
+import os
+from pathlib import Path
+
+import make_figures
+import png_encoder
+import rasterizer
+
+class Placement:
+    """Position of one figure in the sheet, in pixels from the top left"""
+    __slots__ = ("name", "x", "y", "width", "height")
+
+    def __init__(self, name, x, y, width, height):
+        self.name = name
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+
+    def to_dict(self):
+        return {"x": self.x, "y": self.y, "width": self.width, "height": self.height}
+
+def grid_layout(sizes, columns=None, padding=8):
+    """
+    Lay figures out on a grid of equal cells, in the given order.
+
+    Args:
+        sizes (list): (name, width, height) per figure
+        columns (int, optional): Cells per row. Defaults to a square-ish grid
+        padding (int, optional): Pixels around and between cells
+
+    Returns:
+        tuple: (list of shelves, each a list of Placement; sheet width, height)
+    """
+    if columns is None:
+        columns = max(1, int(len(sizes) ** 0.5 + 0.999))
+    cell_width = max(width for _, width, _ in sizes)
+    cell_height = max(height for _, _, height in sizes)
+    shelves = []
+    for start in range(0, len(sizes), columns):
+        y = padding + len(shelves) * (cell_height + padding)
+        shelves.append([Placement(name, padding + i * (cell_width + padding), y, width, height)
+                        for i, (name, width, height) in enumerate(sizes[start:start + columns])])
+    sheet_width = padding + min(columns, len(sizes)) * (cell_width + padding)
+    sheet_height = padding + len(shelves) * (cell_height + padding)
+    return shelves, sheet_width, sheet_height
+
+def shelf_layout(sizes, max_width, padding=8):
+    """
+    Pack figures of mixed sizes into shelves (rows), tallest first.
+
+    Args:
+        sizes (list): (name, width, height) per figure
+        max_width (int): Sheet width to pack into
+        padding (int, optional): Pixels around and between figures
+
+    Returns:
+        tuple: (list of shelves, each a list of Placement; sheet width, height)
+    """
+    shelves = []
+    y = padding
+    shelf, x, shelf_height = [], padding, 0
+    for name, width, height in sorted(sizes, key=lambda size: (-size[2], -size[1])):
+        if padding + width + padding > max_width:
+            raise ValueError(f"{name} ({width} px) does not fit in a {max_width} px sheet")
+        if shelf and x + width + padding > max_width:
+            shelves.append(shelf)
+            y += shelf_height + padding
+            shelf, x, shelf_height = [], padding, 0
+        shelf.append(Placement(name, x, y, width, height))
+        x += width + padding
+        shelf_height = max(shelf_height, height)
+    if shelf:
+        shelves.append(shelf)
+        y += shelf_height + padding
+    sheet_width = max(p.x + p.width for shelf in shelves for p in shelf) + padding
+    return shelves, sheet_width, y
+
+def write_sheet(file, shelves, width, height, render, background=(255, 255, 255)):
+    """
+    Stream a laid-out sheet into a PNG file.
+
+    Args:
+        file: Binary file object
+        shelves (list): Shelves of Placement from a layout function
+        width (int): Sheet width in pixels
+        height (int): Sheet height in pixels
+        render: Callable name -> rasterizer.Raster, called one shelf at a time
+        background (tuple, optional): (r, g, b) bytes of the gaps
+    """
+    blank = bytes(background) * width
+    with png_encoder.PNGWriter(file, width, height) as writer:
+        y = 0
+        for shelf in shelves:
+            top = min(p.y for p in shelf)
+            bottom = max(p.y + p.height for p in shelf)
+            writer.write_rows(blank for _ in range(top - y))
+            rasters = [(p, render(p.name)) for p in shelf]
+            for row_y in range(top, bottom):
+                row = bytearray(blank)
+                for p, raster in rasters:
+                    if p.y <= row_y < p.y + p.height:
+                        row[p.x * 3:(p.x + p.width) * 3] = raster.rows[row_y - p.y]
+                writer.write_row(row)
+            y = bottom
+            # Drop this shelf's pixels before rendering the next one
+            del rasters
+        writer.write_rows(blank for _ in range(height - y))
+
+def build_atlas(output, names=None, dpi=72, layout="grid", columns=None, max_width=None,
+                padding=8, seed=0):
+    """
+    Draw figures and assemble them into one PNG plus a JSON index.
+
+    Figures are drawn once to record their geometry, without writing their
+    EPS files; pixels only exist for the shelf being written.
+
+    Args:
+        output (str): PNG path; the index goes next to it as .json
+        names (list, optional): Figure names from make_figures.FIGURES. Defaults to all
+        dpi (int, optional): Resolution of each figure. Defaults to 72
+        layout (str, optional): 'grid' (input order) or 'shelf' (packed)
+        columns (int, optional): Grid columns
+        max_width (int, optional): Shelf sheet width. Defaults to about
+            the width of a square grid
+        padding (int, optional): Gap in pixels. Defaults to 8
+        seed (int, optional): Seed for the random figures
+
+    Returns:
+        dict: The index written to the JSON file
+    """
+    names = list(make_figures.FIGURES) if names is None else names
+    output = Path(output)
+    scenes = {name: make_figures.capture_scene(name, seed, write=False) for name in names}
+
+    sizes = [(name, *rasterizer.pixel_size(scenes[name], dpi)) for name in names]
+    if layout == "shelf":
+        if max_width is None:
+            total = sum((width + padding) * (height + padding) for _, width, height in sizes)
+            max_width = max(int(total ** 0.5) + padding,
+                            max(width for _, width, _ in sizes) + 2 * padding)
+        shelves, width, height = shelf_layout(sizes, max_width, padding)
+    else:
+        shelves, width, height = grid_layout(sizes, columns, padding)
+
+    tmp_path = output.with_name(output.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        write_sheet(f, shelves, width, height,
+                    lambda name: rasterizer.render_scene(scenes[name], dpi))
+    os.replace(tmp_path, output)
+
+    index = {
+        "image": output.name,
+        "width": width,
+        "height": height,
+        "dpi": dpi,
+        "figures": {p.name: p.to_dict() for shelf in shelves for p in shelf},
+    }
+    with open(output.with_suffix(".json"), "w") as f:
+        json.dump(index, f, indent=1)
+    return index
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build a contact sheet of the figures")
+    parser.add_argument("figures", nargs="*", help="figure names (default: all)")
+    parser.add_argument("--output", default="atlas.png")
+    parser.add_argument("--dpi", type=int, default=72)
+    parser.add_argument("--layout", choices=["grid", "shelf"], default="grid")
+    parser.add_argument("--columns", type=int, default=None)
+    parser.add_argument("--max-width", type=int, default=None,
+                        help="sheet width for --layout shelf")
+    parser.add_argument("--padding", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=0, help="seed for the random figures")
+    args = parser.parse_args(argv)
+
+    index = build_atlas(args.output, args.figures or None, args.dpi, args.layout,
+                        args.columns, args.max_width, args.padding, args.seed)
+    print(f"{len(index['figures'])} figures -> {args.output} "
+          f"({index['width']}x{index['height']}) and {Path(args.output).with_suffix('.json')}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
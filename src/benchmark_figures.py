@@ -0,0 +1,198 @@
+'''
+Per-figure benchmark suite with JSON regression baselines.
+
+Times each figure's drawing, EPS export, rasterization and Ghostscript
+conversion as separate phases with warmup and repeats, records output sizes
+and primitive counts, and compares the medians against a saved baseline.
+Figures are drawn with the headless backend without switching the process's
+backend, and written into a temporary directory.
+
+    python3 src/benchmark_figures.py --save-baseline bench.json
+    python3 src/benchmark_figures.py --compare bench.json --threshold 0.25
+'''
+
+import argparse
+import importlib
+import json
+import math
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import eps_writer
+import make_figures
+import rasterizer
+
+converter = importlib.import_module("eps-to-png-converter")
+
+PHASES = ("generate", "export_eps", "rasterize", "convert_gs")
+
+def summarize(samples):
+    """Return median, p95, min and max of a list of timings in seconds"""
+    ordered = sorted(samples)
+    p95_index = max(0, math.ceil(0.95 * len(ordered)) - 1)
+    return {
+        "median": statistics.median(ordered),
+        "p95": ordered[p95_index],
+        "min": ordered[0],
+        "max": ordered[-1],
+        "runs": len(ordered),
+    }
+
+def time_call(func, repeats, warmup):
+    """Run func warmup + repeats times and summarize the timed runs"""
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return summarize(samples)
+
+def primitive_counts(scene):
+    """Count polygons, lines and vertices in a recorded scene"""
+    polygons = sum(1 for item in scene.items if item.kind == "polygon")
+    lines = sum(1 for item in scene.items if item.kind == "line")
+    circles = sum(1 for item in scene.items if item.circle is not None)
+    vertices = sum(len(item.points) for item in scene.items)
+    return {"polygons": polygons, "lines": lines, "circles": circles, "vertices": vertices}
+
+def benchmark_figure(name, examples_dir, work_dir, dpi, repeats, warmup, use_gs):
+    """
+    Benchmark one figure.
+
+    'generate' times drawing only, 'export_eps' turning the recorded scene
+    into EPS text, 'rasterize' the built-in rasterizer and 'convert_gs'
+    Ghostscript converting the EPS the figure writes into work_dir.
+
+    Returns:
+        dict: 'phases' (phase -> timing summary), 'sizes' and 'primitives'
+    """
+    scene = make_figures.capture_scene(name, 0, write=False)
+    phases = {
+        "generate": time_call(lambda: make_figures.capture_scene(name, 0, write=False),
+                              repeats, warmup),
+        "export_eps": time_call(lambda: eps_writer.render_eps(scene), repeats, warmup),
+        "rasterize": time_call(lambda: rasterizer.render_scene(scene, dpi).to_png(),
+                               repeats, warmup),
+    }
+    with make_figures.using_backend("headless"):
+        make_figures.run_figure(name, 0, output_dir=work_dir)
+    eps_path = Path(work_dir) / f"{name}.eps"
+    sizes = {
+        "generated_eps_bytes": eps_path.stat().st_size,
+        "rasterized_png_bytes": len(rasterizer.render_scene(scene, dpi).to_png()),
+    }
+
+    example_eps = Path(examples_dir) / f"{name}.eps"
+    if example_eps.exists():
+        sizes["example_eps_bytes"] = example_eps.stat().st_size
+    if use_gs:
+        png_path = Path(work_dir) / f"{name}-gs.png"
+        phases["convert_gs"] = time_call(
+            lambda: converter.convert_eps_to_png_result(eps_path, png_path, dpi),
+            repeats, warmup)
+        if png_path.exists():
+            sizes["gs_png_bytes"] = png_path.stat().st_size
+    return {"phases": phases, "sizes": sizes, "primitives": primitive_counts(scene)}
+
+def run_benchmarks(names=None, examples_dir="examples", dpi=150, repeats=5, warmup=1):
+    """
+    Benchmark figures and return a JSON-serialisable report.
+
+    Ghostscript timings are included only when gs is on PATH.
+    """
+    if names is None:
+        names = list(make_figures.FIGURES)
+    examples_dir = Path(examples_dir).resolve()
+    use_gs = shutil.which("gs") is not None
+    report = {
+        "dpi": dpi,
+        "repeats": repeats,
+        "warmup": warmup,
+        "python": sys.version.split()[0],
+        "ghostscript": use_gs,
+        "figures": {},
+    }
+    with tempfile.TemporaryDirectory() as work_dir:
+        for name in names:
+            report["figures"][name] = benchmark_figure(
+                name, examples_dir, work_dir, dpi, repeats, warmup, use_gs)
+    return report
+
+def compare_to_baseline(report, baseline, threshold=0.2, min_seconds=0.001):
+    """
+    Find phases whose median regressed past the threshold.
+
+    Args:
+        report (dict): Current run_benchmarks() report
+        baseline (dict): Saved report to compare against
+        threshold (float, optional): Allowed relative slowdown. Defaults to 0.2 (20%)
+        min_seconds (float, optional): Ignore phases faster than this in the
+            baseline, where timer noise dominates
+
+    Returns:
+        list: (figure, phase, baseline_median, current_median) regressions
+    """
+    regressions = []
+    for name, current in report["figures"].items():
+        before = baseline.get("figures", {}).get(name)
+        if before is None:
+            continue
+        for phase, timing in current["phases"].items():
+            old = before["phases"].get(phase)
+            if old is None or old["median"] < min_seconds:
+                continue
+            if timing["median"] > old["median"] * (1 + threshold):
+                regressions.append((name, phase, old["median"], timing["median"]))
+    return regressions
+
+def print_report(report):
+    print(f"{'figure':10s}" + "".join(f"{phase + ' med/p95 ms':>24s}" for phase in PHASES)
+          + f"{'vertices':>10s}")
+    for name, result in report["figures"].items():
+        cells = []
+        for phase in PHASES:
+            timing = result["phases"].get(phase)
+            cells.append(f"{timing['median'] * 1000:11.2f}/{timing['p95'] * 1000:<11.2f}"
+                         if timing else f"{'-':>23s} ")
+        print(f"{name:10s}" + " ".join(cells) + f"{result['primitives']['vertices']:>10d}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark figure generation and conversion")
+    parser.add_argument("figures", nargs="*", help="figure names (default: all)")
+    parser.add_argument("--examples", default="examples",
+                        help="directory of reference EPS files, for size comparison")
+    parser.add_argument("--dpi", type=int, default=150)
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--save-baseline", metavar="FILE", help="write the report as a JSON baseline")
+    parser.add_argument("--compare", metavar="FILE", help="fail on regressions against this baseline")
+    parser.add_argument("--threshold", type=float, default=0.2,
+                        help="allowed relative slowdown of a median (default: 0.2)")
+    args = parser.parse_args(argv)
+
+    report = run_benchmarks(args.figures or None, args.examples, args.dpi,
+                            args.repeats, args.warmup)
+    print_report(report)
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(report, f, indent=1)
+        print(f"Baseline written to {args.save_baseline}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare_to_baseline(report, baseline, args.threshold)
+        for name, phase, old, new in regressions:
+            print(f"REGRESSION {name} {phase}: {old * 1000:.2f} ms -> {new * 1000:.2f} ms")
+        if regressions:
+            return 1
+        print(f"No regressions beyond {args.threshold:.0%}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
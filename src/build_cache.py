@@ -0,0 +1,98 @@
+'''
+Content-hash build manifest used to skip figures and conversions whose
+inputs have not changed since the last run.
+'''
+
+import hashlib
+import json
+import os
+from pathlib import Path
+
+def hash_key(*parts):
+    """
+    Return a hex SHA-256 over an ordered list of key parts.
+
+    Args:
+        *parts: str, bytes or JSON-serialisable values
+    """
+    digest = hashlib.sha256()
+    for part in parts:
+        if isinstance(part, str):
+            part = part.encode()
+        elif not isinstance(part, bytes):
+            part = json.dumps(part, sort_keys=True, default=str).encode()
+        digest.update(len(part).to_bytes(8, "big"))
+        digest.update(part)
+    return digest.hexdigest()
+
+def file_digest(path):
+    """Return the SHA-256 hex digest of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+class BuildManifest:
+    """
+    JSON manifest mapping each output file to the key it was built from.
+
+    An output is fresh when its recorded key matches and the file on disk
+    still has the size and modification time recorded when it was built.
+
+    Args:
+        path (str): Manifest file location
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.entries = {}
+        if self.path.exists():
+            try:
+                with open(self.path) as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                # A corrupt manifest only costs a rebuild
+                self.entries = {}
+
+    @staticmethod
+    def _stamp(output):
+        stat = os.stat(output)
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def is_fresh(self, outputs, key):
+        """
+        Check whether outputs were built from key and are unchanged on disk.
+
+        Args:
+            outputs (list): Output paths produced together
+            key (str): Key of the current inputs; None is never fresh
+        """
+        if key is None:
+            return False
+        for output in outputs:
+            entry = self.entries.get(str(output))
+            if entry is None or entry.get("key") != key:
+                return False
+            try:
+                if entry.get("stamp") != self._stamp(output):
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def record(self, outputs, key):
+        """Remember that outputs were just built from key"""
+        for output in outputs:
+            self.entries[str(output)] = {"key": key, "stamp": self._stamp(output)}
+
+    def forget(self, outputs):
+        for output in outputs:
+            self.entries.pop(str(output), None)
+
+    def save(self):
+        """Write the manifest atomically"""
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
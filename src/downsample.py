@@ -0,0 +1,210 @@
+'''
+Area-average downsampling of 8-bit images (standard library only).
+
+Each output pixel is the mean of the source area it covers, with fractional
+weights at the edges, so any ratio (300 -> 72 DPI included) is resampled
+without aliasing. The weighted sums run on whole rows and columns at once:
+every byte of a row is spread into its own 32-bit field of one Python
+integer, so a multiply-add of two rows is a single big-integer operation.
+'''
+
+# Fixed-point weights sum to 1 << PRECISION
+PRECISION = 16
+_FIELD = 4
+
+def area_weights(src, dst):
+    """
+    Return fixed-point area weights for resampling src samples to dst.
+
+    Returns:
+        list: One (first source index, [weights]) pair per output sample;
+            each weight list sums to exactly 1 << PRECISION
+    """
+    ratio = src / dst
+    one = 1 << PRECISION
+    result = []
+    for i in range(dst):
+        start, end = i * ratio, min(src, (i + 1) * ratio)
+        first = int(start)
+        exact = []
+        j = first
+        while j < end:
+            exact.append((min(end, j + 1) - max(start, j)) / ratio * one)
+            j += 1
+        weights = [int(w) for w in exact]
+        # Hand the rounding remainder to the largest fractional parts
+        order = sorted(range(len(exact)), key=lambda k: weights[k] - exact[k])
+        for k in order[:one - sum(weights)]:
+            weights[k] += 1
+        result.append((first, weights))
+    return result
+
+def _spread(data):
+    """Integer with each byte of data in its own 32-bit field"""
+    buffer = bytearray(_FIELD * len(data))
+    buffer[_FIELD - 1::_FIELD] = data
+    return int.from_bytes(buffer, "big")
+
+def _rounding(length):
+    return int.from_bytes((1 << (PRECISION - 1)).to_bytes(_FIELD, "big") * length, "big")
+
+def _gather(total, length):
+    """Bytes of total's fields divided by 1 << PRECISION"""
+    # Sums stay below 1 << 24, so bits 16-23 of each field are the result
+    return total.to_bytes(_FIELD * length, "big")[_FIELD - 1 - PRECISION // 8::_FIELD]
+
+# Output rows resampled horizontally together, as columns of this many bytes
+BAND_ROWS = 256
+
+def downsample_rows(rows, width, height, new_width, new_height, channels=3):
+    """
+    Area-downsample an image given as rows, yielding the new rows in order.
+
+    Source rows are consumed as they are needed and dropped once no output
+    row uses them, so the full source image is never held in memory.
+
+    Args:
+        rows: Iterable of source row bytes (width * channels each)
+        width (int): Source width in pixels
+        height (int): Source height in pixels
+        new_width (int): Output width, at most width
+        new_height (int): Output height, at most height
+        channels (int, optional): Bytes per pixel. Defaults to 3 (RGB)
+
+    Yields:
+        bytes: Output rows of new_width * channels bytes
+    """
+    if new_width > width or new_height > height:
+        raise ValueError("downsample_rows() cannot enlarge an image")
+    rows = iter(rows)
+    row_bytes = width * channels
+    rounding = _rounding(row_bytes)
+    column_weights = area_weights(width, new_width)
+    cache = {}
+    next_row = 0
+    band = []
+    for first, weights in area_weights(height, new_height):
+        for index in list(cache):
+            if index < first:
+                del cache[index]
+        while next_row < first + len(weights):
+            cache[next_row] = _spread(next(rows))
+            next_row += 1
+        total = rounding
+        for offset, weight in enumerate(weights):
+            if weight:
+                total += weight * cache[first + offset]
+        band.append(_gather(total, row_bytes))
+        if len(band) == BAND_ROWS:
+            yield from _downsample_band(band, width, new_width, channels, column_weights)
+            band = []
+    if band:
+        yield from _downsample_band(band, width, new_width, channels, column_weights)
+
+def _downsample_band(band, width, new_width, channels, column_weights):
+    """Horizontal pass over a band of rows, one whole column per operation"""
+    count = len(band)
+    flat = b"".join(band)
+    stride = width * channels
+    rounding = _rounding(count)
+    out = bytearray(count * new_width * channels)
+    out_stride = new_width * channels
+    for channel in range(channels):
+        columns = [_spread(flat[x * channels + channel::stride]) for x in range(width)]
+        for i, (first, weights) in enumerate(column_weights):
+            total = rounding
+            for offset, weight in enumerate(weights):
+                if weight:
+                    total += weight * columns[first + offset]
+            out[i * channels + channel::out_stride] = _gather(total, count)
+    return [bytes(out[y * out_stride:(y + 1) * out_stride]) for y in range(count)]
+
+def downsample(pixels, width, height, new_width, new_height, channels=3):
+    """
+    Area-downsample a packed image.
+
+    Args:
+        pixels (bytes): Rows of width * channels bytes, top to bottom
+
+    Returns:
+        bytes: The packed new_width x new_height image
+    """
+    row_bytes = width * channels
+    rows = (pixels[y * row_bytes:(y + 1) * row_bytes] for y in range(height))
+    return b"".join(downsample_rows(rows, width, height, new_width, new_height, channels))
+
+def _read_header(f):
+    """Parse a P5/P6 header, leaving f at the first pixel byte"""
+    fields = []
+    while len(fields) < 4:
+        char = f.read(1)
+        if not char:
+            raise ValueError(f"{f.name}: truncated PNM header")
+        if char == b"#":
+            # Comments run to the end of the line
+            f.readline()
+            continue
+        if char.isspace():
+            continue
+        field = char
+        # The single whitespace after maxval is consumed here too
+        char = f.read(1)
+        while char and not char.isspace():
+            field += char
+            char = f.read(1)
+        fields.append(field)
+    magic, width, height, maxval = fields[0], int(fields[1]), int(fields[2]), int(fields[3])
+    if magic not in (b"P6", b"P5") or maxval != 255:
+        raise ValueError(f"{f.name}: unsupported PNM ({magic!r}, maxval {maxval})")
+    return width, height, 3 if magic == b"P6" else 1
+
+class PPMRows:
+    """
+    Rows of a binary PPM (P6) or PGM (P5) with 8-bit samples, read one at a time.
+
+    Only the header is read up front. Every iteration reads the file again,
+    so the rows can go to code that makes two passes over them, like
+    png_encoder.write_compact_png(), without the image being held in memory.
+
+    Args:
+        path (str): File to read
+
+    Attributes:
+        width, height, channels (int): Image size and bytes per pixel
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            self.width, self.height, self.channels = _read_header(f)
+            self._offset = f.tell()
+
+    def __len__(self):
+        return self.height
+
+    def __iter__(self):
+        row_bytes = self.width * self.channels
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            for _ in range(self.height):
+                row = f.read(row_bytes)
+                if len(row) != row_bytes:
+                    raise ValueError(f"{self.path}: truncated pixel data")
+                yield row
+
+def write_ppm(path, width, height, rows, channels=3):
+    """Write rows as a binary PPM (channels 3) or PGM (channels 1), one at a time"""
+    with open(path, "wb") as f:
+        f.write(b"P%d\n%d %d\n255\n" % (6 if channels == 3 else 5, width, height))
+        for row in rows:
+            f.write(row)
+
+def read_ppm(path):
+    """
+    Read a whole binary PPM (P6) or PGM (P5) with 8-bit samples.
+
+    Returns:
+        tuple: (width, height, channels, pixel bytes)
+    """
+    image = PPMRows(path)
+    return image.width, image.height, image.channels, b"".join(image)
@@ -1,7 +1,119 @@
+import argparse
+import asyncio
+import json
 import os
+import re
 import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
+import build_cache
+import downsample
+import png_encoder
+
+# ============= Render Profiles =============
+# Named bundles of Ghostscript rendering options; None leaves gs's default
+PROFILES = {
+    # Aliased, no image interpolation: quickest to look at
+    'fast-preview': {'text_alpha_bits': 1, 'graphics_alpha_bits': 1, 'interpolate': False},
+    # Anti-aliased, banded and multi-threaded for large prints
+    'print': {'text_alpha_bits': 4, 'graphics_alpha_bits': 4, 'rendering_threads': 'auto',
+              'max_memory': 64 << 20},
+    # Highest fidelity in one full-page buffer; the auto-tuner's reference
+    'archive': {'text_alpha_bits': 4, 'graphics_alpha_bits': 4, 'interpolate': True},
+}
+
+# Written by gs_tune.py; read by --profile
+PROFILE_FILE = 'gs-profiles.json'
+
+def profile_arguments(profile):
+    """
+    Return the gs arguments for a profile dict.
+    
+    Keys: text_alpha_bits and graphics_alpha_bits (1, 2 or 4),
+    rendering_threads (a count, or 'auto' for the CPU count), max_memory
+    (page buffer bytes before banding), band_height (rows per band) and
+    interpolate (True/False for -dDOINTERPOLATE/-dNOINTERPOLATE).
+    """
+    args = []
+    if profile.get('text_alpha_bits') is not None:
+        args.append(f"-dTextAlphaBits={profile['text_alpha_bits']}")
+    if profile.get('graphics_alpha_bits') is not None:
+        args.append(f"-dGraphicsAlphaBits={profile['graphics_alpha_bits']}")
+    threads = profile.get('rendering_threads')
+    if threads is not None:
+        if threads == 'auto':
+            threads = os.cpu_count() or 1
+        args.append(f'-dNumRenderingThreads={threads}')
+    if profile.get('max_memory') is not None:
+        args += [f"-dMaxBitmap={profile['max_memory']}", f"-dBufferSpace={profile['max_memory']}"]
+    if profile.get('band_height') is not None:
+        args.append(f"-dBandHeight={profile['band_height']}")
+    if profile.get('interpolate') is not None:
+        args.append('-dDOINTERPOLATE' if profile['interpolate'] else '-dNOINTERPOLATE')
+    return args
+
+def load_profiles(path=PROFILE_FILE):
+    """Return the built-in profiles updated with any saved in path"""
+    profiles = dict(PROFILES)
+    try:
+        with open(path) as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        return profiles
+    for name, entry in saved.items():
+        profiles[name] = entry['options']
+    return profiles
+
+def save_profile(name, options, path=PROFILE_FILE, stats=None):
+    """Add or replace one named profile in a profile file"""
+    try:
+        with open(path) as f:
+            saved = json.load(f)
+    except (OSError, ValueError):
+        saved = {}
+    saved[name] = {'options': options, 'stats': stats or {}}
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(saved, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+def build_gs_command(input_path, output_path, dpi=300, device='png16m', max_memory=None,
+                     profile=None):
+    """
+    Return the Ghostscript command line converting EPS input to PNG.
+    
+    Args:
+        input_path: One EPS path, or a list of paths rendered as consecutive pages
+        output_path (str): Output file, or a %d pattern when there are several inputs
+        dpi (int, optional): Resolution for output PNG. Defaults to 300
+        device (str, optional): Ghostscript output device. Defaults to 'png16m'
+        max_memory (int, optional): Page buffer cap in bytes. Larger pages are
+            rendered in bands from gs's display list and written out row by
+            row, so memory stays flat however large the output. Overrides
+            the profile's max_memory
+        profile (dict, optional): Rendering options (see profile_arguments())
+    """
+    if isinstance(input_path, (list, tuple)):
+        inputs = [str(path) for path in input_path]
+    else:
+        inputs = [str(input_path)]
+    if max_memory is not None:
+        profile = dict(profile or {}, max_memory=max_memory)
+    options = profile_arguments(profile) if profile else []
+    return [
+        'gs',  # ghostscript command
+        '-dSAFER',
+        '-dBATCH',
+        '-dNOPAUSE',
+        '-dEPSCrop',
+        f'-r{dpi}',
+        f'-sDEVICE={device}',
+        f'-sOutputFile={output_path}',
+    ] + options + inputs
+
 def convert_eps_to_png(input_path, output_path=None, dpi=300):
     """
     Convert an EPS file to PNG using Ghostscript.
@@ -28,17 +140,7 @@ def convert_eps_to_png(input_path, output_path=None, dpi=300):
     
     try:
         # Ghostscript command for conversion
-        gs_command = [
-            'gs',  # ghostscript command
-            '-dSAFER',
-            '-dBATCH',
-            '-dNOPAUSE',
-            '-dEPSCrop',
-            f'-r{dpi}',
-            '-sDEVICE=png16m',
-            f'-sOutputFile={output_path}',
-            input_path
-        ]
+        gs_command = build_gs_command(input_path, output_path, dpi)
         
         # Run the conversion
         subprocess.run(gs_command, check=True, capture_output=True)
@@ -85,10 +187,755 @@ def batch_convert_directory(input_dir, output_dir=None, dpi=300):
         output_path = output_dir / eps_file.with_suffix('.png').name
         convert_eps_to_png(eps_file, output_path, dpi)
 
+def convert_eps_to_png_result(input_path, output_path=None, dpi=300, max_memory=None,
+                              profile=None):
+    """
+    Convert an EPS file to PNG and describe the outcome instead of printing it.
+    
+    Args:
+        input_path (str): Path to input EPS file
+        output_path (str, optional): Path for output PNG file. If None, uses same name as input
+        dpi (int, optional): Resolution for output PNG. Defaults to 300
+        max_memory (int, optional): Render in bands above this many bytes (see build_gs_command())
+        profile (dict, optional): Rendering options (see profile_arguments())
+    
+    Returns:
+        dict: 'input', 'output', 'success', 'seconds', 'output_bytes' (None on
+            failure) and 'stderr' (Ghostscript's error output or exception text)
+    """
+    input_path = Path(input_path)
+    if output_path is None:
+        output_path = input_path.with_suffix('.png')
+    output_path = Path(output_path)
+    result = {
+        'input': str(input_path),
+        'output': str(output_path),
+        'success': False,
+        'seconds': 0.0,
+        'output_bytes': None,
+        'stderr': '',
+    }
+    
+    if not input_path.exists():
+        result['stderr'] = f"Input file {input_path} does not exist"
+        return result
+    
+    start = time.perf_counter()
+    try:
+        completed = subprocess.run(build_gs_command(input_path, output_path, dpi,
+                                                    max_memory=max_memory, profile=profile),
+                                   capture_output=True)
+        result['stderr'] = completed.stderr.decode(errors='replace')
+        result['success'] = completed.returncode == 0 and output_path.exists()
+    except Exception as e:
+        result['stderr'] = str(e)
+    result['seconds'] = time.perf_counter() - start
+    if result['success']:
+        result['output_bytes'] = output_path.stat().st_size
+    return result
+
+async def convert_eps_to_png_async(input_path, output_path=None, dpi=300, max_memory=None,
+                                   profile=None):
+    """
+    Convert an EPS file to PNG without blocking the event loop.
+    
+    The asyncio counterpart of convert_eps_to_png_result(), for pipelines that
+    keep several gs processes running while other work continues.
+    
+    Args:
+        input_path (str): Path to input EPS file
+        output_path (str, optional): Path for output PNG file. If None, uses same name as input
+        dpi (int, optional): Resolution for output PNG. Defaults to 300
+        max_memory (int, optional): Render in bands above this many bytes (see build_gs_command())
+        profile (dict, optional): Rendering options (see profile_arguments())
+    
+    Returns:
+        dict: Same keys as convert_eps_to_png_result()
+    """
+    input_path = Path(input_path)
+    if output_path is None:
+        output_path = input_path.with_suffix('.png')
+    output_path = Path(output_path)
+    result = {
+        'input': str(input_path),
+        'output': str(output_path),
+        'success': False,
+        'seconds': 0.0,
+        'output_bytes': None,
+        'stderr': '',
+    }
+    
+    if not input_path.exists():
+        result['stderr'] = f"Input file {input_path} does not exist"
+        return result
+    
+    start = time.perf_counter()
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *build_gs_command(input_path, output_path, dpi, max_memory=max_memory,
+                              profile=profile),
+            stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE)
+        _, stderr = await process.communicate()
+        result['stderr'] = stderr.decode(errors='replace')
+        result['success'] = process.returncode == 0 and output_path.exists()
+    except Exception as e:
+        result['stderr'] = str(e)
+    result['seconds'] = time.perf_counter() - start
+    if result['success']:
+        result['output_bytes'] = output_path.stat().st_size
+    return result
+
+def convert_eps_bytes(eps, dpi=300, device='png16m', profile=None):
+    """
+    Convert EPS held in memory, piping it through gs's stdin and stdout.
+    
+    No files are created, so it is safe to call from many threads at once;
+    each call runs its own gs process.
+    
+    Args:
+        eps (bytes or str): EPS document
+        dpi (int, optional): Resolution for output PNG. Defaults to 300
+        device (str, optional): Ghostscript output device. Defaults to 'png16m'
+        profile (dict, optional): Rendering options (see profile_arguments())
+    
+    Returns:
+        bytes: The rendered image
+    
+    Raises:
+        RuntimeError: If gs fails or produces no output
+    """
+    if isinstance(eps, str):
+        eps = eps.encode('latin-1')
+    command = build_gs_command('-', '-', dpi, device, profile=profile)
+    # -q keeps gs's banner and page messages out of the image on stdout
+    command.insert(1, '-q')
+    try:
+        completed = subprocess.run(command, input=eps, capture_output=True)
+    except OSError as e:
+        raise RuntimeError(f"gs failed: {e}") from e
+    if completed.returncode != 0 or not completed.stdout:
+        message = completed.stderr.decode(errors='replace').strip()
+        raise RuntimeError(f"gs failed: {message or 'no output'}")
+    return completed.stdout
+
+def concurrent_convert_directory(input_dir, output_dir=None, dpi=300, workers=None,
+                                 eps_files=None, max_memory=None, compact=False, profile=None):
+    """
+    Convert all EPS files in a directory with several Ghostscript processes at once.
+    
+    Args:
+        input_dir (str): Directory containing EPS files
+        output_dir (str, optional): Directory for output PNG files. If None, uses same directory as input
+        dpi (int, optional): Resolution for output PNGs. Defaults to 300
+        workers (int, optional): Maximum concurrent gs processes. Defaults to CPU count
+        eps_files (list, optional): Convert only these files instead of every *.eps in input_dir
+        max_memory (int, optional): Per-process page buffer cap in bytes (see build_gs_command())
+        compact (bool, optional): Write grayscale or indexed PNGs where the
+            colors fit (see convert_eps_to_compact_png())
+        profile (dict, optional): Rendering options (see profile_arguments())
+    
+    Returns:
+        list: convert_eps_to_png_result() dicts, sorted by input file name
+    """
+    input_dir = Path(input_dir)
+    output_dir = Path(output_dir) if output_dir is not None else input_dir
+    output_dir.mkdir(parents=True, exist_ok=True)
+    
+    # Sorted so results (and any logs built from them) are deterministic
+    if eps_files is None:
+        eps_files = input_dir.glob('*.eps')
+    eps_files = sorted(Path(eps) for eps in eps_files)
+    if workers is None:
+        workers = os.cpu_count() or 1
+    
+    convert = convert_eps_to_compact_png if compact else convert_eps_to_png_result
+    # Threads are enough: each one just waits on its own gs subprocess
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        return list(pool.map(
+            lambda eps_file: convert(
+                eps_file, output_dir / eps_file.with_suffix('.png').name, dpi, max_memory,
+                profile),
+            eps_files))
+
+# ============= Batched Ghostscript Sessions =============
+def _convert_in_session(eps_files, output_paths, dpi, max_memory=None, compact=False,
+                        profile=None):
+    """
+    Convert several EPS files with one gs process, one output page per file.
+    
+    Ghostscript stops at the first file that fails. Pages rendered before it
+    are kept, the failing file gets an error result, and a new session picks
+    up with the file after it, so one bad file never costs the whole batch.
+    With compact, gs writes raw pages that are encoded like
+    convert_eps_to_compact_png() does.
+    
+    Returns:
+        list: convert_eps_to_png_result()-style dicts, in input order
+    """
+    results = []
+    pending = list(zip(eps_files, output_paths))
+    while pending:
+        files = [eps for eps, _ in pending]
+        output_dir = Path(pending[0][1]).parent
+        output_dir.mkdir(parents=True, exist_ok=True)
+        with tempfile.TemporaryDirectory(dir=output_dir) as tmp_dir:
+            extension, device = ('ppm', 'ppmraw') if compact else ('png', 'png16m')
+            pattern = Path(tmp_dir) / f'page%06d.{extension}'
+            start = time.perf_counter()
+            try:
+                completed = subprocess.run(build_gs_command(files, pattern, dpi, device,
+                                                            max_memory, profile),
+                                           capture_output=True)
+                returncode = completed.returncode
+                stderr = completed.stderr.decode(errors='replace')
+            except Exception as e:
+                returncode, stderr = None, str(e)
+            elapsed = time.perf_counter() - start
+            pages = sorted(Path(tmp_dir).glob(f'page*.{extension}'))
+            
+            if returncode is None or (returncode == 0 and len(pages) != len(files)):
+                # gs never ran, or pages can't be matched to files (an EPS
+                # without showpage, say): fall back to one process per file
+                convert = convert_eps_to_compact_png if compact else convert_eps_to_png_result
+                results.extend(convert(eps, out, dpi, max_memory, profile)
+                               for eps, out in pending)
+                return results
+            
+            done = len(pages) if returncode == 0 else min(len(pages), len(files) - 1)
+            for page, (eps, out) in zip(pages[:done], pending[:done]):
+                result = {
+                    'input': str(eps),
+                    'output': str(out),
+                    'success': True,
+                    'seconds': elapsed / max(done, 1),
+                    'output_bytes': None,
+                    'stderr': '',
+                }
+                if compact:
+                    tmp_png = page.with_suffix('.png')
+                    try:
+                        result['color_type'] = encode_compact_png(page, tmp_png)
+                    except (OSError, ValueError) as e:
+                        result.update(success=False, stderr=str(e))
+                        results.append(result)
+                        continue
+                    page = tmp_png
+                os.replace(page, out)
+                result['output_bytes'] = Path(out).stat().st_size
+                results.append(result)
+            if returncode == 0:
+                return results
+            
+            # The file after the last complete page is the one gs choked on
+            eps, out = pending[done]
+            results.append({
+                'input': str(eps),
+                'output': str(out),
+                'success': False,
+                'seconds': elapsed,
+                'output_bytes': None,
+                'stderr': stderr,
+            })
+            pending = pending[done + 1:]
+    return results
+
+def session_convert_directory(input_dir, output_dir=None, dpi=300, sessions=None,
+                              eps_files=None, max_memory=None, compact=False, profile=None):
+    """
+    Convert all EPS files in a directory through a few long-lived gs sessions.
+    
+    Instead of paying interpreter startup and font initialisation per file,
+    the files are split into one contiguous chunk per session and each chunk
+    is rendered by a single gs process.
+    
+    Args:
+        input_dir (str): Directory containing EPS files
+        output_dir (str, optional): Directory for output PNG files. If None, uses same directory as input
+        dpi (int, optional): Resolution for output PNGs. Defaults to 300
+        sessions (int, optional): Number of concurrent gs processes. Defaults to CPU count
+        eps_files (list, optional): Convert only these files instead of every *.eps in input_dir
+        max_memory (int, optional): Per-session page buffer cap in bytes (see build_gs_command())
+        compact (bool, optional): Write grayscale or indexed PNGs where the
+            colors fit (see convert_eps_to_compact_png())
+        profile (dict, optional): Rendering options (see profile_arguments())
+    
+    Returns:
+        list: convert_eps_to_png_result()-style dicts, sorted by input file name
+    """
+    input_dir = Path(input_dir)
+    output_dir = Path(output_dir) if output_dir is not None else input_dir
+    output_dir.mkdir(parents=True, exist_ok=True)
+    
+    if eps_files is None:
+        eps_files = input_dir.glob('*.eps')
+    eps_files = sorted(Path(eps) for eps in eps_files)
+    if not eps_files:
+        return []
+    if sessions is None:
+        sessions = os.cpu_count() or 1
+    sessions = max(1, min(sessions, len(eps_files)))
+    
+    chunk_size = -(-len(eps_files) // sessions)
+    chunks = [eps_files[i:i + chunk_size] for i in range(0, len(eps_files), chunk_size)]
+    with ThreadPoolExecutor(max_workers=len(chunks)) as pool:
+        chunk_results = pool.map(
+            lambda chunk: _convert_in_session(
+                chunk, [output_dir / eps.with_suffix('.png').name for eps in chunk], dpi,
+                max_memory, compact, profile),
+            chunks)
+        return [result for results in chunk_results for result in results]
+
+# ============= Multi-Resolution Output =============
+VARIANT_NAME = '{stem}-{dpi}dpi.png'
+
+def variant_path(eps_file, output_dir, dpi):
+    """Output path of one resolution variant, e.g. figure5-150dpi.png"""
+    return Path(output_dir) / VARIANT_NAME.format(stem=Path(eps_file).stem, dpi=dpi)
+
+def convert_multi_resolution(input_path, output_dir=None, dpis=(72, 150, 300), max_memory=None,
+                             compact=False, profile=None):
+    """
+    Rasterize an EPS once at the highest DPI and derive the other sizes from it.
+    
+    Ghostscript renders a raw PPM at max(dpis); every smaller size is an area
+    average of that image (see downsample.py), so n sizes cost one gs run.
+    The render is streamed from disk a row at a time for each size and never
+    held in memory whole.
+    
+    Args:
+        input_path (str): Path to input EPS file
+        output_dir (str, optional): Directory for the PNGs. If None, uses the input's directory
+        dpis (tuple, optional): Resolutions to write. Defaults to (72, 150, 300)
+        max_memory (int, optional): Render in bands above this many bytes (see build_gs_command())
+        compact (bool, optional): Write each size as the smallest lossless PNG
+            type it fits (see write_rows_compact())
+        profile (dict, optional): Rendering options for the one gs render
+    
+    Returns:
+        dict: convert_eps_to_png_result()-style dict whose 'output' is the
+            list of written variants, plus 'gs_seconds'
+    """
+    input_path = Path(input_path)
+    output_dir = Path(output_dir) if output_dir is not None else input_path.parent
+    output_dir.mkdir(parents=True, exist_ok=True)
+    dpis = sorted(set(dpis), reverse=True)
+    outputs = [variant_path(input_path, output_dir, dpi) for dpi in dpis]
+    result = {
+        'input': str(input_path),
+        'output': [str(out) for out in outputs],
+        'success': False,
+        'seconds': 0.0,
+        'gs_seconds': 0.0,
+        'output_bytes': None,
+        'stderr': '',
+    }
+    if not input_path.exists():
+        result['stderr'] = f"Input file {input_path} does not exist"
+        return result
+    
+    start = time.perf_counter()
+    with tempfile.TemporaryDirectory(dir=output_dir) as tmp_dir:
+        ppm = Path(tmp_dir) / 'render.ppm'
+        try:
+            completed = subprocess.run(build_gs_command(input_path, ppm, dpis[0], 'ppmraw',
+                                                        max_memory, profile),
+                                       capture_output=True)
+            result['stderr'] = completed.stderr.decode(errors='replace')
+            ok = completed.returncode == 0 and ppm.exists()
+        except Exception as e:
+            result['stderr'] = str(e)
+            ok = False
+        result['gs_seconds'] = time.perf_counter() - start
+        if ok:
+            try:
+                image = downsample.PPMRows(ppm)
+                width, height, channels = image.width, image.height, image.channels
+                color_type = png_encoder.RGB if channels == 3 else png_encoder.GRAY
+                for dpi, out in zip(dpis, outputs):
+                    new_width = max(1, round(width * dpi / dpis[0]))
+                    new_height = max(1, round(height * dpi / dpis[0]))
+                    rows = image
+                    if (new_width, new_height) != (width, height):
+                        rows = downsample.downsample_rows(image, width, height, new_width,
+                                                          new_height, channels)
+                        if compact:
+                            # write_rows_compact() reads its rows twice: spool this size
+                            spool = Path(tmp_dir) / f'{dpi}dpi.ppm'
+                            downsample.write_ppm(spool, new_width, new_height, rows, channels)
+                            rows = downsample.PPMRows(spool)
+                    # Written under a temporary name so a failed run leaves no partial PNG
+                    tmp_png = Path(tmp_dir) / out.name
+                    if compact:
+                        with open(tmp_png, 'wb') as f:
+                            write_rows_compact(f, new_width, new_height, rows, channels)
+                    else:
+                        with open(tmp_png, 'wb') as f, png_encoder.PNGWriter(
+                                f, new_width, new_height, color_type) as writer:
+                            writer.write_rows(rows)
+                    os.replace(tmp_png, out)
+                result['success'] = True
+            except (OSError, ValueError) as e:
+                result['stderr'] += str(e)
+    result['seconds'] = time.perf_counter() - start
+    if result['success']:
+        result['output_bytes'] = sum(out.stat().st_size for out in outputs)
+    return result
+
+def multi_resolution_convert_directory(input_dir, output_dir=None, dpis=(72, 150, 300),
+                                       workers=None, max_memory=None, compact=False,
+                                       profile=None):
+    """
+    Write every requested size of every EPS file in a directory, one gs run per file.
+    
+    Args:
+        input_dir (str): Directory containing EPS files
+        output_dir (str, optional): Directory for output PNG files. If None, uses same directory as input
+        dpis (tuple, optional): Resolutions to write. Defaults to (72, 150, 300)
+        workers (int, optional): Files converted at once. Defaults to CPU count
+        max_memory (int, optional): Per-process page buffer cap in bytes (see build_gs_command())
+        compact (bool, optional): Write grayscale or indexed PNGs where the colors fit
+        profile (dict, optional): Rendering options (see profile_arguments())
+    
+    Returns:
+        list: convert_multi_resolution() dicts, sorted by input file name
+    """
+    input_dir = Path(input_dir)
+    output_dir = Path(output_dir) if output_dir is not None else input_dir
+    eps_files = sorted(input_dir.glob('*.eps'))
+    if workers is None:
+        workers = os.cpu_count() or 1
+    # Downsampling holds the GIL for part of each file; gs runs in parallel regardless
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        return list(pool.map(
+            lambda eps_file: convert_multi_resolution(eps_file, output_dir, dpis, max_memory,
+                                                      compact, profile),
+            eps_files))
+
+# ============= Indexed Output =============
+# "r g b setrgbcolor" / "v setgray", plus the short names of compact EPS
+_EPS_COLOR = re.compile(rb"(?<![\w.])([\d.]+) ([\d.]+) ([\d.]+) (?:setrgbcolor|rgb)\b"
+                        rb"|(?<![\w.])([\d.]+) (?:setgray|g)\b")
+
+def eps_colors(input_path):
+    """
+    Collect the colors an EPS file paints with, as (r, g, b) bytes.
+    
+    Ghostscript's png16m output is not anti-aliased, so for the figures these
+    (plus the white page) are the colors of the rendered pixels.
+    
+    Returns:
+        set: (r, g, b) tuples, including white for the page background
+    """
+    colors = {(255, 255, 255)}
+    data = Path(input_path).read_bytes()
+    for match in _EPS_COLOR.finditer(data):
+        if match.group(4) is not None:
+            values = [match.group(4)] * 3
+        else:
+            values = match.group(1, 2, 3)
+        colors.add(tuple(int(round(float(v) * 255)) for v in values))
+    return colors
+
+COLOR_TYPE_NAMES = {png_encoder.GRAY: 'gray', png_encoder.PALETTE: 'palette',
+                    png_encoder.RGB: 'rgb'}
+
+def write_rows_compact(file, width, height, rows, channels=3):
+    """
+    Write pixel rows as the smallest lossless PNG type; return its COLOR_TYPE_NAMES name.
+    
+    RGB rows are read twice (see png_encoder.write_compact_png()), so pass a
+    list or a downsample.PPMRows rather than an iterator.
+    """
+    if channels == 1:
+        with png_encoder.PNGWriter(file, width, height, png_encoder.GRAY) as writer:
+            writer.write_rows(rows)
+        return COLOR_TYPE_NAMES[png_encoder.GRAY]
+    return COLOR_TYPE_NAMES[png_encoder.write_compact_png(file, width, height, rows)]
+
+def encode_compact_png(ppm, png_path):
+    """Encode a raw gs render (ppmraw/pgmraw) with write_rows_compact(), streaming its rows"""
+    image = downsample.PPMRows(ppm)
+    with open(png_path, 'wb') as f:
+        return write_rows_compact(f, image.width, image.height, image, image.channels)
+
+def convert_eps_to_compact_png(input_path, output_path=None, dpi=300, max_memory=None,
+                               profile=None):
+    """
+    Convert an EPS file to a grayscale or indexed PNG when its colors allow.
+    
+    Files drawing with more than 256 colors go straight to png16m. Otherwise
+    gs renders raw pixels and png_encoder.write_compact_png() picks the
+    smallest lossless PNG type, checking that the indexed rows reproduce
+    every pixel; if the pixels hold more colors than predicted the file is
+    simply written as RGB.
+    
+    Args:
+        input_path (str): Path to input EPS file
+        output_path (str, optional): Path for output PNG file. If None, uses same name as input
+        dpi (int, optional): Resolution for output PNG. Defaults to 300
+        max_memory (int, optional): Render in bands above this many bytes (see build_gs_command())
+        profile (dict, optional): Rendering options (see profile_arguments()); anti-aliasing
+            adds blended colors, which usually means RGB output
+    
+    Returns:
+        dict: convert_eps_to_png_result() dict plus 'color_type'
+            ('gray', 'palette' or 'rgb')
+    """
+    input_path = Path(input_path)
+    if output_path is None:
+        output_path = input_path.with_suffix('.png')
+    output_path = Path(output_path)
+    try:
+        fits = len(eps_colors(input_path)) <= 256
+    except OSError:
+        fits = False
+    if not fits:
+        result = convert_eps_to_png_result(input_path, output_path, dpi, max_memory, profile)
+        result['color_type'] = 'rgb'
+        return result
+    
+    result = {
+        'input': str(input_path),
+        'output': str(output_path),
+        'success': False,
+        'seconds': 0.0,
+        'output_bytes': None,
+        'stderr': '',
+        'color_type': None,
+    }
+    start = time.perf_counter()
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    with tempfile.TemporaryDirectory(dir=output_path.parent) as tmp_dir:
+        ppm = Path(tmp_dir) / 'render.ppm'
+        try:
+            completed = subprocess.run(build_gs_command(input_path, ppm, dpi, 'ppmraw',
+                                                        max_memory, profile),
+                                       capture_output=True)
+            result['stderr'] = completed.stderr.decode(errors='replace')
+            ok = completed.returncode == 0 and ppm.exists()
+        except Exception as e:
+            result['stderr'] = str(e)
+            ok = False
+        if ok:
+            tmp_png = Path(tmp_dir) / output_path.name
+            try:
+                result['color_type'] = encode_compact_png(ppm, tmp_png)
+                os.replace(tmp_png, output_path)
+                result['success'] = True
+            except (OSError, ValueError) as e:
+                result['stderr'] += str(e)
+    result['seconds'] = time.perf_counter() - start
+    if result['success']:
+        result['output_bytes'] = output_path.stat().st_size
+    return result
+
+# ============= Incremental Conversion =============
+PNG_MANIFEST = '.png-manifest.json'
+
+def conversion_settings(dpi=300, max_memory=None, profile=None, compact=False):
+    """Return the gs command line (with placeholder paths) and PNG encoding of a conversion"""
+    device = 'ppmraw' if compact else 'png16m'
+    return {'gs': build_gs_command('<input>', '<output>', dpi, device, max_memory, profile),
+            'palette': compact}
+
+def conversion_key(eps_file, dpi=300, max_memory=None, profile=None, compact=False):
+    """Hash the EPS contents together with the settings that convert it"""
+    return build_cache.hash_key(build_cache.file_digest(eps_file),
+                                conversion_settings(dpi, max_memory, profile, compact))
+
+def incremental_convert_directory(input_dir, output_dir=None, dpi=300, workers=None,
+                                  engine='process', max_memory=None, compact=False,
+                                  profile=None):
+    """
+    Convert only the EPS files whose contents or conversion settings changed.
+    
+    Keys are stored in a manifest in the output directory; a PNG is skipped when
+    its key matches and the file on disk is the one recorded there.
+    
+    Args:
+        input_dir (str): Directory containing EPS files
+        output_dir (str, optional): Directory for output PNG files. If None, uses same directory as input
+        dpi (int, optional): Resolution for output PNGs. Defaults to 300
+        workers (int, optional): Concurrent gs processes. Defaults to CPU count
+        engine (str, optional): 'process' (one gs per file) or 'session' (batched)
+        max_memory (int, optional): Per-process page buffer cap in bytes (see build_gs_command())
+        compact (bool, optional): Write grayscale or indexed PNGs where the colors fit
+        profile (dict, optional): Rendering options (see profile_arguments())
+    
+    Returns:
+        list: Result dicts sorted by input name; skipped files have 'cached' True
+    """
+    input_dir = Path(input_dir)
+    output_dir = Path(output_dir) if output_dir is not None else input_dir
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest = build_cache.BuildManifest(output_dir / PNG_MANIFEST)
+    
+    eps_files = sorted(input_dir.glob('*.eps'))
+    keys = {eps: conversion_key(eps, dpi, max_memory, profile, compact) for eps in eps_files}
+    outputs = {eps: output_dir / eps.with_suffix('.png').name for eps in eps_files}
+    stale = [eps for eps in eps_files if not manifest.is_fresh([outputs[eps]], keys[eps])]
+    
+    if engine == 'session':
+        converted = session_convert_directory(input_dir, output_dir, dpi, workers, stale,
+                                              max_memory, compact, profile)
+    else:
+        converted = concurrent_convert_directory(input_dir, output_dir, dpi, workers, stale,
+                                                 max_memory, compact, profile)
+    
+    results = {}
+    for eps in eps_files:
+        output = outputs[eps]
+        results[str(eps)] = {
+            'input': str(eps),
+            'output': str(output),
+            'success': True,
+            'seconds': 0.0,
+            'output_bytes': output.stat().st_size if output.exists() else None,
+            'stderr': '',
+            'cached': True,
+        }
+    for result in converted:
+        result['cached'] = False
+        results[result['input']] = result
+        eps = Path(result['input'])
+        if result['success']:
+            manifest.record([outputs[eps]], keys[eps])
+        else:
+            manifest.forget([outputs[eps]])
+    manifest.save()
+    return [results[str(eps)] for eps in eps_files]
+
+def benchmark_engines(input_dir="examples", dpi=300, repeats=3):
+    """
+    Time one-process-per-file conversion against batched gs sessions.
+    
+    Both engines run serially (one worker) and in parallel (CPU count) on the
+    EPS files in input_dir; output goes to a temporary directory.
+    
+    Returns:
+        dict: Engine name -> best wall time in seconds over the repeats
+    """
+    engines = {
+        'per-file, serial': lambda out: concurrent_convert_directory(input_dir, out, dpi, workers=1),
+        'session, serial': lambda out: session_convert_directory(input_dir, out, dpi, sessions=1),
+        'per-file, parallel': lambda out: concurrent_convert_directory(input_dir, out, dpi),
+        'session, parallel': lambda out: session_convert_directory(input_dir, out, dpi),
+    }
+    count = len(list(Path(input_dir).glob('*.eps')))
+    timings = {}
+    for name, run in engines.items():
+        best = None
+        for _ in range(repeats):
+            with tempfile.TemporaryDirectory() as out:
+                start = time.perf_counter()
+                results = run(out)
+                elapsed = time.perf_counter() - start
+            if not all(r['success'] for r in results):
+                print(f"{name}: conversion failed, skipping")
+                break
+            best = elapsed if best is None else min(best, elapsed)
+        if best is not None:
+            timings[name] = best
+            print(f"{name:20s} {best:7.2f}s  ({best / max(count, 1) * 1000:.0f} ms/file, {count} files)")
+    return timings
+
+def main(argv=None):
+    """Command line entry point"""
+    parser = argparse.ArgumentParser(description="Convert EPS files to PNG with Ghostscript")
+    parser.add_argument("input_dir", nargs="?", default="examples")
+    parser.add_argument("--output-dir", help="directory for PNG files (default: input_dir)")
+    parser.add_argument("--dpi", type=int, default=300)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="concurrent gs processes (default: CPU count); 1 converts serially")
+    parser.add_argument("--engine", choices=["process", "session"], default="process",
+                        help="one gs process per file, or batched long-lived gs sessions")
+    parser.add_argument("--incremental", action="store_true",
+                        help=f"skip files whose PNG is up to date according to {PNG_MANIFEST}")
+    parser.add_argument("--sizes", type=int, nargs="+", metavar="DPI",
+                        help="write every listed DPI from one gs render at the largest "
+                             "(named figureN-<dpi>dpi.png)")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="compare the engines on input_dir instead of converting")
+    parser.add_argument("--max-memory", type=int, default=None, metavar="MB",
+                        help="cap each gs page buffer; larger pages render in bands "
+                             "(for poster-size DPI)")
+    parser.add_argument("--profile", default=None,
+                        help=f"gs render profile: {', '.join(PROFILES)} or one saved in "
+                             f"{PROFILE_FILE} by gs_tune.py")
+    parser.add_argument("--palette", action="store_true",
+                        help="write grayscale or 8-bit indexed PNGs when a figure's colors fit")
+    parser.add_argument("--watch", action="store_true",
+                        help="keep running and convert new or changed EPS files as they appear")
+    parser.add_argument("--settle", type=float, default=1.0,
+                        help="seconds a file must stay unchanged before --watch converts it")
+    parser.add_argument("--poll", action="store_true",
+                        help="make --watch poll the directory instead of using inotify")
+    args = parser.parse_args(argv)
+    
+    if args.benchmark:
+        benchmark_engines(args.input_dir, args.dpi)
+        return 0
+    
+    profile = None
+    if args.profile is not None:
+        profiles = load_profiles()
+        if args.profile not in profiles:
+            parser.error(f"unknown profile {args.profile!r}; expected one of {sorted(profiles)}")
+        profile = profiles[args.profile]
+    max_memory = args.max_memory << 20 if args.max_memory is not None else None
+    
+    if args.watch:
+        import eps_watch
+        
+        def report(r):
+            if r['success']:
+                print(f"{r['input']} -> {r['output']} ({r['output_bytes']} bytes, {r['seconds']:.2f}s)")
+            else:
+                print(f"Error converting {r['input']}: {r['stderr'].strip()}")
+        print(f"Watching {args.input_dir} (Ctrl+C to stop)")
+        eps_watch.watch_directory(args.input_dir, args.output_dir, args.dpi, args.workers,
+                                  args.settle, args.poll, on_result=report,
+                                  max_memory=max_memory, compact=args.palette,
+                                  profile=profile)
+        return 0
+    
+    if args.sizes:
+        results = multi_resolution_convert_directory(args.input_dir, args.output_dir,
+                                                     args.sizes, args.workers, max_memory,
+                                                     args.palette, profile)
+    elif args.incremental:
+        results = incremental_convert_directory(args.input_dir, args.output_dir, args.dpi,
+                                                args.workers, args.engine, max_memory,
+                                                args.palette, profile)
+    elif args.engine == "session":
+        results = session_convert_directory(args.input_dir, args.output_dir,
+                                            args.dpi, args.workers, max_memory=max_memory,
+                                            compact=args.palette, profile=profile)
+    elif args.workers == 1 and args.max_memory is None and not args.palette \
+            and args.profile is None:
+        batch_convert_directory(args.input_dir, args.output_dir, args.dpi)
+        return 0
+    else:
+        results = concurrent_convert_directory(args.input_dir, args.output_dir,
+                                               args.dpi, args.workers, max_memory=max_memory,
+                                               compact=args.palette, profile=profile)
+    failed = [r for r in results if not r['success']]
+    for r in results:
+        if r.get('cached'):
+            print(f"{r['input']}: up to date")
+        elif r['success']:
+            outputs = ', '.join(r['output']) if isinstance(r['output'], list) else r['output']
+            kind = f", {r['color_type']}" if r.get('color_type') else ''
+            print(f"{r['input']} -> {outputs} ({r['output_bytes']} bytes{kind}, {r['seconds']:.2f}s)")
+        else:
+            print(f"Error converting {r['input']}: {r['stderr'].strip()}")
+    print(f"Converted {len(results) - len(failed)} of {len(results)} EPS files")
+    return 1 if failed else 0
+
 # Example usage
 if __name__ == "__main__":
     # Convert a single file
     #convert_eps_to_png("nested_shapes.eps")
     
     # Convert all files in a directory
-    batch_convert_directory("examples")
+    raise SystemExit(main())
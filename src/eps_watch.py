@@ -0,0 +1,314 @@
+'''
+Watch mode for the EPS to PNG converter.
+
+Keeps an index of every EPS file in a directory (path, size, mtime and
+content hash as of its last conversion) and converts only files that are
+new or whose contents changed. Changes are noticed with inotify on Linux and
+by polling elsewhere. A file is converted once it has been quiet for a
+settle period with an unchanged size and mtime, so half-written files are
+skipped until the writer finishes. PNGs are written under a temporary name
+and renamed into place, so readers never see a partial image.
+
+    python3 src/eps-to-png-converter.py shared/ --watch --workers 4
+'''
+
+import ctypes
+import ctypes.util
+import importlib
+import json
+import os
+import select
+import struct
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import build_cache
+
+converter = importlib.import_module("eps-to-png-converter")
+
+WATCH_INDEX = '.watch-index.json'
+DEFAULT_SETTLE = 1.0
+
+# ============= Source Index =============
+def settings_key(options):
+    """Hash the conversion settings (converter.conversion_settings() arguments)"""
+    return build_cache.hash_key(converter.conversion_settings(**options))
+
+class SourceIndex:
+    """
+    JSON index of the EPS files as they were when last converted.
+
+    A file whose size and mtime match its entry is not read at all; one whose
+    stamp changed is hashed, and only a different hash (or different
+    conversion settings) means it has to be converted again.
+
+    Args:
+        path (str): Index file location
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.entries = {}
+        if self.path.exists():
+            try:
+                with open(self.path) as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                # A corrupt index only costs a reconversion
+                self.entries = {}
+
+    def needs_conversion(self, eps_file, stat, output, options):
+        """
+        Check whether eps_file differs from what was last converted.
+
+        Args:
+            options (dict): converter.conversion_key() keyword arguments
+
+        Returns:
+            str: The file's content key when it must be converted, else None
+        """
+        entry = self.entries.get(str(eps_file))
+        if entry is not None and entry["stamp"] == [stat.st_size, stat.st_mtime_ns] \
+                and entry.get("settings") == settings_key(options) and Path(output).exists():
+            return None
+        key = converter.conversion_key(eps_file, **options)
+        if entry is not None and entry["key"] == key and Path(output).exists():
+            # Touched or rewritten with the same bytes
+            entry["stamp"] = [stat.st_size, stat.st_mtime_ns]
+            return None
+        return key
+
+    def record(self, eps_file, stat, key, options):
+        self.entries[str(eps_file)] = {"stamp": [stat.st_size, stat.st_mtime_ns],
+                                       "key": key, "settings": settings_key(options)}
+
+    def forget(self, eps_file):
+        self.entries.pop(str(eps_file), None)
+
+    def save(self):
+        """Write the index atomically"""
+        tmp_path = self.path.with_name(self.path.name + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(self.entries, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+# ============= Change Sources =============
+# From <sys/inotify.h>
+IN_MODIFY = 0x002
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT = struct.Struct("iIII")
+
+class InotifyWatcher:
+    """Names of changed files in one directory, from Linux inotify"""
+
+    def __init__(self, directory):
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self._fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        mask = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+        if libc.inotify_add_watch(self._fd, os.fsencode(directory), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(errno, f"cannot watch {directory}")
+
+    def wait(self, timeout):
+        """Block up to timeout seconds; return the set of file names that changed"""
+        names = set()
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        while readable:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            offset = 0
+            while offset < len(data):
+                _, _, _, length = _EVENT.unpack_from(data, offset)
+                offset += _EVENT.size
+                name = data[offset:offset + length].rstrip(b"\0")
+                offset += length
+                if name:
+                    names.add(os.fsdecode(name))
+        return names
+
+    def close(self):
+        os.close(self._fd)
+
+class PollingWatcher:
+    """Names of changed files in one directory, by comparing directory scans"""
+
+    def __init__(self, directory, interval=1.0):
+        self.directory = Path(directory)
+        self.interval = interval
+        self._stamps = self._scan()
+
+    def _scan(self):
+        stamps = {}
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                stamps[entry.name] = (stat.st_size, stat.st_mtime_ns)
+        return stamps
+
+    def wait(self, timeout):
+        time.sleep(min(timeout, self.interval))
+        stamps = self._scan()
+        names = {name for name in stamps.keys() | self._stamps.keys()
+                 if stamps.get(name) != self._stamps.get(name)}
+        self._stamps = stamps
+        return names
+
+    def close(self):
+        pass
+
+def open_watcher(directory, polling=False, interval=1.0):
+    """Return an InotifyWatcher when the platform supports it, else a PollingWatcher"""
+    if not polling and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(directory)
+        except (OSError, AttributeError, TypeError):
+            # No usable libc inotify (e.g. musl without the symbols, or limits hit)
+            pass
+    return PollingWatcher(directory, interval)
+
+# ============= Watch Loop =============
+def convert_atomically(eps_file, output_path, dpi=300, max_memory=None, compact=False,
+                       profile=None):
+    """
+    Convert one EPS file, renaming the PNG into place only when gs succeeded.
+
+    Args:
+        max_memory (int, optional): Render in bands above this many bytes
+        compact (bool, optional): Write a grayscale or indexed PNG where the colors fit
+        profile (dict, optional): gs rendering options (see converter.profile_arguments())
+
+    Returns:
+        dict: convert_eps_to_png_result() dict, with 'output' the final path
+    """
+    output_path = Path(output_path)
+    tmp_path = output_path.with_name(f".{output_path.name}.{os.getpid()}.tmp")
+    convert = (converter.convert_eps_to_compact_png if compact
+               else converter.convert_eps_to_png_result)
+    result = convert(eps_file, tmp_path, dpi, max_memory, profile)
+    result['output'] = str(output_path)
+    if result['success']:
+        os.replace(tmp_path, output_path)
+    else:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+    return result
+
+def watch_directory(input_dir, output_dir=None, dpi=300, workers=None, settle=DEFAULT_SETTLE,
+                    polling=False, interval=1.0, once=False, on_result=None, max_memory=None,
+                    compact=False, profile=None):
+    """
+    Convert new and changed EPS files in a directory until interrupted.
+
+    Files already present are checked against the index on start-up, so
+    anything changed while the watcher was down is converted first.
+
+    Args:
+        input_dir (str): Directory to watch
+        output_dir (str, optional): Directory for PNGs. If None, uses input_dir
+        dpi (int, optional): PNG resolution. Defaults to 300
+        workers (int, optional): Concurrent gs processes. Defaults to CPU count
+        settle (float, optional): Seconds a file must stay unchanged before
+            it is converted. Defaults to 1
+        polling (bool, optional): Poll even where inotify is available
+        interval (float, optional): Seconds between polls
+        once (bool, optional): Convert what is pending, then return
+        on_result (callable, optional): Called with each conversion result dict
+        max_memory (int, optional): Per-process page buffer cap in bytes
+        compact (bool, optional): Write grayscale or indexed PNGs where the colors fit
+        profile (dict, optional): gs rendering options (see converter.profile_arguments())
+
+    Returns:
+        int: Number of files converted (only reached with once=True or on
+            KeyboardInterrupt)
+    """
+    input_dir = Path(input_dir)
+    output_dir = Path(output_dir) if output_dir is not None else input_dir
+    output_dir.mkdir(parents=True, exist_ok=True)
+    index = SourceIndex(output_dir / WATCH_INDEX)
+    options = {"dpi": dpi, "max_memory": max_memory, "profile": profile, "compact": compact}
+    watcher = open_watcher(input_dir, polling, interval)
+    # path -> ((size, mtime_ns) when last checked, time it last changed);
+    # files present at start-up count as settled
+    pending = {}
+    for eps in sorted(input_dir.glob('*.eps')):
+        try:
+            stat = eps.stat()
+        except OSError:
+            continue
+        pending[eps] = ((stat.st_size, stat.st_mtime_ns), time.monotonic() - settle)
+    running = {}
+    converted = 0
+
+    with ThreadPoolExecutor(max_workers=max(1, workers or os.cpu_count() or 1)) as pool:
+        try:
+            while True:
+                for eps, (stat, key, future) in list(running.items()):
+                    if not future.done():
+                        continue
+                    del running[eps]
+                    result = future.result()
+                    if result['success']:
+                        index.record(eps, stat, key, options)
+                        converted += 1
+                    else:
+                        index.forget(eps)
+                    index.save()
+                    if on_result is not None:
+                        on_result(result)
+
+                now = time.monotonic()
+                for eps, (stamp, changed_at) in list(pending.items()):
+                    if eps in running:
+                        # Checked again once the current conversion is done
+                        continue
+                    try:
+                        stat = eps.stat()
+                    except OSError:
+                        # Deleted or renamed away
+                        del pending[eps]
+                        index.forget(eps)
+                        continue
+                    if (stat.st_size, stat.st_mtime_ns) != stamp:
+                        # Still being written: restart the quiet period
+                        pending[eps] = ((stat.st_size, stat.st_mtime_ns), now)
+                        continue
+                    if now - changed_at < settle:
+                        continue
+                    del pending[eps]
+                    output = output_dir / eps.with_suffix('.png').name
+                    key = index.needs_conversion(eps, stat, output, options)
+                    if key is not None:
+                        running[eps] = (stat, key, pool.submit(convert_atomically, eps,
+                                                               output, **options))
+
+                if once and not pending and not running:
+                    return converted
+                timeout = min(settle / 2, interval) if pending or running else interval
+                for name in watcher.wait(timeout):
+                    eps = input_dir / name
+                    if eps.suffix == '.eps' and not name.startswith('.'):
+                        stamp = pending[eps][0] if eps in pending else None
+                        pending[eps] = (stamp, time.monotonic())
+        except KeyboardInterrupt:
+            return converted
+        finally:
+            watcher.close()
+            index.save()
@@ -0,0 +1,330 @@
+'''
+EPS writer for display lists recorded by headless_turtle.
+'''
+
+import math
+
+def _fmt(value):
+    """Format a coordinate compactly (3 decimals, trailing zeros dropped)"""
+    text = f"{value:.3f}".rstrip("0").rstrip(".")
+    return "0" if text in ("", "-0") else text
+
+def _color(rgb, colormode):
+    """Return the PostScript operator setting rgb in the given colormode"""
+    r, g, b = rgb
+    if colormode == "gray":
+        return f"{0.299 * r + 0.587 * g + 0.114 * b:.3f} setgray"
+    return f"{r:.3f} {g:.3f} {b:.3f} setrgbcolor"
+
+def page_transform(scene):
+    """
+    Return a function mapping world coordinates to page points.
+
+    One canvas pixel is one PostScript point, as with Tk's canvas.postscript().
+
+    Args:
+        scene: Object with width, height and world (llx, lly, urx, ury)
+    """
+    llx, lly, urx, ury = scene.world
+    sx = scene.width / (urx - llx)
+    sy = scene.height / (ury - lly)
+    return lambda x, y: ((x - llx) * sx, (y - lly) * sy)
+
+def _arc_path(item, scene, to_page):
+    """Return a full-circle arc subpath for a circle item, or None if not possible"""
+    llx, lly, urx, ury = scene.world
+    sx = scene.width / (urx - llx)
+    sy = scene.height / (ury - lly)
+    if item.circle is None or abs(sx - sy) > 1e-9 * max(sx, sy):
+        return None
+    cx, cy, radius = item.circle
+    x, y = to_page(cx, cy)
+    r = radius * sx
+    # Explicit moveto so the arc never joins a previous subpath with a line
+    return [f"{_fmt(x + r)} {_fmt(y)} moveto {_fmt(x)} {_fmt(y)} {_fmt(r)} 0 360 arc"]
+
+def _path(points, to_page):
+    x, y = to_page(*points[0])
+    ops = [f"{_fmt(x)} {_fmt(y)} moveto"]
+    for point in points[1:]:
+        x, y = to_page(*point)
+        ops.append(f"{_fmt(x)} {_fmt(y)} lineto")
+    return ops
+
+def render_eps(scene, colormode="color", arcs=True):
+    """
+    Render a scene's display list as EPS text.
+
+    Args:
+        scene: RecordingScreen or any object with width, height, world,
+            background and items
+        colormode (str, optional): 'color' or 'gray'. Defaults to 'color'
+        arcs (bool, optional): Emit full turtle circles as one PostScript arc
+            instead of their polyline. Defaults to True
+
+    Returns:
+        str: The EPS document
+    """
+    width, height = scene.width, scene.height
+    to_page = page_transform(scene)
+    lines = [
+        "%!PS-Adobe-3.0 EPSF-3.0",
+        "%%Creator: turtle-patterns headless_turtle",
+        f"%%BoundingBox: 0 0 {int(width)} {int(height)}",
+        "%%Pages: 1",
+        "%%EndComments",
+        "%%Page: 1 1",
+        "save",
+        "1 setlinecap 1 setlinejoin",
+        f"0 0 moveto {_fmt(width)} 0 lineto {_fmt(width)} {_fmt(height)} lineto "
+        f"0 {_fmt(height)} lineto closepath {_color(scene.background, colormode)} fill",
+    ]
+    for item in scene.items:
+        if len(item.points) < 2:
+            continue
+        arc = _arc_path(item, scene, to_page) if arcs else None
+        lines.append("newpath")
+        lines.extend(arc or _path(item.points, to_page))
+        if item.kind == "polygon":
+            for hole in item.holes:
+                hole_arc = _arc_path(hole, scene, to_page) if arcs else None
+                lines.append("closepath")
+                lines.extend(hole_arc or _path(hole.points, to_page))
+            lines.append(f"closepath {_color(item.fill, colormode)} eofill")
+        else:
+            if arc:
+                lines.append("closepath")
+            lines.append(f"{_fmt(item.width)} setlinewidth "
+                         f"{_color(item.outline, colormode)} stroke")
+    lines.extend(["restore showpage", "%%EOF", ""])
+    return "\n".join(lines)
+
+# ============= Compact EPS =============
+# Short operator names, and I: '/Shape scale angle tx ty I' builds the path of
+# a shared shape procedure under a transform and restores the CTM, so the
+# following fill or stroke (and its line width) is unaffected
+COMPACT_PROLOGUE = [
+    "/m /moveto load def /l /lineto load def /cp /closepath load def",
+    "/np /newpath load def /f /eofill load def /s /stroke load def",
+    "/rgb /setrgbcolor load def /g /setgray load def /w /setlinewidth load def",
+    "/a { 0 360 arc } bind def",
+    "/I { matrix currentmatrix 6 1 roll translate rotate dup scale load exec setmatrix } bind def",
+]
+
+def coordinate_decimals(dpi, tolerance=0.1):
+    """
+    Decimals needed so rounding moves a point by under tolerance pixels.
+
+    Args:
+        dpi (int): Resolution the EPS will be rasterized at
+        tolerance (float, optional): Allowed error in pixels. Defaults to 0.1
+    """
+    return _decimals(72.0 / dpi * tolerance)
+
+def _decimals(step):
+    """Fewest decimals whose last digit is at most step"""
+    return max(0, math.ceil(-math.log10(step)))
+
+def _num(value, decimals):
+    text = f"{value:.{decimals}f}"
+    if "." in text:
+        text = text.rstrip("0").rstrip(".")
+    return "0" if text in ("", "-0") else text
+
+def _shape_frame(points):
+    """
+    Return (origin, angle, length, local points) normalising a page-space
+    polyline so its first vertex is at (0, 0) and its first edge along +x
+    with unit length, or None if all vertices coincide.
+    """
+    x0, y0 = points[0]
+    for x, y in points[1:]:
+        length = math.hypot(x - x0, y - y0)
+        if length > 1e-6:
+            break
+    else:
+        return None
+    angle = math.atan2(y - y0, x - x0)
+    cos, sin = math.cos(angle) / length, math.sin(angle) / length
+    local = [((px - x0) * cos + (py - y0) * sin, (py - y0) * cos - (px - x0) * sin)
+             for px, py in points]
+    return (x0, y0), angle, length, local
+
+class _CompactWriter:
+    """State for render_compact_eps(): current color and line width, shape table"""
+
+    def __init__(self, scene, colormode, decimals):
+        self.colormode = colormode
+        self.decimals = decimals
+        self.tolerance = 10.0 ** -decimals
+        self.to_page = page_transform(scene)
+        self.color = None
+        self.width = None
+        self.lines = []
+
+    def num(self, value):
+        return _num(value, self.decimals)
+
+    def set_color(self, rgb):
+        if rgb == self.color:
+            return
+        self.color = rgb
+        r, gr, b = rgb
+        if self.colormode == "gray":
+            self.lines.append(f"{_num(0.299 * r + 0.587 * gr + 0.114 * b, 3)} g")
+        else:
+            self.lines.append(f"{_num(r, 3)} {_num(gr, 3)} {_num(b, 3)} rgb")
+
+    def set_width(self, width):
+        if width != self.width:
+            self.width = width
+            self.lines.append(f"{self.num(width)} w")
+
+    def path(self, points, decimals=None):
+        decimals = self.decimals if decimals is None else decimals
+        ops = []
+        for i, (x, y) in enumerate(points):
+            ops.append(f"{_num(x, decimals)} {_num(y, decimals)} {'l' if i else 'm'}")
+        return " ".join(ops)
+
+    def arc(self, circle, sx):
+        cx, cy, radius = circle
+        x, y = self.to_page(cx, cy)
+        r = radius * sx
+        return f"{self.num(x + r)} {self.num(y)} m {self.num(x)} {self.num(y)} {self.num(r)} a"
+
+def shared_shapes(items, to_page):
+    """
+    Group plain polylines that are the same shape under translate, rotate
+    and uniform scale.
+
+    Args:
+        items (list): Display items
+        to_page: Function mapping world coordinates to output coordinates
+
+    Returns:
+        dict: item index -> (shape number, frame) for shapes used twice or more,
+            and list of (local points, largest length, largest local radius)
+    """
+    groups = {}
+    frames = {}
+    for index, item in enumerate(items):
+        if item.circle is not None or item.holes or len(item.points) < 3:
+            continue
+        frame = _shape_frame([to_page(x, y) for x, y in item.points])
+        if frame is None:
+            continue
+        key = tuple(round(v, 6) for point in frame[3] for v in point)
+        groups.setdefault(key, []).append(index)
+        frames[index] = frame
+    instances, shapes = {}, []
+    for indices in groups.values():
+        if len(indices) < 2:
+            continue
+        local = frames[indices[0]][3]
+        longest = max(frames[i][2] for i in indices)
+        radius = max(math.hypot(x, y) for x, y in local)
+        for i in indices:
+            instances[i] = (len(shapes), frames[i])
+        shapes.append((local, longest, radius))
+    return instances, shapes
+
+def render_compact_eps(scene, colormode="color", dpi=300):
+    """
+    Render a scene as compact EPS for a target resolution.
+
+    Polylines repeated under translate/rotate/scale (rotating squares, moving
+    hexagons, a fill and its outline) are defined once as procedures and drawn
+    by transforming them. Operators get short names, colors and line widths
+    are only set when they change, and every number is rounded to the
+    precision dpi needs (see coordinate_decimals()).
+
+    Args:
+        scene: RecordingScreen or compatible scene object
+        colormode (str, optional): 'color' or 'gray'. Defaults to 'color'
+        dpi (int, optional): Resolution the EPS is meant for. Defaults to 300
+
+    Returns:
+        str: The EPS document
+    """
+    width, height = scene.width, scene.height
+    llx, lly, urx, ury = scene.world
+    sx = width / (urx - llx)
+    uniform = abs(sx - height / (ury - lly)) <= 1e-9 * sx
+    out = _CompactWriter(scene, colormode, coordinate_decimals(dpi))
+    items = [item for item in scene.items if len(item.points) >= 2]
+    instances, shapes = shared_shapes(items, out.to_page)
+
+    lines = [
+        "%!PS-Adobe-3.0 EPSF-3.0",
+        "%%Creator: turtle-patterns headless_turtle",
+        f"%%BoundingBox: 0 0 {int(width)} {int(height)}",
+        "%%Pages: 1",
+        "%%EndComments",
+        "%%Page: 1 1",
+        "save",
+        f"{len(shapes) + 16} dict begin",
+        *COMPACT_PROLOGUE,
+    ]
+    # Shape procedures keep enough digits for their largest instance
+    for number, (local, longest, radius) in enumerate(shapes):
+        decimals = _decimals(out.tolerance / longest)
+        lines.append(f"/S{number} {{ {out.path(local, decimals)} }} bind def")
+    lines.append("1 setlinecap 1 setlinejoin")
+    out.lines = lines
+    out.set_color(scene.background)
+    lines.append(f"0 0 {out.num(width)} {out.num(height)} rectfill")
+
+    for index, item in enumerate(items):
+        arc = item.circle is not None and uniform
+        if index in instances:
+            number, ((x0, y0), angle, length, _) = instances[index]
+            local_radius = shapes[number][2]
+            angle_decimals = _decimals(math.degrees(out.tolerance / (length * local_radius)))
+            scale_decimals = _decimals(out.tolerance / local_radius)
+            path = (f"/S{number} {_num(length, scale_decimals)} "
+                    f"{_num(math.degrees(angle), angle_decimals)} "
+                    f"{out.num(x0)} {out.num(y0)} I")
+        elif arc:
+            path = out.arc(item.circle, sx)
+        else:
+            path = out.path([out.to_page(x, y) for x, y in item.points])
+        if item.kind == "polygon":
+            for hole in item.holes:
+                if hole.circle is not None and uniform:
+                    path += " cp " + out.arc(hole.circle, sx)
+                else:
+                    path += " cp " + out.path([out.to_page(x, y) for x, y in hole.points])
+            out.set_color(item.fill)
+            lines.append(f"np {path} cp f")
+        else:
+            out.set_color(item.outline)
+            out.set_width(item.width)
+            lines.append(f"np {path}{' cp' if arc else ''} s")
+    lines.extend(["end", "restore showpage", "%%EOF", ""])
+    return "\n".join(lines)
+
+def write_eps(scene, file=None, colormode="color", arcs=True, dpi=None):
+    """
+    Write a scene as EPS, mirroring Tk's canvas.postscript() return convention.
+
+    Args:
+        scene: RecordingScreen or compatible scene object
+        file (str, optional): Output path. If None, nothing is written
+        colormode (str, optional): 'color' or 'gray'. Defaults to 'color'
+        arcs (bool, optional): Emit full circles as PostScript arcs
+        dpi (int, optional): Write the compact form (render_compact_eps())
+            rounded for this resolution instead
+
+    Returns:
+        str: The EPS text when file is None, otherwise an empty string
+    """
+    if dpi is not None:
+        text = render_compact_eps(scene, colormode, dpi)
+    else:
+        text = render_eps(scene, colormode, arcs)
+    if file is None:
+        return text
+    with open(file, "w") as f:
+        f.write(text)
+    return ""
@@ -0,0 +1,261 @@
+'''
+Opt-in instrumentation of turtle primitives and export steps per figure.
+
+Wraps the turtle returned by make_figures.setup_turtle() and the canvas from
+setup_screen() so every primitive call (goto, forward, circle, begin_fill,
+end_fill, fillcolor, ...) is counted and timed along with the postscript
+export and the PNG conversion. Produces a JSON profile and a folded-stack
+file that flamegraph.pl / speedscope can read.
+
+    python3 src/figure_profiler.py figure5 --json profile.json --folded profile.folded
+'''
+
+import argparse
+import importlib
+import json
+import os
+import sys
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from pathlib import Path
+
+import make_figures
+
+# Turtle methods timed by default; anything else is passed through untouched
+PRIMITIVES = (
+    "goto", "setpos", "setposition", "forward", "fd", "back", "backward", "right",
+    "left", "setheading", "seth", "circle", "penup", "pendown", "begin_fill",
+    "end_fill", "fillcolor", "pencolor", "color", "width", "pensize", "speed",
+    "hideturtle", "home",
+)
+
+class FigureProfiler:
+    """Accumulates call counts, timings and caller stacks for one figure"""
+
+    def __init__(self, figure):
+        self.figure = figure
+        self.primitives = defaultdict(lambda: {"count": 0, "seconds": 0.0})
+        self.phases = defaultdict(lambda: {"count": 0, "seconds": 0.0})
+        self.stacks = defaultdict(float)
+        self.total_seconds = 0.0
+
+    def _caller_stack(self):
+        """Names of the make_figures functions on the current call stack"""
+        names = []
+        frame = sys._getframe(2)
+        source = make_figures.__file__
+        while frame is not None:
+            if frame.f_code.co_filename == source:
+                names.append(frame.f_code.co_name)
+            frame = frame.f_back
+        names.reverse()
+        return names
+
+    def record(self, table, name, seconds, stack):
+        entry = table[name]
+        entry["count"] += 1
+        entry["seconds"] += seconds
+        self.stacks[";".join([self.figure] + stack + [name])] += seconds
+
+    @contextmanager
+    def phase(self, name):
+        """Time a non-turtle step such as 'postscript' or 'convert_gs'"""
+        stack = self._caller_stack()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(self.phases, name, time.perf_counter() - start, stack)
+
+    def wrap_turtle(self, t):
+        return InstrumentedTurtle(t, self)
+
+    def wrap_screen(self, screen):
+        return InstrumentedScreen(screen, self)
+
+    def report(self):
+        """Return the profile as a JSON-serialisable dict"""
+        measured = sum(e["seconds"] for e in self.primitives.values())
+        measured += sum(e["seconds"] for e in self.phases.values())
+        return {
+            "figure": self.figure,
+            "total_seconds": self.total_seconds,
+            "unattributed_seconds": max(0.0, self.total_seconds - measured),
+            "primitives": dict(sorted(self.primitives.items(),
+                                      key=lambda kv: -kv[1]["seconds"])),
+            "phases": dict(self.phases),
+        }
+
+    def folded_stacks(self):
+        """
+        Return folded stack lines ('frame;frame;leaf microseconds').
+
+        Time not spent in a recorded primitive or phase is attributed to the
+        figure function itself.
+        """
+        lines = [f"{stack} {int(round(seconds * 1e6))}"
+                 for stack, seconds in sorted(self.stacks.items())]
+        rest = self.total_seconds - sum(self.stacks.values())
+        if rest > 0:
+            create = make_figures.FIGURES[self.figure].__name__
+            lines.append(f"{self.figure};run_figure;{create} {int(round(rest * 1e6))}")
+        return lines
+
+class InstrumentedTurtle:
+    """Proxy timing the drawing primitives of a wrapped turtle"""
+
+    def __init__(self, t, profiler):
+        self._turtle = t
+        self._profiler = profiler
+
+    def __getattr__(self, name):
+        attr = getattr(self._turtle, name)
+        if name not in PRIMITIVES or not callable(attr):
+            return attr
+        profiler = self._profiler
+
+        def timed(*args, **kwargs):
+            stack = profiler._caller_stack()
+            start = time.perf_counter()
+            try:
+                return attr(*args, **kwargs)
+            finally:
+                profiler.record(profiler.primitives, name, time.perf_counter() - start, stack)
+        return timed
+
+class InstrumentedCanvas:
+    """Proxy timing canvas.postscript()"""
+
+    def __init__(self, canvas, profiler):
+        self._canvas = canvas
+        self._profiler = profiler
+
+    def postscript(self, *args, **kwargs):
+        with self._profiler.phase("postscript"):
+            return self._canvas.postscript(*args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._canvas, name)
+
+class InstrumentedScreen:
+    """Proxy returning an InstrumentedCanvas from getcanvas()"""
+
+    def __init__(self, screen, profiler):
+        self._screen = screen
+        self._profiler = profiler
+
+    def getcanvas(self):
+        return InstrumentedCanvas(self._screen.getcanvas(), self._profiler)
+
+    def __getattr__(self, name):
+        return getattr(self._screen, name)
+
+def profile_figure(name, convert=None, dpi=300, seed=0):
+    """
+    Draw one figure with instrumentation and optionally convert it to PNG.
+
+    Args:
+        name (str): Figure name from make_figures.FIGURES
+        convert (str, optional): 'gs' to time convert_eps_to_png_result() on the
+            EPS, 'raster' to time the built-in rasterizer (headless backend)
+        dpi (int, optional): Conversion resolution. Defaults to 300
+        seed (int, optional): Seed for the random figures
+
+    Returns:
+        FigureProfiler: The filled-in profiler
+
+    Raises:
+        ValueError: For convert='raster' on a backend other than headless
+    """
+    if convert == "raster" and make_figures.turtle.__name__ != make_figures.BACKENDS["headless"]:
+        raise ValueError("convert='raster' needs the headless backend")
+    profiler = FigureProfiler(name)
+    captured = {}
+
+    def setup_screen(*args, **kwargs):
+        with profiler.phase("setup_screen"):
+            screen = original_setup_screen(*args, **kwargs)
+        return profiler.wrap_screen(screen)
+
+    def setup_turtle(*args, **kwargs):
+        with profiler.phase("setup_turtle"):
+            t = original_setup_turtle(*args, **kwargs)
+        return profiler.wrap_turtle(t)
+
+    # create_* functions look these helpers up as globals at call time. The
+    # drawing lock keeps other threads from drawing through the wrappers
+    with make_figures._lock:
+        original_setup_screen = make_figures.setup_screen
+        original_setup_turtle = make_figures.setup_turtle
+        exporter = None
+        if convert == "raster":
+            exporter = make_figures.turtle.add_exporter(
+                lambda scene, eps_file: captured.__setitem__("scene", scene.snapshot()))
+        make_figures.setup_screen = setup_screen
+        make_figures.setup_turtle = setup_turtle
+        start = time.perf_counter()
+        try:
+            make_figures.run_figure(name, seed)
+        finally:
+            make_figures.setup_screen = original_setup_screen
+            make_figures.setup_turtle = original_setup_turtle
+            if exporter is not None:
+                make_figures.turtle.remove_exporter(exporter)
+
+    if convert == "gs":
+        converter = importlib.import_module("eps-to-png-converter")
+        with profiler.phase("convert_gs"):
+            converter.convert_eps_to_png_result(f"{name}.eps", f"{name}.png", dpi)
+    elif convert == "raster":
+        import rasterizer
+        with profiler.phase("rasterize"):
+            raster = rasterizer.render_scene(captured["scene"], dpi)
+        with profiler.phase("encode_png"):
+            raster.write_png(f"{name}.png")
+    profiler.total_seconds = time.perf_counter() - start
+    return profiler
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Profile turtle primitives per figure")
+    parser.add_argument("figures", nargs="*", help="figure names (default: all)")
+    parser.add_argument("--backend", choices=sorted(make_figures.BACKENDS),
+                        help="turtle implementation (default: $TURTLE_BACKEND or tk)")
+    parser.add_argument("--convert", choices=["gs", "raster"],
+                        help="also time PNG conversion with Ghostscript or the built-in rasterizer")
+    parser.add_argument("--dpi", type=int, default=300)
+    parser.add_argument("--json", metavar="FILE", help="write per-figure profiles as JSON")
+    parser.add_argument("--folded", metavar="FILE", help="write folded stacks for flamegraphs")
+    args = parser.parse_args(argv)
+    backend = args.backend or os.environ.get("TURTLE_BACKEND", "tk")
+    if args.convert == "raster" and backend != "headless":
+        parser.error("--convert raster needs --backend headless")
+    if args.backend:
+        make_figures.set_backend(args.backend)
+
+    reports, folded = [], []
+    try:
+        for name in args.figures or list(make_figures.FIGURES):
+            profiler = profile_figure(name, args.convert, args.dpi)
+            report = profiler.report()
+            reports.append(report)
+            folded.extend(profiler.folded_stacks())
+            top = ", ".join(f"{prim} x{e['count']} {e['seconds'] * 1000:.1f}ms"
+                            for prim, e in list(report["primitives"].items())[:3])
+            phases = ", ".join(f"{phase} {e['seconds'] * 1000:.1f}ms"
+                               for phase, e in report["phases"].items())
+            print(f"{name}: {report['total_seconds'] * 1000:.1f}ms total; {top}; {phases}")
+    finally:
+        try:
+            make_figures.turtle.bye()
+        except Exception:
+            pass
+
+    if args.json:
+        Path(args.json).write_text(json.dumps(reports, indent=1))
+    if args.folded:
+        Path(args.folded).write_text("\n".join(folded) + "\n")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,249 @@
+'''
+Auto-tuner for Ghostscript render profiles.
+
+Renders a sample of EPS files with the 'archive' profile as a reference, then
+times a grid of candidate option sets (anti-aliasing, rendering threads,
+banding, interpolation) on the same files. The fastest candidate whose pixels
+stay within a similarity threshold of the reference is saved as a named
+profile that eps-to-png-converter.py --profile can use.
+
+Candidates are timed rendering to ppmraw, so the comparison reads raw pixels
+without a PNG decoder; PNG compression costs the same for every candidate at
+a given size. Each candidate's time is the best of several runs minus the
+best time of the same profile on an empty page, so gs start-up does not
+decide the ranking. Renders are streamed into area-averaged thumbnails of at
+most COMPARE_SIZE pixels a side, and similarity() is the share of the inked
+(non-white) thumbnail pixels that stay within TOLERANCE of the reference:
+the small edge changes anti-aliasing makes pass, while a missing or moved
+shape fails however much blank page surrounds it.
+
+    python3 src/gs_tune.py examples --dpi 300 --sample 6 --threshold 0.99
+'''
+
+import argparse
+import functools
+import importlib
+import itertools
+import operator
+import os
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+
+import downsample
+
+converter = importlib.import_module("eps-to-png-converter")
+
+# Longest side of the thumbnails similarity() compares
+COMPARE_SIZE = 512
+# Largest sample difference at which a thumbnail pixel still matches
+TOLERANCE = 48
+
+# A page that draws nothing, for timing gs start-up and shutdown on their own
+EMPTY_EPS = """%!PS-Adobe-3.0 EPSF-3.0
+%%BoundingBox: 0 0 1 1
+%%EndComments
+showpage
+%%EOF
+"""
+
+def sample_files(input_dir, count):
+    """Pick up to count EPS files spread evenly over the sorted directory listing"""
+    eps_files = sorted(Path(input_dir).glob('*.eps'))
+    if len(eps_files) <= count:
+        return eps_files
+    step = len(eps_files) / count
+    return [eps_files[int(i * step)] for i in range(count)]
+
+def candidate_profiles():
+    """
+    Yield the option sets the tuner tries, including the built-in profiles.
+
+    Yields:
+        tuple: (name, profile dict)
+    """
+    for name, profile in converter.PROFILES.items():
+        yield name, profile
+    grid = itertools.product((1, 2, 4), (None, 'auto'), (None, 16 << 20, 64 << 20),
+                             (None, False))
+    for alpha, threads, max_memory, interpolate in grid:
+        if threads is not None and max_memory is None:
+            # Rendering threads only work on bands
+            continue
+        profile = {'text_alpha_bits': alpha, 'graphics_alpha_bits': alpha,
+                   'rendering_threads': threads, 'max_memory': max_memory,
+                   'interpolate': interpolate}
+        profile = {key: value for key, value in profile.items() if value is not None}
+        name = '-'.join([f'aa{alpha}']
+                        + (['mt'] if threads else [])
+                        + ([f'band{max_memory >> 20}m'] if max_memory else [])
+                        + (['nointerp'] if interpolate is False else []))
+        yield name, profile
+
+def render_pixels(eps_file, dpi, profile, work_dir, size=COMPARE_SIZE):
+    """
+    Render one EPS with a profile and shrink the render for similarity().
+
+    Only the gs run is timed; the render is streamed from disk into
+    thumbnail() and never held in memory whole.
+
+    Returns:
+        tuple: (seconds, thumbnail() image), or (seconds, None) if gs failed
+    """
+    ppm = Path(work_dir) / 'render.ppm'
+    command = converter.build_gs_command(eps_file, ppm, dpi, 'ppmraw', profile=profile)
+    start = time.perf_counter()
+    completed = subprocess.run(command, capture_output=True)
+    seconds = time.perf_counter() - start
+    if completed.returncode != 0 or not ppm.exists():
+        return seconds, None
+    image = thumbnail(downsample.PPMRows(ppm), size)
+    ppm.unlink()
+    return seconds, image
+
+def thumbnail(image, size=COMPARE_SIZE):
+    """
+    Area-downsample a downsample.PPMRows image so its longest side is at most size.
+
+    Returns:
+        tuple: (width, height, channels, pixels), as downsample.read_ppm() returns
+    """
+    width, height, channels = image.width, image.height, image.channels
+    scale = min(1.0, size / max(width, height))
+    new_width, new_height = max(1, round(width * scale)), max(1, round(height * scale))
+    rows = image
+    if (new_width, new_height) != (width, height):
+        rows = downsample.downsample_rows(image, width, height, new_width, new_height, channels)
+    return new_width, new_height, channels, b"".join(rows)
+
+# Sample -> 1 if it is not white / differs by more than TOLERANCE, else 0
+_NOT_WHITE = bytes([1] * 255 + [0])
+_OVER_TOLERANCE = bytes([0] * (TOLERANCE + 1) + [1] * (255 - TOLERANCE))
+
+def _count_pixels(flags, channels):
+    """Number of pixels with a 1 flag in any of their samples"""
+    merged = functools.reduce(operator.or_, (int.from_bytes(flags[c::channels], 'big')
+                                             for c in range(channels)))
+    return bin(merged).count('1')
+
+def similarity(reference, image):
+    """
+    Share of the inked pixels on which two thumbnail() images agree.
+
+    A pixel is inked when it is not white in either image, and agrees when
+    none of its samples differ by more than TOLERANCE. The blank page does
+    not count, so a shape that is missing or moved costs its share of the
+    drawing rather than of the page.
+
+    Returns:
+        float: 1.0 when every inked pixel agrees (or nothing is inked), 0.0
+            for a size mismatch or when none agree
+    """
+    if reference is None or image is None or reference[:3] != image[:3]:
+        return 0.0
+    channels, a, b = reference[2], reference[3], image[3]
+    if a == b:
+        return 1.0
+    # A sample is white in both images exactly when their AND is 255
+    inked = _count_pixels(bytes(map(operator.and_, a, b)).translate(_NOT_WHITE), channels)
+    if not inked:
+        return 1.0
+    differences = bytes(map(abs, map(operator.sub, a, b)))
+    changed = _count_pixels(differences.translate(_OVER_TOLERANCE), channels)
+    return 1.0 - changed / inked
+
+def startup_seconds(dpi, profile, work_dir, repeats=3):
+    """Best time gs takes to render EMPTY_EPS with a profile"""
+    empty = Path(work_dir) / 'empty.eps'
+    empty.write_text(EMPTY_EPS)
+    return min(render_pixels(empty, dpi, profile, work_dir)[0] for _ in range(repeats))
+
+def autotune(input_dir, dpi=300, sample=6, threshold=0.99, repeats=3, reference='archive',
+             profile_file=converter.PROFILE_FILE):
+    """
+    Benchmark candidate profiles on sample files against a reference render.
+
+    Args:
+        input_dir (str): Directory of EPS files to sample
+        dpi (int, optional): Resolution to tune at. Defaults to 300
+        sample (int, optional): Number of files rendered per candidate
+        threshold (float, optional): Minimum similarity() to the reference
+            on every sample file
+        repeats (int, optional): Timed renders per file; the best is kept
+        reference (str, optional): Profile name rendered as the reference
+        profile_file (str, optional): Saved profiles, for a non-built-in reference
+
+    Returns:
+        list: One dict per candidate with 'name', 'profile', 'seconds' (total
+            best time over the sample, less gs start-up), 'startup' (the
+            start-up time subtracted per file), 'similarity' (worst over the
+            sample) and 'accepted', fastest first
+    """
+    eps_files = sample_files(input_dir, sample)
+    if not eps_files:
+        raise ValueError(f"No EPS files found in {input_dir}")
+    profiles = converter.load_profiles(profile_file)
+    results = []
+    with tempfile.TemporaryDirectory() as work_dir:
+        references = [render_pixels(eps, dpi, profiles[reference], work_dir)[1]
+                      for eps in eps_files]
+        if any(image is None for image in references):
+            raise RuntimeError(f"gs failed to render the {reference!r} reference")
+        for name, profile in candidate_profiles():
+            startup = startup_seconds(dpi, profile, work_dir, repeats)
+            seconds, worst = 0.0, 1.0
+            for eps, expected in zip(eps_files, references):
+                best = image = None
+                for _ in range(repeats):
+                    elapsed, image = render_pixels(eps, dpi, profile, work_dir)
+                    best = elapsed if best is None else min(best, elapsed)
+                seconds += max(0.0, best - startup)
+                worst = min(worst, similarity(expected, image))
+            results.append({'name': name, 'profile': profile, 'seconds': seconds,
+                            'startup': startup, 'similarity': worst,
+                            'accepted': worst >= threshold})
+    results.sort(key=lambda r: r['seconds'])
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Find the fastest gs profile that still "
+                                                 "matches the reference render")
+    parser.add_argument("input_dir", nargs="?", default="examples")
+    parser.add_argument("--dpi", type=int, default=300)
+    parser.add_argument("--sample", type=int, default=6, help="EPS files to benchmark on")
+    parser.add_argument("--threshold", type=float, default=0.99,
+                        help="minimum share of inked pixels matching the reference (0-1)")
+    parser.add_argument("--repeats", type=int, default=3,
+                        help="timed renders per file and candidate; the best counts")
+    parser.add_argument("--reference", default="archive", help="profile rendered as reference")
+    parser.add_argument("--name", default="tuned", help="name to save the winner under")
+    parser.add_argument("--profiles", default=converter.PROFILE_FILE,
+                        help="profile file to save into (default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    results = autotune(args.input_dir, args.dpi, args.sample, args.threshold, args.repeats,
+                       args.reference, args.profiles)
+    for r in results:
+        mark = "ok " if r['accepted'] else "   "
+        print(f"{mark}{r['name']:28s} {r['seconds']:7.2f}s  (+{r['startup']:.2f}s start-up "
+              f"per file)  similarity {r['similarity']:.4f}")
+    accepted = [r for r in results if r['accepted']]
+    if not accepted:
+        print(f"No candidate reached similarity {args.threshold}")
+        return 1
+    best = accepted[0]
+    converter.save_profile(args.name, best['profile'], args.profiles, {
+        'candidate': best['name'],
+        'seconds': best['seconds'],
+        'similarity': best['similarity'],
+        'dpi': args.dpi,
+        'threshold': args.threshold,
+        'files': len(sample_files(args.input_dir, args.sample)),
+        'cpu_count': os.cpu_count(),
+    })
+    print(f"Saved {best['name']} as {args.name!r} in {args.profiles}")
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,621 @@
+'''
+Headless, recording stand-in for the turtle module.
+
+Provides the subset of the turtle API used by make_figures.py (Screen, Turtle,
+reset, clearscreen, bye, ...) without importing tkinter. Instead of drawing on
+a Tk canvas, every line and filled polygon is recorded into an in-memory
+display list that can be written straight to EPS.
+'''
+
+import contextlib
+import math
+
+import artifact_store
+import eps_writer
+
+# Tk's named colors (web palette, as used by Tk 8.6) for the names turtle
+# programs commonly use. Values are RGB components in the 0-1 range.
+COLOR_NAMES = {
+    "black": (0.0, 0.0, 0.0),
+    "white": (1.0, 1.0, 1.0),
+    "red": (1.0, 0.0, 0.0),
+    "green": (0.0, 128 / 255, 0.0),
+    "lime": (0.0, 1.0, 0.0),
+    "blue": (0.0, 0.0, 1.0),
+    "yellow": (1.0, 1.0, 0.0),
+    "cyan": (0.0, 1.0, 1.0),
+    "magenta": (1.0, 0.0, 1.0),
+    "orange": (1.0, 165 / 255, 0.0),
+    "purple": (128 / 255, 0.0, 128 / 255),
+    "pink": (1.0, 192 / 255, 203 / 255),
+    "brown": (165 / 255, 42 / 255, 42 / 255),
+    "gray": (128 / 255, 128 / 255, 128 / 255),
+    "grey": (128 / 255, 128 / 255, 128 / 255),
+}
+
+class TurtleGraphicsError(Exception):
+    """Raised for invalid turtle arguments, mirroring turtle.TurtleGraphicsError"""
+
+# ============= Display List =============
+class DisplayItem:
+    """
+    One recorded canvas item.
+
+    Attributes:
+        kind (str): "polygon" for a filled area or "line" for a stroked polyline
+        points (list): (x, y) vertices in world coordinates
+        fill (tuple): RGB fill color of a polygon, None for lines
+        outline (tuple): RGB stroke color of a line, None for polygons
+        width (float): Stroke width in pixels (lines only)
+        circle (tuple): (cx, cy, radius) when the item is exactly one full
+            turtle circle, otherwise None
+        holes (list): DisplayItems of kind "hole" cut out of a polygon's fill
+            (even-odd), added by visibility passes such as occlusion.py
+    """
+    __slots__ = ("kind", "points", "fill", "outline", "width", "circle", "holes")
+
+    def __init__(self, kind, points, fill=None, outline=None, width=1, circle=None,
+                 holes=None):
+        self.kind = kind
+        self.points = points
+        self.fill = fill
+        self.outline = outline
+        self.width = width
+        self.circle = circle
+        self.holes = holes or []
+
+    def __repr__(self):
+        return (f"DisplayItem({self.kind!r}, {len(self.points)} points, "
+                f"fill={self.fill}, outline={self.outline})")
+
+def to_rgb(color, colormode=1.0):
+    """
+    Convert a turtle color specification to an RGB tuple in the 0-1 range.
+
+    Args:
+        color: Color name, '#rrggbb' string or (r, g, b) tuple
+        colormode (float, optional): 1.0 or 255, as set by Screen.colormode()
+
+    Returns:
+        tuple: (r, g, b) floats in the 0-1 range
+    """
+    if isinstance(color, str):
+        name = color.strip().lower()
+        if name in COLOR_NAMES:
+            return COLOR_NAMES[name]
+        if name.startswith("#") and len(name) == 7:
+            try:
+                return tuple(int(name[i:i + 2], 16) / 255 for i in (1, 3, 5))
+            except ValueError:
+                pass
+        raise TurtleGraphicsError(f"bad color string: {color}")
+    try:
+        r, g, b = color
+    except (TypeError, ValueError):
+        raise TurtleGraphicsError(f"bad color arguments: {color}")
+    if not all(0 <= c <= colormode for c in (r, g, b)):
+        raise TurtleGraphicsError(f"bad color sequence: {color}")
+    return (r / colormode, g / colormode, b / colormode)
+
+# ============= Exporters =============
+# Callables run as exporter(scene, eps_file) after every canvas.postscript()
+_exporters = []
+
+def add_exporter(exporter):
+    """
+    Register an extra output step for every exported figure.
+
+    Args:
+        exporter: Callable taking (scene, eps_file); scene is the live
+            RecordingScreen, so copy anything that must outlive the call
+
+    Returns:
+        The exporter, as the handle to pass to remove_exporter()
+    """
+    _exporters.append(exporter)
+    return exporter
+
+def remove_exporter(exporter):
+    """Unregister an exporter added with add_exporter()"""
+    _exporters.remove(exporter)
+
+def clear_exporters():
+    """Remove all registered exporters"""
+    del _exporters[:]
+
+# Optional artifact_store.ArtifactStore deduplicating identical EPS output
+_store = None
+
+def set_artifact_store(store):
+    """Write EPS files through a content-addressed store (None to disable)"""
+    global _store
+    _store = store
+
+# List collecting exported scenes in place of any file output, or None
+_capture = None
+
+def set_capture(scenes):
+    """
+    Collect exported scenes in memory instead of writing them.
+
+    While set, canvas.postscript() appends a frozen copy of the (filtered)
+    scene to the list and neither writes files nor runs the exporters.
+
+    Args:
+        scenes (list): List to append to, or None to write files again
+    """
+    global _capture
+    _capture = scenes
+
+# ============= Canvas and Screen =============
+_scene_filter = None
+
+def set_scene_filter(scene_filter):
+    """
+    Transform each scene before it is written, e.g. occlusion.cull_scene.
+
+    Args:
+        scene_filter: Callable taking and returning a Scene, or None
+    """
+    global _scene_filter
+    _scene_filter = scene_filter
+
+_eps_options = {}
+
+def set_eps_options(**options):
+    """
+    Set extra eps_writer.write_eps() options, e.g. dpi=300 for compact EPS.
+
+    Calling it without arguments restores the default writer.
+    """
+    global _eps_options
+    _eps_options = options
+
+class RecordingCanvas:
+    """Canvas look-alike whose postscript() writes the recorded display list"""
+
+    def __init__(self, screen):
+        self._screen = screen
+
+    def postscript(self, file=None, colormode="color", **options):
+        """
+        Export the display list as EPS, like Tk's canvas.postscript().
+
+        Args:
+            file (str, optional): Output path. If None, the EPS text is returned
+            colormode (str, optional): 'color' or 'gray'
+
+        Returns:
+            str: The EPS text when no file is given, otherwise an empty string
+        """
+        scene = self._screen
+        if _scene_filter is not None:
+            scene = _scene_filter(scene.snapshot())
+        if _capture is not None:
+            _capture.append(scene.snapshot() if scene is self._screen else scene)
+            return ""
+        if file is not None and _store is not None:
+            key = artifact_store.canonical_digest(scene)
+            if colormode != "color":
+                key += f"-{colormode}"
+            for name, value in sorted(_eps_options.items()):
+                key += f"-{name}{value}"
+            _store.materialize(key, ".eps", file, lambda path: eps_writer.write_eps(
+                scene, path, colormode=colormode, **_eps_options))
+            text = ""
+        else:
+            text = eps_writer.write_eps(scene, file, colormode=colormode, **_eps_options)
+        for exporter in _exporters:
+            exporter(scene, file)
+        return text
+
+class Scene:
+    """Frozen copy of a screen's page setup and display list"""
+
+    def __init__(self, width, height, world, background, items):
+        self.width = width
+        self.height = height
+        self.world = world
+        self.background = background
+        self.items = items
+
+    def snapshot(self):
+        return Scene(self.width, self.height, self.world, self.background, list(self.items))
+
+class RecordingScreen:
+    """Screen singleton that owns the display list"""
+
+    def __init__(self):
+        self.width = 400
+        self.height = 400
+        self.world = (-200, -200, 200, 200)
+        self.background = COLOR_NAMES["white"]
+        self.items = []
+        self.turtles = []
+        self._colormode = 1.0
+        self._canvas = RecordingCanvas(self)
+
+    def setup(self, width=400, height=400, startx=None, starty=None):
+        """Set the window size; the world keeps one unit per pixel by default"""
+        self.width = width
+        self.height = height
+        self.world = (-width / 2, -height / 2, width / 2, height / 2)
+
+    def setworldcoordinates(self, llx, lly, urx, ury):
+        """Set the world coordinate system mapped onto the window"""
+        self.world = (llx, lly, urx, ury)
+
+    def bgcolor(self, *args):
+        """Set the background color"""
+        if args:
+            self.background = to_rgb(args[0] if len(args) == 1 else args, self._colormode)
+        return self.background
+
+    def colormode(self, cmode=None):
+        """Get or set the color mode (1.0 or 255)"""
+        if cmode is None:
+            return self._colormode
+        if cmode not in (1.0, 255):
+            raise TurtleGraphicsError(f"bad colormode: {cmode}")
+        self._colormode = cmode
+
+    def getcanvas(self):
+        return self._canvas
+
+    def snapshot(self):
+        """Return a Scene that stays valid after the screen is cleared"""
+        return Scene(self.width, self.height, self.world, self.background, list(self.items))
+
+    def clear(self):
+        """Delete all items and turtles, like TurtleScreen.clear()"""
+        self.items = []
+        self.turtles = []
+        self.background = COLOR_NAMES["white"]
+        self._colormode = 1.0
+
+    clearscreen = clear
+
+    def reset(self):
+        """Reset every turtle on the screen"""
+        for t in self.turtles:
+            t.reset()
+
+    resetscreen = reset
+
+    def tracer(self, n=None, delay=None):
+        return 0
+
+    def update(self):
+        pass
+
+    def title(self, titlestring):
+        pass
+
+    def mainloop(self):
+        pass
+
+    done = mainloop
+
+    def bye(self):
+        pass
+
+_screen = None
+
+def Screen():
+    """Return the shared RecordingScreen, creating it on first use"""
+    global _screen
+    if _screen is None:
+        _screen = RecordingScreen()
+    return _screen
+
+# ============= Turtle =============
+class Turtle:
+    """Recording turtle with the drawing surface of turtle.Turtle"""
+
+    def __init__(self):
+        self.screen = Screen()
+        self.screen.turtles.append(self)
+        self._items = []
+        self._init_state()
+
+    def _init_state(self):
+        self._position = (0.0, 0.0)
+        self._heading = 0.0
+        self._drawing = True
+        self._pencolor = COLOR_NAMES["black"]
+        self._fillcolor = COLOR_NAMES["black"]
+        self._pensize = 1
+        self._visible = True
+        self._line = None
+        self._fillitem = None
+        self._fillpath = None
+        self._fill_circle = None
+
+    def reset(self):
+        """Delete this turtle's drawings and restore its default state"""
+        owned = set(map(id, self._items))
+        self.screen.items = [i for i in self.screen.items if id(i) not in owned]
+        self._items = []
+        self._init_state()
+
+    def clear(self):
+        """Delete this turtle's drawings without moving it"""
+        owned = set(map(id, self._items))
+        self.screen.items = [i for i in self.screen.items if id(i) not in owned]
+        self._items = []
+        self._line = None
+
+    def _add_item(self, item):
+        self._items.append(item)
+        self.screen.items.append(item)
+        return item
+
+    # ---- movement ----
+    def _new_line(self):
+        self._line = None
+
+    def _goto(self, end):
+        """Move to end, extending the current line and fill path"""
+        if self._drawing:
+            if self._line is None:
+                self._line = self._add_item(DisplayItem(
+                    "line", [self._position], outline=self._pencolor,
+                    width=self._pensize))
+            self._line.points.append(end)
+        if self._fillpath is not None:
+            self._fillpath.append(end)
+        self._position = end
+
+    def _forget_circle(self):
+        # Any movement outside circle() means the item is no longer a pure circle
+        self._fill_circle = None
+        if self._line is not None:
+            self._line.circle = None
+
+    def goto(self, x, y=None):
+        """Move to an absolute position"""
+        if y is None:
+            x, y = x
+        self._forget_circle()
+        self._goto((float(x), float(y)))
+
+    setpos = setposition = goto
+
+    def setx(self, x):
+        self.goto(x, self._position[1])
+
+    def sety(self, y):
+        self.goto(self._position[0], y)
+
+    def forward(self, distance):
+        """Move forward by distance in the current heading"""
+        self._forget_circle()
+        self._forward(distance)
+
+    def _forward(self, distance):
+        angle = math.radians(self._heading)
+        x, y = self._position
+        self._goto((x + distance * math.cos(angle), y + distance * math.sin(angle)))
+
+    fd = forward
+
+    def back(self, distance):
+        self.forward(-distance)
+
+    bk = backward = back
+
+    def home(self):
+        self.goto(0, 0)
+        self.setheading(0)
+
+    def right(self, angle):
+        self._heading = (self._heading - angle) % 360.0
+
+    rt = right
+
+    def left(self, angle):
+        self._heading = (self._heading + angle) % 360.0
+
+    lt = left
+
+    def setheading(self, to_angle):
+        self._heading = to_angle % 360.0
+
+    seth = setheading
+
+    def circle(self, radius, extent=None, steps=None):
+        """
+        Draw a circle or arc, using the same segmentation as turtle.circle()
+
+        Args:
+            radius (float): Radius; the center lies radius units to the left
+            extent (float, optional): Arc angle in degrees. Full circle if None
+            steps (int, optional): Number of segments. Derived from radius if None
+        """
+        self._forget_circle()
+        full = extent is None or abs(extent) >= 360
+        explicit_steps = steps is not None
+        if extent is None:
+            extent = 360.0
+        if steps is None:
+            frac = abs(extent) / 360.0
+            steps = 1 + int(min(11 + abs(radius) / 6.0, 59.0) * frac)
+        w = 1.0 * extent / steps
+        w2 = 0.5 * w
+        l = 2.0 * radius * math.sin(math.radians(w2))
+        if radius < 0:
+            l, w, w2 = -l, -w, -w2
+
+        x, y = self._position
+        heading = math.radians(self._heading)
+        center = (x - radius * math.sin(heading), y + radius * math.cos(heading))
+        fresh_fill = self._fillpath is not None and len(self._fillpath) == 1
+        fresh_line = self._drawing and self._line is None
+
+        self.left(w2)
+        for _ in range(steps):
+            self._forward(l)
+            self.left(w)
+        self.left(-w2)
+
+        if full and not explicit_steps:
+            shape = (center[0], center[1], abs(radius))
+            if fresh_fill:
+                self._fill_circle = shape
+            if fresh_line:
+                self._line.circle = shape
+
+    # ---- pen state ----
+    def penup(self):
+        if self._drawing:
+            self._new_line()
+        self._drawing = False
+
+    pu = up = penup
+
+    def pendown(self):
+        if not self._drawing:
+            self._new_line()
+        self._drawing = True
+
+    pd = down = pendown
+
+    def isdown(self):
+        return self._drawing
+
+    def pensize(self, width=None):
+        if width is None:
+            return self._pensize
+        if width != self._pensize:
+            self._new_line()
+        self._pensize = width
+
+    width = pensize
+
+    def pencolor(self, *args):
+        if not args:
+            return self._pencolor
+        color = to_rgb(args[0] if len(args) == 1 else args, self.screen.colormode())
+        if color != self._pencolor:
+            self._new_line()
+        self._pencolor = color
+
+    def fillcolor(self, *args):
+        if not args:
+            return self._fillcolor
+        self._fillcolor = to_rgb(args[0] if len(args) == 1 else args,
+                                 self.screen.colormode())
+
+    def color(self, *args):
+        """Set pen and fill color: color(c) or color(pencolor, fillcolor)"""
+        if not args:
+            return self._pencolor, self._fillcolor
+        if len(args) == 2:
+            self.pencolor(args[0])
+            self.fillcolor(args[1])
+        else:
+            self.pencolor(*args)
+            self.fillcolor(*args)
+
+    # ---- filling ----
+    def filling(self):
+        return self._fillpath is not None
+
+    def begin_fill(self):
+        """Start recording a filled shape; its polygon sits below the outline"""
+        if not self.filling():
+            self._fillitem = self._add_item(DisplayItem("polygon", []))
+        self._fillpath = [self._position]
+        self._fill_circle = None
+        self._new_line()
+
+    def end_fill(self):
+        """Close the current fill path and color it with the fill color"""
+        if self.filling():
+            if len(self._fillpath) > 2:
+                self._fillitem.points = self._fillpath
+                self._fillitem.fill = self._fillcolor
+                self._fillitem.circle = self._fill_circle
+            else:
+                self._items.remove(self._fillitem)
+                self.screen.items.remove(self._fillitem)
+            self._fillitem = self._fillpath = self._fill_circle = None
+        self._new_line()
+
+    # ---- queries and no-ops ----
+    def position(self):
+        return self._position
+
+    pos = position
+
+    def xcor(self):
+        return self._position[0]
+
+    def ycor(self):
+        return self._position[1]
+
+    def heading(self):
+        return self._heading
+
+    def speed(self, speed=None):
+        return 0
+
+    def hideturtle(self):
+        self._visible = False
+
+    ht = hideturtle
+
+    def showturtle(self):
+        self._visible = True
+
+    st = showturtle
+
+    def isvisible(self):
+        return self._visible
+
+    def getscreen(self):
+        return self.screen
+
+# ============= Module-level Functions =============
+def reset():
+    """Reset all turtles, like turtle.reset()"""
+    Screen().reset()
+
+def clearscreen():
+    """Delete all drawings and turtles, like turtle.clearscreen()"""
+    Screen().clear()
+
+def bye():
+    """Forget the shared screen so the next Screen() starts fresh"""
+    global _screen
+    _screen = None
+
+def tracer(n=None, delay=None):
+    return Screen().tracer(n, delay)
+
+def update():
+    Screen().update()
+
+def done():
+    pass
+
+mainloop = done
+
+@contextlib.contextmanager
+def isolated():
+    """
+    Draw with fresh module state, restoring the previous state afterwards.
+
+    Inside, Screen() is a new screen and there are no exporters, artifact
+    store, capture, scene filter or EPS options. It does not lock anything:
+    make_figures enters it under the lock all its drawing functions share.
+    """
+    global _screen, _store, _capture, _scene_filter, _eps_options
+    saved = (_screen, list(_exporters), _store, _capture, _scene_filter, _eps_options)
+    _screen, _store, _capture, _scene_filter, _eps_options = None, None, None, None, {}
+    del _exporters[:]
+    try:
+        yield
+    finally:
+        _screen, exporters, _store, _capture, _scene_filter, _eps_options = saved
+        _exporters[:] = exporters
@@ -2,16 +2,171 @@
 Implementation of creative coding problems from Brilliant.
 '''
 
-import turtle
+import argparse
+import contextlib
+import importlib
+import inspect
 import math
+import os
+import platform
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import build_cache
+
+# Turtle implementations the create_* functions can draw with
+BACKENDS = {
+    "tk": "turtle",                # Standard library turtle on a Tk canvas
+    "headless": "headless_turtle", # In-memory recorder, no tkinter or display
+}
+
+# Held while a figure draws or the backend or export settings change: the
+# turtle screen and the headless backend's exporters, store and filters are
+# module globals. Re-entrant, as capture_scene() draws through run_figure()
+_lock = threading.RLock()
+
+def set_backend(name):
+    """
+    Select the turtle implementation used by all figure functions.
+
+    Args:
+        name (str): 'tk' for the standard turtle module or 'headless' for the
+            recording backend that writes EPS without Tk
+    """
+    global turtle
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend {name!r}, expected one of {sorted(BACKENDS)}")
+    with _lock:
+        turtle = importlib.import_module(BACKENDS[name])
+
+# TURTLE_BACKEND=headless avoids importing tkinter at all
+set_backend(os.environ.get("TURTLE_BACKEND", "tk"))
+
+@contextlib.contextmanager
+def using_backend(name, exports=None):
+    """
+    Draw with a backend and export settings, restoring the current ones afterwards.
+
+    Holds the drawing lock throughout. On the headless backend figures are
+    drawn on a fresh screen (headless_turtle.isolated()), so the exporters,
+    store and filters configured outside stay untouched.
+
+    Args:
+        name (str): Backend name, as for set_backend()
+        exports (dict, optional): configure_exports() arguments in effect inside
+    """
+    global turtle
+    with _lock:
+        previous = turtle
+        set_backend(name)
+        try:
+            if name == "headless":
+                with turtle.isolated():
+                    configure_exports(**(exports or {}))
+                    yield
+            else:
+                configure_exports(**(exports or {}))
+                yield
+        finally:
+            turtle = previous
+
+def configure_exports(png_dpi=None, artifact_dir=None, cull=False, eps_dpi=None, svg=False):
+    """
+    Configure extra outputs written next to each EPS (headless backend only).
+
+    Args:
+        png_dpi (int, optional): Also rasterize each figure to PNG at this DPI
+            with the built-in rasterizer, without Ghostscript
+        artifact_dir (str, optional): Content-addressed store directory; figures
+            that draw identical geometry are serialised and rasterized once and
+            copied to each output name
+        cull (bool, optional): Drop hidden shapes and cut covered areas out of
+            nested fills before writing (see occlusion.py); pixels are unchanged
+        eps_dpi (int, optional): Write compact EPS with shared shape procedures
+            and coordinates rounded for this DPI
+        svg (bool, optional): Also write an SVG next to each EPS
+
+    Calling it without options removes all of them again (see reset_exports()).
+    """
+    if png_dpi is None and artifact_dir is None and not cull and eps_dpi is None and not svg:
+        reset_exports()
+        return
+    if turtle.__name__ != BACKENDS["headless"]:
+        raise ValueError("PNG/SVG export, the artifact store, culling and compact EPS "
+                         "need the headless backend")
+    with _lock:
+        store = None
+        if artifact_dir is not None:
+            import artifact_store
+            store = artifact_store.ArtifactStore(artifact_dir)
+        turtle.set_artifact_store(store)
+        if cull:
+            import occlusion
+            turtle.set_scene_filter(occlusion.scene_filter())
+        else:
+            turtle.set_scene_filter(None)
+        if eps_dpi is not None:
+            turtle.set_eps_options(dpi=eps_dpi)
+        else:
+            turtle.set_eps_options()
+        turtle.clear_exporters()
+        if png_dpi is not None:
+            import rasterizer
+            turtle.add_exporter(rasterizer.png_exporter(png_dpi, store=store))
+        if svg:
+            import svg_writer
+            turtle.add_exporter(svg_writer.svg_exporter(store=store))
+
+def reset_exports():
+    """Remove the store, culling, compact EPS and extra exporters set by configure_exports()"""
+    if turtle.__name__ != BACKENDS["headless"]:
+        return
+    with _lock:
+        turtle.set_artifact_store(None)
+        turtle.set_scene_filter(None)
+        turtle.set_eps_options()
+        turtle.clear_exporters()
 
 # ============= Basic Setup Functions =============
+# Directory the figure being drawn by run_figure() writes into, None for the cwd
+_output_dir = None
+
+class _OutputCanvas:
+    """Canvas proxy writing relative postscript() paths into a directory"""
+
+    def __init__(self, canvas, directory):
+        self._canvas = canvas
+        self._directory = directory
+
+    def postscript(self, file=None, **options):
+        if file is not None:
+            file = os.path.join(self._directory, file)
+        return self._canvas.postscript(file=file, **options)
+
+    def __getattr__(self, name):
+        return getattr(self._canvas, name)
+
+class _OutputScreen:
+    def __init__(self, screen, directory):
+        self._screen = screen
+        self._directory = directory
+
+    def getcanvas(self):
+        return _OutputCanvas(self._screen.getcanvas(), self._directory)
+
+    def __getattr__(self, name):
+        return getattr(self._screen, name)
+
 def setup_screen(width=400, height=400):
     """Set up the screen with specified dimensions"""
     screen = turtle.Screen()
     screen.setup(width, height)
     screen.bgcolor("white")
     screen.setworldcoordinates(-width/2, -height/2, width/2, height/2)
+    if _output_dir is not None:
+        return _OutputScreen(screen, _output_dir)
     return screen
 
 def setup_turtle():
@@ -166,7 +321,8 @@ def create_shrinking_circles():
     screen.clear()
 
 # ============= Rotating Square Pattern Functions =============
-def draw_rotating_square_pattern(filename, initial_color, color_function):
+def draw_rotating_square_pattern(filename, initial_color, color_function, size=120, angle=30,
+                                 iterations=10, size_step=-10, angle_step=30):
     """
     Draw rotating squares with a specified color pattern
     
@@ -174,6 +330,11 @@ def draw_rotating_square_pattern(filename, initial_color, color_function):
         filename: Output EPS file name
         initial_color: Starting color for the squares
         color_function: Function that determines the next color based on current color
+        size: Side length of the first square
+        angle: Rotation of the first square in degrees
+        iterations: Number of squares
+        size_step: Change in side length from one square to the next
+        angle_step: Change in rotation from one square to the next
     """
     turtle.reset()
     turtle.clearscreen()
@@ -181,15 +342,13 @@ def draw_rotating_square_pattern(filename, initial_color, color_function):
     screen = setup_screen()
     t = setup_turtle()
     
-    size = 120
-    angle = 30
     color = initial_color
     
     # Set pen properties for border
     t.width(1)  # Set border width
     t.pencolor("black")  # Set border color
     
-    for i in range(10):
+    for i in range(iterations):
         t.penup()
         t.goto(0, 0)  # Move to center
         t.setheading(angle)  # Set rotation angle
@@ -210,8 +369,8 @@ def draw_rotating_square_pattern(filename, initial_color, color_function):
         t.end_fill()
         
         # Update variables
-        size -= 10
-        angle += 30
+        size += size_step
+        angle += angle_step
         color = color_function(color, angle)
     
     canvas = screen.getcanvas()
@@ -251,8 +410,19 @@ def create_alternating_color_squares(initial_color="white"):
     """Create rotating squares with specified initial color"""
     draw_rotating_square_pattern("figure10.eps", initial_color, white_blue_alternating)
 
-def create_count_based_spiral():
-    """Create spiral pattern with count-based size reduction and angle"""
+def create_count_based_spiral(filename="figure11.eps", squares=30, base_size=150, size_step=5,
+                              angle_step=5, color="blue"):
+    """
+    Create spiral pattern with count-based size reduction and angle
+    
+    Args:
+        filename: Output EPS file name
+        squares: Number of squares
+        base_size: Size the count-based reduction starts from
+        size_step: Size reduction per count
+        angle_step: Rotation per count in degrees
+        color: Fill color
+    """
     turtle.reset()
     turtle.clearscreen()
     
@@ -263,10 +433,10 @@ def create_count_based_spiral():
     t.width(1)
     t.pencolor("black")
     
-    for count in range(1, 31):  # 30 squares
+    for count in range(1, squares + 1):  # 30 squares by default
         # Calculate size and angle based on count
-        size = 150 - (count * 5)
-        angle = count * 5
+        size = base_size - (count * size_step)
+        angle = count * angle_step
         
         t.penup()
         t.goto(0, 0)  # Move to center
@@ -279,7 +449,7 @@ def create_count_based_spiral():
         t.left(90)
         
         # Draw square
-        t.fillcolor("blue")
+        t.fillcolor(color)
         t.begin_fill()
         t.pendown()
         for _ in range(4):
@@ -288,11 +458,21 @@ def create_count_based_spiral():
         t.end_fill()
     
     canvas = screen.getcanvas()
-    canvas.postscript(file="figure11.eps", colormode='color')
+    canvas.postscript(file=filename, colormode='color')
     screen.clear()
 
-def create_divided_squares():
-    """Create pattern with size divided by count"""
+def create_divided_squares(filename="figure12.eps", squares=10, base_size=150, angle_step=5,
+                           color="green"):
+    """
+    Create pattern with size divided by count
+    
+    Args:
+        filename: Output EPS file name
+        squares: Number of squares
+        base_size: Size divided by the count
+        angle_step: Rotation per count in degrees
+        color: Fill color
+    """
     turtle.reset()
     turtle.clearscreen()
     
@@ -303,10 +483,10 @@ def create_divided_squares():
     t.width(1)
     t.pencolor("black")
     
-    for count in range(1, 11):  # 10 squares
+    for count in range(1, squares + 1):  # 10 squares by default
         # Calculate size and angle based on count
-        size = 150 / count
-        angle = count * 5
+        size = base_size / count
+        angle = count * angle_step
         
         t.penup()
         t.goto(0, 0)  # Move to center
@@ -319,7 +499,7 @@ def create_divided_squares():
         t.left(90)
         
         # Draw square
-        t.fillcolor("green")
+        t.fillcolor(color)
         t.begin_fill()
         t.pendown()
         for _ in range(4):
@@ -328,11 +508,23 @@ def create_divided_squares():
         t.end_fill()
     
     canvas = screen.getcanvas()
-    canvas.postscript(file="figure12.eps", colormode='color')
+    canvas.postscript(file=filename, colormode='color')
     screen.clear()
 
-def create_fifth_shape_pattern():
-    """Create pattern where every fifth shape is green and rotated"""
+def create_fifth_shape_pattern(filename="figure13.eps", shapes=12, base_size=125, size_step=10,
+                               every=5, color="green", angle_step=45):
+    """
+    Create pattern where every fifth shape is green and rotated
+    
+    Args:
+        filename: Output EPS file name
+        shapes: Number of shapes
+        base_size: Size the count-based reduction starts from
+        size_step: Size reduction per count
+        every: Highlight every this many shapes
+        color: Fill color of the highlighted shapes
+        angle_step: Rotation of the highlighted shapes in degrees
+    """
     turtle.reset()
     turtle.clearscreen()
     
@@ -343,15 +535,15 @@ def create_fifth_shape_pattern():
     t.width(1)
     t.pencolor("black")
     
-    for count in range(1, 13):  # 12 shapes
-        size = 125 - (count * 10)
+    for count in range(1, shapes + 1):  # 12 shapes by default
+        size = base_size - (count * size_step)
         
         # Set color and angle based on count
-        if count % 5 == 0:
-            color = "green"
-            angle = 45
+        if count % every == 0:
+            fill = color
+            angle = angle_step
         else:
-            color = "white"
+            fill = "white"
             angle = 0
             
         t.penup()
@@ -365,7 +557,7 @@ def create_fifth_shape_pattern():
         t.left(90)
         
         # Draw square
-        t.fillcolor(color)
+        t.fillcolor(fill)
         t.begin_fill()
         t.pendown()
         for _ in range(4):
@@ -374,7 +566,7 @@ def create_fifth_shape_pattern():
         t.end_fill()
     
     canvas = screen.getcanvas()
-    canvas.postscript(file="figure13.eps", colormode='color')
+    canvas.postscript(file=filename, colormode='color')
     screen.clear()
 
 def create_third_shape_rotation():
@@ -732,10 +924,14 @@ def create_rgb_pattern_circles_green():
 
 import random
 
-import random
-
-def create_random_circles():
-    """Create pattern of circles with random positions, sizes, and colors"""
+def create_random_circles(rng=random, filename="figure23.eps"):
+    """
+    Create pattern of circles with random positions, sizes, and colors
+    
+    Args:
+        rng: Random number source (random.Random instance or the random module)
+        filename: Output EPS file name
+    """
     turtle.reset()
     turtle.clearscreen()
     
@@ -748,16 +944,16 @@ def create_random_circles():
     
     for count in range(30):  # 0 to 29
         # Random position
-        x = random.randint(-75, 75)
-        y = random.randint(-75, 75)
+        x = rng.randint(-75, 75)
+        y = rng.randint(-75, 75)
         
         # Random size
-        size = random.randint(0, 100)
+        size = rng.randint(0, 100)
         
         # Random RGB colors (converting to 0-1 range)
-        r = random.randint(0, 250) / 255
-        g = random.randint(0, 250) / 255
-        b = random.randint(0, 250) / 255
+        r = rng.randint(0, 250) / 255
+        g = rng.randint(0, 250) / 255
+        b = rng.randint(0, 250) / 255
         
         # Move to position
         t.penup()
@@ -771,11 +967,17 @@ def create_random_circles():
         t.end_fill()
     
     canvas = screen.getcanvas()
-    canvas.postscript(file="figure23.eps", colormode='color')
+    canvas.postscript(file=filename, colormode='color')
     screen.clear()
 
-def create_random_concentric_circles():
-    """Create concentric circles with random RGB values"""
+def create_random_concentric_circles(rng=random, filename="figure24.eps"):
+    """
+    Create concentric circles with random RGB values
+    
+    Args:
+        rng: Random number source (random.Random instance or the random module)
+        filename: Output EPS file name
+    """
     turtle.reset()
     turtle.clearscreen()
     
@@ -791,9 +993,9 @@ def create_random_concentric_circles():
         size = 120 - (count * 20)
         
         # Random RGB values with constraints (converting to 0-1 range)
-        r = random.randint(150, 250) / 255  # Higher range for red
-        g = random.randint(0, 250) / 255    # Full range for green
-        b = random.randint(0, 250) / 255    # Full range for blue
+        r = rng.randint(150, 250) / 255  # Higher range for red
+        g = rng.randint(0, 250) / 255    # Full range for green
+        b = rng.randint(0, 250) / 255    # Full range for blue
         
         # Move to position and draw
         t.penup()
@@ -807,12 +1009,338 @@ def create_random_concentric_circles():
         t.end_fill()
     
     canvas = screen.getcanvas()
-    canvas.postscript(file="figure24.eps", colormode='color')
+    canvas.postscript(file=filename, colormode='color')
     screen.clear()
 
+# ============= Figure Registry =============
+# Output name -> create function, in the order main() generates them
+FIGURES = {
+    "figure1": create_nested_shapes,
+    "figure2": create_nested_squares,
+    "figure3": create_shrinking_hexagons,
+    "figure4": create_shrinking_triangles,
+    "figure5": create_shrinking_circles,
+    "figure6": create_red_white_squares,
+    "figure7": create_blue_white_squares,
+    "figure8": create_white_blue_squares,
+    "figure9": create_angle_based_squares,
+    "figure10": create_alternating_color_squares,
+    "figure11": create_count_based_spiral,
+    "figure12": create_divided_squares,
+    "figure13": create_fifth_shape_pattern,
+    "figure14": create_third_shape_rotation,
+    "figure15": create_third_hexagon_pattern,
+    "figure16": create_even_odd_hexagon_pattern,
+    "figure17": create_moving_hexagons,
+    "figure18": create_moving_triangles,
+    "figure19": create_conditional_vertical_triangles,
+    "figure20": create_conditional_horizontal_triangles,
+    "figure21": create_rgb_pattern_circles,
+    "figure22": create_rgb_pattern_circles_green,
+    "figure23": create_random_circles,
+    "figure24": create_random_concentric_circles,
+}
+
+def run_figure(name, seed=None, output_dir=None):
+    """
+    Draw one registered figure.
+
+    Args:
+        name (str): Figure name from FIGURES
+        seed (int, optional): Base seed; the random module is seeded per figure
+            so a figure's output does not depend on which others ran before it
+        output_dir (str, optional): Write the figure's files here instead of
+            the current directory
+
+    Safe to call from several threads; figures are drawn one at a time.
+    """
+    global _output_dir
+    with _lock:
+        previous = _output_dir
+        if output_dir is not None:
+            _output_dir = str(output_dir)
+        try:
+            if seed is not None:
+                random.seed(f"{seed}:{name}")
+            FIGURES[name]()
+        finally:
+            _output_dir = previous
+
+def capture_scene(name, seed=0, write=True):
+    """
+    Draw a figure with the headless backend and return its recorded scene.
+
+    Args:
+        name (str): Figure name from FIGURES
+        seed (int, optional): Base seed passed to run_figure()
+        write (bool, optional): Still write the figure's EPS (and any
+            configured exports), which needs the headless backend selected.
+            With False nothing touches the filesystem, and the figure is drawn
+            with the headless backend on a fresh screen, whatever backend is
+            selected and ignoring the settings made with configure_exports()
+
+    Safe to call from several threads and alongside run_figure().
+    """
+    with _lock:
+        if not write:
+            scenes = []
+            with using_backend("headless"):
+                turtle.set_capture(scenes)
+                run_figure(name, seed)
+            return scenes[-1]
+        if turtle.__name__ != BACKENDS["headless"]:
+            raise ValueError("capture_scene(write=True) needs the headless backend")
+        captured = {}
+
+        def capture(scene, eps_file):
+            captured["scene"] = scene.snapshot()
+        turtle.add_exporter(capture)
+        try:
+            run_figure(name, seed)
+        finally:
+            turtle.remove_exporter(capture)
+        return captured["scene"]
+
+def generate_figures_serial(names=None, seed=None, session=False):
+    """
+    Render figures one after another in this process.
+
+    Args:
+        names (list, optional): Figure names from FIGURES. Defaults to all
+        seed (int, optional): Base seed passed to run_figure()
+        session (bool, optional): Draw every figure on one screen and turtle
+            with tracing off (see render_session.py)
+
+    Returns:
+        list: Result dicts like generate_figures_parallel()
+    """
+    if names is None:
+        names = list(FIGURES)
+    shared = None
+    if session:
+        import render_session
+        shared = render_session.RenderSession().open()
+    results = []
+    try:
+        for name in names:
+            start = time.perf_counter()
+            try:
+                run_figure(name, seed)
+                results.append({"figure": name, "seconds": time.perf_counter() - start,
+                                "error": None})
+            except Exception as e:
+                results.append({"figure": name, "seconds": None, "error": repr(e)})
+    finally:
+        if shared is not None:
+            shared.close()
+    return results
+
+# ============= Parallel Generation =============
+def _render_figure(name, backend, exports=None, seed=None):
+    """Worker entry point: draw one figure in this process's own screen"""
+    set_backend(backend)
+    configure_exports(**(exports or {}))
+    start = time.perf_counter()
+    run_figure(name, seed)
+    return time.perf_counter() - start
+
+def generate_figures_parallel(names=None, jobs=None, backend="tk", exports=None, seed=None):
+    """
+    Render figures across worker processes, one isolated screen per worker.
+
+    Args:
+        names (list, optional): Figure names from FIGURES. Defaults to all
+        jobs (int, optional): Number of worker processes. Defaults to CPU count
+        backend (str, optional): Turtle backend the workers draw with
+        exports (dict, optional): configure_exports() arguments for the workers
+        seed (int, optional): Base seed passed to run_figure()
+
+    Returns:
+        list: One dict per figure, in FIGURES order, with keys 'figure',
+            'seconds' (None on failure) and 'error' (None on success)
+    """
+    if names is None:
+        names = list(FIGURES)
+    results = {}
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {pool.submit(_render_figure, name, backend, exports, seed): name for name in names}
+        for future in as_completed(futures):
+            name = futures[future]
+            try:
+                results[name] = {"figure": name, "seconds": future.result(), "error": None}
+            except Exception as e:
+                results[name] = {"figure": name, "seconds": None, "error": repr(e)}
+    return [results[name] for name in names]
+
+def imap_bounded(pool, func, arguments, window):
+    """
+    Lazily map func over an iterable of argument tuples with an executor.
+
+    At most window tasks are in flight; the next argument tuple is only pulled
+    from the iterable once a result has been consumed, so generators of any
+    length can be fed through a pool without being materialised.
+
+    Yields:
+        Results in argument order; a task's exception is raised when its
+        result is reached
+    """
+    pending = deque()
+    for args in arguments:
+        pending.append(pool.submit(func, *args))
+        if len(pending) >= window:
+            yield pending.popleft().result()
+    while pending:
+        yield pending.popleft().result()
+
+# ============= Incremental Builds =============
+FIGURES_MANIFEST = ".figures-manifest.json"
+
+def _referenced_functions(func, seen):
+    """Collect func and the module-level functions it (transitively) references"""
+    if func.__name__ in seen:
+        return
+    seen[func.__name__] = func
+    for name in func.__code__.co_names:
+        value = globals().get(name)
+        if inspect.isfunction(value) and value.__module__ == func.__module__:
+            _referenced_functions(value, seen)
+
+def figure_outputs(name, exports=None):
+    """Return the files a figure writes in the current directory"""
+    outputs = [f"{name}.eps"]
+    if (exports or {}).get("png_dpi") is not None:
+        outputs.append(f"{name}.png")
+    if (exports or {}).get("svg"):
+        outputs.append(f"{name}.svg")
+    return outputs
+
+def figure_key(name, backend, exports=None, seed=None):
+    """
+    Hash everything a figure's output depends on.
+
+    The key covers the source of the create_* function and every helper it
+    reaches (drawing functions, color functions), their default parameters,
+    the seed, the backend and the export settings.
+
+    Returns:
+        str: Hex key, or None when the figure draws from an unseeded random
+            generator and cannot be reproduced
+    """
+    functions = {}
+    _referenced_functions(FIGURES[name], functions)
+    uses_random = any("random" in f.__code__.co_names or random in (f.__defaults__ or ())
+                      for f in functions.values())
+    if uses_random and seed is None:
+        return None
+    parts = [name, backend, sorted((exports or {}).items()), seed if uses_random else None,
+             platform.python_version()]
+    for func_name in sorted(functions):
+        func = functions[func_name]
+        parts.append(inspect.getsource(func))
+        parts.append(str(inspect.signature(func)))
+    if backend == "headless":
+        parts.append(inspect.getsource(turtle))
+        parts.append(inspect.getsource(importlib.import_module("eps_writer")))
+        if (exports or {}).get("cull"):
+            parts.append(inspect.getsource(importlib.import_module("occlusion")))
+        if (exports or {}).get("png_dpi") is not None:
+            parts.append(inspect.getsource(importlib.import_module("rasterizer")))
+        if (exports or {}).get("svg"):
+            parts.append(inspect.getsource(importlib.import_module("svg_writer")))
+    return build_cache.hash_key(*parts)
+
+def generate_figures_incremental(names=None, jobs=1, backend="tk", exports=None,
+                                 seed=None, manifest_path=FIGURES_MANIFEST):
+    """
+    Render only the figures whose inputs changed since the last run.
+
+    Returns:
+        list: Result dicts in FIGURES order; skipped figures have 'cached' True
+    """
+    if names is None:
+        names = list(FIGURES)
+    manifest = build_cache.BuildManifest(manifest_path)
+    keys = {name: figure_key(name, backend, exports, seed) for name in names}
+    stale = [name for name in names
+             if not manifest.is_fresh(figure_outputs(name, exports), keys[name])]
+    if jobs > 1 and len(stale) > 1:
+        built = generate_figures_parallel(stale, jobs, backend, exports, seed)
+    else:
+        built = generate_figures_serial(stale, seed)
+
+    results = {name: {"figure": name, "seconds": 0.0, "error": None, "cached": True}
+               for name in names}
+    for result in built:
+        name = result["figure"]
+        result["cached"] = False
+        results[name] = result
+        outputs = figure_outputs(name, exports)
+        if result["error"] is None and keys[name] is not None:
+            manifest.record(outputs, keys[name])
+        else:
+            manifest.forget(outputs)
+    manifest.save()
+    return [results[name] for name in names]
+
 # Update main() function to include new patterns
-def main():
+def main(argv=None):
     """Create all figures sequentially"""
+    parser = argparse.ArgumentParser(description="Generate the turtle pattern figures")
+    parser.add_argument("--backend", choices=sorted(BACKENDS),
+                        help="turtle implementation (default: $TURTLE_BACKEND or tk)")
+    parser.add_argument("--jobs", type=int, default=1,
+                        help="render figures in N worker processes (default: 1, sequential)")
+    parser.add_argument("--png-dpi", type=int, default=None,
+                        help="also write PNGs at this DPI with the built-in rasterizer "
+                             "(headless backend)")
+    parser.add_argument("--artifact-store", metavar="DIR", default=None,
+                        help="deduplicate identical figures through a content-addressed "
+                             "store (headless backend)")
+    parser.add_argument("--cull", action="store_true",
+                        help="remove hidden geometry before export (headless backend)")
+    parser.add_argument("--eps-dpi", type=int, default=None,
+                        help="write compact EPS rounded for this DPI (headless backend)")
+    parser.add_argument("--svg", action="store_true",
+                        help="also write SVGs for the web (headless backend)")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="seed the random figures (per figure) so they are reproducible")
+    parser.add_argument("--incremental", action="store_true",
+                        help=f"skip figures whose inputs match {FIGURES_MANIFEST}")
+    parser.add_argument("--session", action="store_true",
+                        help="draw all figures on one screen with tracing off "
+                             "(sequential runs; see render_session.py)")
+    args = parser.parse_args(argv)
+    if args.backend:
+        set_backend(args.backend)
+    exports = {"png_dpi": args.png_dpi, "artifact_dir": args.artifact_store, "cull": args.cull,
+               "eps_dpi": args.eps_dpi, "svg": args.svg}
+    configure_exports(**exports)
+
+    if args.jobs > 1 or args.incremental or args.seed is not None or args.session:
+        backend = args.backend or os.environ.get("TURTLE_BACKEND", "tk")
+        if args.incremental:
+            results = generate_figures_incremental(jobs=args.jobs, backend=backend,
+                                                   exports=exports, seed=args.seed)
+        elif args.jobs > 1:
+            print(f"Creating {len(FIGURES)} figures with {args.jobs} workers...")
+            results = generate_figures_parallel(jobs=args.jobs, backend=backend,
+                                                exports=exports, seed=args.seed)
+        else:
+            results = generate_figures_serial(seed=args.seed, session=args.session)
+        failed = [r for r in results if r["error"]]
+        for r in results:
+            if r["error"]:
+                print(f"  {r['figure']}: FAILED {r['error']}")
+            elif r.get("cached"):
+                print(f"  {r['figure']}: up to date")
+            else:
+                print(f"  {r['figure']}: {r['seconds']:.2f}s")
+        if failed:
+            print(f"{len(failed)} of {len(results)} figures failed")
+            return 1
+        print("All figures have been created successfully!")
+        return 0
+
     try:
         #'''
         print("Creating original figures...")
@@ -864,4 +1392,4 @@ def main():
             pass
 
 if __name__ == "__main__":
-    main()
+    raise SystemExit(main())
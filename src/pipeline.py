@@ -0,0 +1,217 @@
+'''
+Pipelined figure generation and Ghostscript conversion.
+
+Instead of writing all EPS files first and converting them afterwards, each
+figure is queued for conversion as soon as its EPS is written, while the next
+figure renders. Figures render one at a time on a dedicated thread (turtle is
+not thread-safe); gs processes run as asyncio subprocesses pulling from a
+bounded queue, so rendering pauses when conversion falls behind instead of
+piling up EPS files. Wall time approaches max(render, convert) rather than
+render + convert, and the report names the stage that limits it from how
+long each side waited on the other.
+
+    python3 src/pipeline.py --output-dir examples --dpi 300 --workers 4
+'''
+
+import argparse
+import asyncio
+import importlib
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import make_figures
+
+converter = importlib.import_module("eps-to-png-converter")
+
+def bottleneck_report(results, wall, workers, render_blocked, convert_idle):
+    """
+    Summarise where a pipeline run spent its time.
+
+    Args:
+        results (list): Per-figure dicts from run_pipeline()
+        wall (float): Elapsed seconds of the whole run
+        workers (int): Concurrent gs processes
+        render_blocked (float): Seconds rendering waited on a full queue
+        convert_idle (float): Seconds gs workers waited on an empty queue, summed
+
+    Returns:
+        dict: Stage totals, 'serial' (render + convert), 'bound' (the
+            max(render, convert / workers) a perfect pipeline reaches),
+            'bottleneck' and the two wait times. The bottleneck is 'convert'
+            when rendering waited on a full queue longer than an average gs
+            worker waited on an empty one, 'render' otherwise
+    """
+    render = sum(r["render_seconds"] or 0.0 for r in results)
+    convert = sum(r["conversion"]["seconds"] for r in results if r["conversion"])
+    return {
+        "wall": wall,
+        "render": render,
+        "convert": convert,
+        "workers": workers,
+        "serial": render + convert,
+        "bound": max(render, convert / workers),
+        "bottleneck": "convert" if render_blocked > convert_idle / workers else "render",
+        "render_blocked": render_blocked,
+        "convert_idle": convert_idle,
+    }
+
+def _close_screen():
+    try:
+        make_figures.turtle.bye()
+    except Exception:
+        pass
+
+async def _run(names, output_dir, dpi, workers, queue_size, seed, session, max_memory,
+               profile, palette):
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=queue_size)
+    results = {name: {"figure": name, "render_seconds": None, "error": None, "conversion": None}
+               for name in names}
+    waits = {"render_blocked": 0.0, "convert_idle": 0.0}
+
+    async def produce():
+        shared = None
+        # One thread owns the turtle screen for the whole run
+        with ThreadPoolExecutor(max_workers=1) as renderer:
+            try:
+                if session:
+                    import render_session
+                    shared = render_session.RenderSession()
+                    await loop.run_in_executor(renderer, shared.open)
+                for name in names:
+                    start = time.perf_counter()
+                    try:
+                        await loop.run_in_executor(renderer, make_figures.run_figure, name, seed,
+                                                   output_dir)
+                    except Exception as e:
+                        results[name]["error"] = repr(e)
+                        continue
+                    finally:
+                        results[name]["render_seconds"] = time.perf_counter() - start
+                    start = time.perf_counter()
+                    await queue.put(name)
+                    waits["render_blocked"] += time.perf_counter() - start
+            finally:
+                if shared is not None:
+                    await loop.run_in_executor(renderer, shared.close)
+                # Tk must be closed from the thread that created the screen
+                await loop.run_in_executor(renderer, _close_screen)
+                for _ in range(workers):
+                    await queue.put(None)
+
+    async def convert():
+        while True:
+            start = time.perf_counter()
+            name = await queue.get()
+            waits["convert_idle"] += time.perf_counter() - start
+            if name is None:
+                return
+            eps, png = output_dir / f"{name}.eps", output_dir / f"{name}.png"
+            if palette:
+                result = await asyncio.to_thread(converter.convert_eps_to_compact_png, eps, png,
+                                                 dpi, max_memory, profile)
+            else:
+                result = await converter.convert_eps_to_png_async(eps, png, dpi, max_memory,
+                                                                  profile)
+            results[name]["conversion"] = result
+            if not result["success"]:
+                results[name]["error"] = result["stderr"].strip() or "conversion failed"
+
+    start = time.perf_counter()
+    await asyncio.gather(produce(), *(convert() for _ in range(workers)))
+    wall = time.perf_counter() - start
+    ordered = [results[name] for name in names]
+    return ordered, bottleneck_report(ordered, wall, workers, waits["render_blocked"],
+                                      waits["convert_idle"])
+
+def run_pipeline(names=None, output_dir=None, dpi=300, workers=None, queue_size=None,
+                 seed=None, session=False, max_memory=None, profile=None, palette=False):
+    """
+    Render figures and convert each one to PNG as soon as its EPS exists.
+
+    EPS files are written to output_dir next to their PNGs. The turtle
+    screen lives on the rendering thread and is closed when the run ends.
+
+    Args:
+        names (list, optional): Figure names from make_figures.FIGURES. Defaults to all
+        output_dir (str, optional): Directory for the PNGs. Defaults to the current directory
+        dpi (int, optional): PNG resolution. Defaults to 300
+        workers (int, optional): Concurrent gs processes. Defaults to CPU count
+        queue_size (int, optional): Rendered figures waiting for gs before
+            rendering pauses. Defaults to 2 per worker
+        seed (int, optional): Seed for the random figures
+        session (bool, optional): Render through a render_session.RenderSession
+        max_memory (int, optional): Per-process gs page buffer cap in bytes
+            (see converter.build_gs_command())
+        profile (dict, optional): gs rendering options (see converter.profile_arguments())
+        palette (bool, optional): Write grayscale or indexed PNGs where the
+            colors fit (see converter.convert_eps_to_compact_png())
+
+    Returns:
+        tuple: (list of per-figure dicts with 'figure', 'render_seconds',
+            'conversion' (a convert_eps_to_png_result()-style dict or None)
+            and 'error'; bottleneck_report() dict)
+    """
+    names = list(make_figures.FIGURES) if names is None else names
+    output_dir = Path(output_dir).resolve() if output_dir is not None else Path.cwd()
+    output_dir.mkdir(parents=True, exist_ok=True)
+    workers = max(1, workers or os.cpu_count() or 1)
+    queue_size = queue_size or 2 * workers
+    return asyncio.run(_run(names, output_dir, dpi, workers, queue_size, seed, session,
+                            max_memory, profile, palette))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render figures and convert them to PNG "
+                                                 "in one pipeline")
+    parser.add_argument("figures", nargs="*", help="figure names (default: all)")
+    parser.add_argument("--output-dir", default=None,
+                        help="directory for EPS and PNG files (default: .)")
+    parser.add_argument("--dpi", type=int, default=300)
+    parser.add_argument("--workers", type=int, default=None,
+                        help="concurrent gs processes (default: CPU count)")
+    parser.add_argument("--queue-size", type=int, default=None,
+                        help="figures waiting for gs before rendering pauses "
+                             "(default: 2 per worker)")
+    parser.add_argument("--backend", choices=sorted(make_figures.BACKENDS),
+                        help="turtle implementation (default: $TURTLE_BACKEND or tk)")
+    parser.add_argument("--seed", type=int, default=None, help="seed for the random figures")
+    parser.add_argument("--session", action="store_true",
+                        help="render on one persistent screen (see render_session.py)")
+    parser.add_argument("--max-memory", type=int, default=None, metavar="MB",
+                        help="cap each gs page buffer; larger pages render in bands")
+    parser.add_argument("--profile", default=None,
+                        help=f"gs render profile: {', '.join(converter.PROFILES)} or one saved "
+                             f"in {converter.PROFILE_FILE} by gs_tune.py")
+    parser.add_argument("--palette", action="store_true",
+                        help="write grayscale or 8-bit indexed PNGs when a figure's colors fit")
+    args = parser.parse_args(argv)
+    if args.backend:
+        make_figures.set_backend(args.backend)
+    profile = None
+    if args.profile is not None:
+        profiles = converter.load_profiles()
+        if args.profile not in profiles:
+            parser.error(f"unknown profile {args.profile!r}; expected one of {sorted(profiles)}")
+        profile = profiles[args.profile]
+    max_memory = args.max_memory << 20 if args.max_memory is not None else None
+
+    results, report = run_pipeline(args.figures or None, args.output_dir, args.dpi,
+                                   args.workers, args.queue_size, args.seed, args.session,
+                                   max_memory, profile, args.palette)
+    for r in results:
+        if r["error"]:
+            print(f"  {r['figure']}: FAILED {r['error']}")
+        else:
+            print(f"  {r['figure']}: render {r['render_seconds']:.2f}s, "
+                  f"convert {r['conversion']['seconds']:.2f}s")
+    print(f"wall {report['wall']:.2f}s; render {report['render']:.2f}s, "
+          f"convert {report['convert']:.2f}s over {report['workers']} workers; "
+          f"sequential would be {report['serial']:.2f}s, best possible {report['bound']:.2f}s")
+    print(f"bottleneck: {report['bottleneck']} (rendering blocked on a full queue "
+          f"{report['render_blocked']:.2f}s, gs workers idle {report['convert_idle']:.2f}s)")
+    return 1 if any(r["error"] for r in results) else 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
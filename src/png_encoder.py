@@ -0,0 +1,237 @@
+'''
+Minimal streaming PNG encoder (standard library only).
+
+Rows are compressed as they are written, so an image never has to be held in
+memory as a whole.
+'''
+
+import io
+import re
+import struct
+import zlib
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# PNG color types
+GRAY = 0
+RGB = 2
+PALETTE = 3
+
+CHANNELS = {GRAY: 1, RGB: 3, PALETTE: 1}
+
+def chunk(kind, data):
+    """Return one PNG chunk: length, type, data and CRC"""
+    return (struct.pack(">I", len(data)) + kind + data
+            + struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff))
+
+def header_chunk(width, height, color_type=RGB, bit_depth=8):
+    """Return the IHDR chunk"""
+    return chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, bit_depth,
+                                      color_type, 0, 0, 0))
+
+def palette_chunk(palette):
+    """Return the PLTE chunk for a list of (r, g, b) byte tuples"""
+    return chunk(b"PLTE", bytes(c for rgb in palette for c in rgb))
+
+class PNGWriter:
+    """
+    Write a PNG one row at a time.
+
+    Args:
+        file: Binary file object to write to
+        width (int): Image width in pixels
+        height (int): Image height in pixels
+        color_type (int, optional): GRAY, RGB or PALETTE. Defaults to RGB
+        palette (list, optional): (r, g, b) tuples, required for PALETTE
+        bit_depth (int, optional): 8, or 1/2/4 for packed GRAY/PALETTE rows
+        level (int, optional): zlib compression level. Defaults to 6
+    """
+
+    def __init__(self, file, width, height, color_type=RGB, palette=None,
+                 bit_depth=8, level=6):
+        self.file = file
+        self.width = width
+        self.height = height
+        self.rows_written = 0
+        self.row_bytes = (width * CHANNELS[color_type] * bit_depth + 7) // 8
+        self._compressor = zlib.compressobj(level)
+        self._pending = []
+        self._pending_size = 0
+        file.write(PNG_SIGNATURE)
+        file.write(header_chunk(width, height, color_type, bit_depth))
+        if color_type == PALETTE:
+            if not palette:
+                raise ValueError("palette PNG needs a palette")
+            file.write(palette_chunk(palette))
+
+    def write_row(self, row):
+        """Append one row of already packed pixel bytes"""
+        if len(row) != self.row_bytes:
+            raise ValueError(f"row has {len(row)} bytes, expected {self.row_bytes}")
+        # Filter type 0 (None); flat-color figures compress well without filtering
+        self._buffer(self._compressor.compress(b"\x00" + bytes(row)))
+        self.rows_written += 1
+
+    def write_rows(self, rows):
+        for row in rows:
+            self.write_row(row)
+
+    def _buffer(self, data):
+        if data:
+            self._pending.append(data)
+            self._pending_size += len(data)
+        if self._pending_size >= 1 << 16:
+            self._flush_idat()
+
+    def _flush_idat(self):
+        if self._pending:
+            self.file.write(chunk(b"IDAT", b"".join(self._pending)))
+            self._pending = []
+            self._pending_size = 0
+
+    def close(self):
+        """Finish the compressed stream and write the trailer"""
+        if self.rows_written != self.height:
+            raise ValueError(f"wrote {self.rows_written} of {self.height} rows")
+        self._buffer(self._compressor.flush())
+        self._flush_idat()
+        self.file.write(chunk(b"IEND", b""))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+
+def encode_png(width, height, rows, color_type=RGB, palette=None, bit_depth=8):
+    """
+    Encode complete rows into PNG bytes.
+
+    Args:
+        width (int): Image width in pixels
+        height (int): Image height in pixels
+        rows: Iterable of packed row bytes
+        color_type (int, optional): GRAY, RGB or PALETTE. Defaults to RGB
+        palette (list, optional): (r, g, b) tuples for PALETTE images
+        bit_depth (int, optional): Bits per sample. Defaults to 8
+
+    Returns:
+        bytes: The PNG file contents
+    """
+    buffer = io.BytesIO()
+    with PNGWriter(buffer, width, height, color_type, palette, bit_depth) as writer:
+        writer.write_rows(rows)
+    return buffer.getvalue()
+
+# ============= Indexed Output =============
+# One run of identical 3-byte pixels; matches stay aligned on pixel boundaries
+_RUN = re.compile(rb"(...)\1*", re.DOTALL)
+
+def color_runs(row):
+    """Yield (rgb bytes, pixel count) for each run of equal pixels in an RGB row"""
+    for match in _RUN.finditer(row):
+        yield match.group(1), (match.end() - match.start()) // 3
+
+def find_palette(rows, limit=256):
+    """
+    Return the distinct colors of RGB rows, or None if there are more than limit.
+
+    Work is per run of equal pixels rather than per pixel, which suits flat
+    figures; the scan stops as soon as the limit is exceeded.
+    """
+    colors = set()
+    for row in rows:
+        for rgb, _ in color_runs(row):
+            if rgb not in colors:
+                colors.add(rgb)
+                if len(colors) > limit:
+                    return None
+    return sorted(colors)
+
+def pack_row(indices, bit_depth):
+    """Pack one byte per sample into bit_depth-bit samples, most significant first"""
+    if bit_depth == 8:
+        return bytes(indices)
+    per_byte = 8 // bit_depth
+    size = (len(indices) + per_byte - 1) // per_byte
+    packed = 0
+    for k in range(per_byte):
+        shift = 8 - bit_depth * (k + 1)
+        part = bytes(indices[k::per_byte]).ljust(size, b"\x00")
+        # Big integers OR the shifted samples together at C speed
+        packed |= int.from_bytes(part.translate(_shift_table(shift)), "big")
+    return packed.to_bytes(size, "big")
+
+_shift_tables = {}
+
+def _shift_table(shift):
+    table = _shift_tables.get(shift)
+    if table is None:
+        table = _shift_tables[shift] = bytes((v << shift) & 0xff for v in range(256))
+    return table
+
+def indexed_rows(rows, palette):
+    """
+    Map RGB rows onto palette indices, checking every row maps back exactly.
+
+    Yields:
+        bytes: One index byte per pixel
+
+    Raises:
+        ValueError: If a row holds a color missing from the palette or the
+            indices do not expand back to the same pixels
+    """
+    index = {rgb: bytes([i]) for i, rgb in enumerate(palette)}
+    channels = [bytes(rgb[c] for rgb in palette).ljust(256, b"\x00") for c in range(3)]
+    for row in rows:
+        try:
+            indices = b"".join(index[rgb] * count for rgb, count in color_runs(row))
+        except KeyError:
+            raise ValueError("row has a color outside the palette")
+        # Quality check: expand the indices back to RGB and compare
+        expanded = bytearray(len(indices) * 3)
+        for c in range(3):
+            expanded[c::3] = indices.translate(channels[c])
+        if expanded != row:
+            raise ValueError("indexed row does not reproduce the source pixels")
+        yield indices
+
+def write_compact_png(file, width, height, rows, level=6):
+    """
+    Write RGB rows as the smallest lossless PNG type they fit.
+
+    Rows whose colors are all grays become an 8-bit grayscale PNG; up to 256
+    colors become an indexed PNG with 1, 2, 4 or 8 bits per pixel; anything
+    else stays RGB. Indexed rows are checked to reproduce the input exactly.
+
+    Args:
+        file: Binary file object
+        width (int): Image width in pixels
+        height (int): Image height in pixels
+        rows: RGB rows, read twice: a list, or an iterable that starts over
+            on each iteration such as downsample.PPMRows, but not an iterator
+        level (int, optional): zlib compression level
+
+    Returns:
+        int: The color type written (GRAY, PALETTE or RGB)
+    """
+    if iter(rows) is rows:
+        raise TypeError("write_compact_png() reads its rows twice; an iterator would run dry")
+    palette = find_palette(rows)
+    if palette is None:
+        with PNGWriter(file, width, height, RGB, level=level) as writer:
+            writer.write_rows(rows)
+        return RGB
+    if all(rgb[0] == rgb[1] == rgb[2] for rgb in palette):
+        # The gray level is the sample itself, no PLTE needed
+        gray = [bytes([v, v, v]) for v in range(256)]
+        with PNGWriter(file, width, height, GRAY, level=level) as writer:
+            writer.write_rows(indexed_rows(rows, gray))
+        return GRAY
+    bit_depth = next(bits for bits in (1, 2, 4, 8) if len(palette) <= 1 << bits)
+    with PNGWriter(file, width, height, PALETTE, [tuple(rgb) for rgb in palette],
+                   bit_depth, level) as writer:
+        writer.write_rows(pack_row(indices, bit_depth)
+                          for indices in indexed_rows(rows, palette))
+    return PALETTE
@@ -0,0 +1,457 @@
+'''
+Anti-aliased scanline rasterizer for headless_turtle display lists.
+
+Turns recorded geometry straight into PNG, skipping the EPS -> Ghostscript
+round trip. Coverage is computed exactly along each scanline and sampled at
+several sub-scanlines per pixel row; runs of fully covered pixels are filled
+with slice assignment and partially covered runs are blended with bytes
+translation tables, so the per-pixel Python work is limited to edge pixels.
+'''
+
+import math
+import os
+
+import artifact_store
+import eps_writer
+import png_encoder
+
+DEFAULT_SAMPLES = 4
+
+def to_bytes(rgb):
+    """Convert an RGB tuple in the 0-1 range to 0-255 integers"""
+    return tuple(int(round(c * 255)) for c in rgb)
+
+_blend_tables = {}
+
+def _blend_table(value, alpha):
+    """Translation table blending every byte toward value by alpha/255"""
+    key = (value, alpha)
+    table = _blend_tables.get(key)
+    if table is None:
+        a = alpha / 255
+        table = bytes(int(old + (value - old) * a + 0.5) for old in range(256))
+        _blend_tables[key] = table
+    return table
+
+class Raster:
+    """
+    RGB pixel buffer with anti-aliased polygon filling and stroking.
+
+    Args:
+        width (int): Width in pixels
+        height (int): Height in pixels
+        background (tuple, optional): (r, g, b) bytes. Defaults to white
+        top (int, optional): Image row held in rows[0], for a band of a larger
+            image; drawing still uses whole-image pixel coordinates
+    """
+
+    def __init__(self, width, height, background=(255, 255, 255), top=0):
+        self.width = width
+        self.height = height
+        self.top = top
+        self.background = tuple(background)
+        self.rows = [bytearray(bytes(self.background) * width) for _ in range(height)]
+
+    def fill_path(self, subpaths, color, rule="evenodd", samples=DEFAULT_SAMPLES):
+        """
+        Fill closed subpaths given in pixel coordinates (y grows downward).
+
+        Args:
+            subpaths (list): Lists of (x, y) vertices; each is closed implicitly
+            color (tuple): (r, g, b) bytes
+            rule (str, optional): 'evenodd' or 'nonzero'. Defaults to 'evenodd'
+            samples (int, optional): Sub-scanlines per pixel row
+
+        Returns:
+            tuple: (x0, y0, x1, y1) pixel bounds that were touched, or None
+        """
+        edges = []
+        for points in subpaths:
+            n = len(points)
+            for i in range(n):
+                x0, y0 = points[i]
+                x1, y1 = points[(i + 1) % n]
+                if y0 == y1:
+                    continue
+                if y0 < y1:
+                    edges.append((y0, y1, x0, (x1 - x0) / (y1 - y0), 1))
+                else:
+                    edges.append((y1, y0, x1, (x0 - x1) / (y0 - y1), -1))
+        if not edges:
+            return None
+        edges.sort()
+        top = max(self.top, int(math.floor(edges[0][0])))
+        bottom = min(self.top + self.height, int(math.ceil(max(e[1] for e in edges))))
+        if top >= bottom:
+            return None
+
+        nonzero = rule == "nonzero"
+        offsets = [(s + 0.5) / samples for s in range(samples)]
+        active = []
+        next_edge = 0
+        bounds = None
+        for py in range(top, bottom):
+            while next_edge < len(edges) and edges[next_edge][0] < py + 1:
+                active.append(edges[next_edge])
+                next_edge += 1
+            active = [e for e in active if e[1] > py]
+            if not active:
+                continue
+
+            spans_by_sample = []
+            for offset in offsets:
+                sy = py + offset
+                crossings = sorted((x + (sy - ytop) * slope, direction)
+                                   for ytop, ybot, x, slope, direction in active
+                                   if ytop <= sy < ybot)
+                spans = []
+                if nonzero:
+                    winding = 0
+                    for x, direction in crossings:
+                        if winding == 0:
+                            start = x
+                        winding += direction
+                        if winding == 0 and x > start:
+                            spans.append((start, x))
+                else:
+                    for i in range(0, len(crossings) - 1, 2):
+                        if crossings[i + 1][0] > crossings[i][0]:
+                            spans.append((crossings[i][0], crossings[i + 1][0]))
+                spans_by_sample.append(spans)
+
+            row_bounds = self._cover_row(self.rows[py - self.top], spans_by_sample, color,
+                                         samples)
+            if row_bounds is not None:
+                x0, x1 = row_bounds
+                if bounds is None:
+                    bounds = [x0, py, x1, py + 1]
+                else:
+                    bounds[0] = min(bounds[0], x0)
+                    bounds[2] = max(bounds[2], x1)
+                    bounds[3] = py + 1
+        return tuple(bounds) if bounds else None
+
+    def _cover_row(self, row, spans_by_sample, color, samples):
+        """
+        Blend one pixel row given the covered spans of each sub-scanline.
+
+        Sweeps the span ends left to right: between two consecutive ends the
+        number of covering sub-scanlines is constant, so whole pixels inside
+        such an interval are filled (or blended) as one run, and only the
+        pixels that contain a span end accumulate fractional coverage.
+        """
+        width = self.width
+        events = []
+        for spans in spans_by_sample:
+            for xa, xb in spans:
+                xa = min(max(xa, 0.0), width)
+                xb = min(max(xb, 0.0), width)
+                if xb > xa:
+                    events.append((xa, 1))
+                    events.append((xb, -1))
+        if not events:
+            return None
+        events.sort()
+
+        partial = {}
+        runs = []
+        count = 0
+        x0 = events[0][0]
+        for x1, delta in events:
+            if count and x1 > x0:
+                p0 = int(x0)
+                p1 = int(x1)
+                if p0 == p1:
+                    partial[p0] = partial.get(p0, 0.0) + count * (x1 - x0)
+                else:
+                    if x0 > p0:
+                        partial[p0] = partial.get(p0, 0.0) + count * (p0 + 1 - x0)
+                        p0 += 1
+                    if p1 > p0:
+                        runs.append((p0, p1, count))
+                    if x1 > p1:
+                        partial[p1] = partial.get(p1, 0.0) + count * (x1 - p1)
+            count += delta
+            x0 = x1
+
+        solid = bytes(color)
+        for a, b, inside in runs:
+            if inside == samples:
+                row[3 * a:3 * b] = solid * (b - a)
+            else:
+                alpha = int(inside / samples * 255 + 0.5)
+                for c in range(3):
+                    row[3 * a + c:3 * b:3] = row[3 * a + c:3 * b:3].translate(
+                        _blend_table(color[c], alpha))
+
+        for p, covered in partial.items():
+            alpha = int(covered / samples * 255 + 0.5)
+            if alpha <= 0:
+                continue
+            i = 3 * p
+            if alpha >= 255:
+                row[i:i + 3] = solid
+            else:
+                a = alpha / 255
+                row[i] = int(row[i] + (color[0] - row[i]) * a + 0.5)
+                row[i + 1] = int(row[i + 1] + (color[1] - row[i + 1]) * a + 0.5)
+                row[i + 2] = int(row[i + 2] + (color[2] - row[i + 2]) * a + 0.5)
+
+        left = int(events[0][0])
+        right = min(width, int(math.ceil(events[-1][0])))
+        return (left, max(right, left + 1))
+
+    def stroke_polyline(self, points, width, color, samples=DEFAULT_SAMPLES):
+        """
+        Stroke a polyline with round caps and joins (Tk's canvas style).
+
+        Args:
+            points (list): (x, y) vertices in pixel coordinates
+            width (float): Line width in pixels
+            color (tuple): (r, g, b) bytes
+
+        Returns:
+            tuple: (x0, y0, x1, y1) pixel bounds that were touched, or None
+        """
+        return self.fill_path(stroke_outline(points, width), color, "nonzero", samples)
+
+    def pixel(self, x, y):
+        """Return the (r, g, b) bytes at a pixel"""
+        i = 3 * x
+        return tuple(self.rows[y - self.top][i:i + 3])
+
+    def write_png(self, file):
+        """Write the raster as an RGB PNG to a path or binary file object"""
+        if isinstance(file, (str, bytes)) or hasattr(file, "__fspath__"):
+            with open(file, "wb") as f:
+                self.write_png(f)
+            return
+        with png_encoder.PNGWriter(file, self.width, self.height) as writer:
+            writer.write_rows(self.rows)
+
+    def to_png(self):
+        """Return the raster encoded as RGB PNG bytes"""
+        return png_encoder.encode_png(self.width, self.height, self.rows)
+
+def stroke_outline(points, width):
+    """
+    Return same-orientation subpaths whose nonzero union is a round-capped stroke.
+
+    Each segment becomes a rectangle and each vertex a small disc, which
+    gives round joins and caps without computing miter geometry.
+    """
+    half = width / 2.0
+    sides = max(8, int(math.pi * half) * 2)
+    disc = [(half * math.cos(-2 * math.pi * k / sides),
+             half * math.sin(-2 * math.pi * k / sides)) for k in range(sides)]
+    subpaths = []
+    previous = None
+    for x, y in points:
+        if previous == (x, y):
+            continue
+        if previous is not None:
+            px, py = previous
+            length = math.hypot(x - px, y - py)
+            nx, ny = -(y - py) / length * half, (x - px) / length * half
+            quad = [(px + nx, py + ny), (x + nx, y + ny), (x - nx, y - ny), (px - nx, py - ny)]
+            if _signed_area(quad) > 0:
+                quad.reverse()
+            subpaths.append(quad)
+        subpaths.append([(x + dx, y + dy) for dx, dy in disc])
+        previous = (x, y)
+    return subpaths
+
+def _signed_area(points):
+    area = 0.0
+    for (x0, y0), (x1, y1) in zip(points, points[1:] + points[:1]):
+        area += x0 * y1 - x1 * y0
+    return area / 2.0
+
+def pixel_size(scene, dpi):
+    """Return the (width, height) in pixels of a scene rasterized at dpi"""
+    scale = dpi / 72.0
+    return (max(1, int(math.ceil(scene.width * scale - 1e-9))),
+            max(1, int(math.ceil(scene.height * scale - 1e-9))))
+
+def pixel_transform(scene, dpi):
+    """Return a function mapping world coordinates to pixel coordinates"""
+    to_page = eps_writer.page_transform(scene)
+    scale = dpi / 72.0
+    page_height = scene.height
+
+    def to_pixel(x, y):
+        px, py = to_page(x, y)
+        return (px * scale, (page_height - py) * scale)
+    return to_pixel
+
+# Maximum distance, in pixels, between a true circle and its tessellation
+CIRCLE_TOLERANCE = 0.05
+
+def circle_segments(radius, tolerance=CIRCLE_TOLERANCE):
+    """Return the segment count keeping a circle's chord error under tolerance pixels"""
+    if radius <= tolerance:
+        return 8
+    return max(8, int(math.ceil(math.pi / math.acos(1 - tolerance / radius))))
+
+def circle_points(cx, cy, radius, tolerance=CIRCLE_TOLERANCE):
+    """Tessellate a circle adaptively for its on-screen radius"""
+    n = circle_segments(radius, tolerance)
+    step = 2 * math.pi / n
+    return [(cx + radius * math.cos(k * step), cy + radius * math.sin(k * step))
+            for k in range(n)]
+
+def _pixel_circle(circle, to_pixel):
+    cx, cy, radius = circle
+    (px, py), (ex, _) = to_pixel(cx, cy), to_pixel(cx + radius, cy)
+    return px, py, abs(ex - px)
+
+def _hole_paths(item, to_pixel):
+    """Pixel subpaths of the holes cut out of a polygon item"""
+    paths = []
+    for hole in item.holes:
+        if hole.circle is not None:
+            paths.append(circle_points(*_pixel_circle(hole.circle, to_pixel)))
+        else:
+            paths.append([to_pixel(x, y) for x, y in hole.points])
+    return paths
+
+def draw_item(raster, item, to_pixel, scale, samples=DEFAULT_SAMPLES):
+    """
+    Rasterize one display item.
+
+    Args:
+        raster (Raster): Target raster
+        item (DisplayItem): Polygon or line from the display list
+        to_pixel: World -> pixel mapping from pixel_transform()
+        scale (float): Pixels per canvas pixel (dpi / 72), for line widths
+
+    Returns:
+        tuple: (x0, y0, x1, y1) pixel bounds that were touched, or None
+    """
+    if len(item.points) < 2:
+        return None
+    if item.circle is not None:
+        # True circle rather than turtle's fixed 12-60 segment polyline: the
+        # segment count follows the radius in pixels, and a stroked circle is
+        # a single even-odd annulus instead of per-segment caps and joins
+        px, py, radius_px = _pixel_circle(item.circle, to_pixel)
+        if item.kind == "polygon":
+            return raster.fill_path([circle_points(px, py, radius_px)]
+                                    + _hole_paths(item, to_pixel),
+                                    to_bytes(item.fill), "evenodd", samples)
+        half = item.width * scale / 2.0
+        rings = [circle_points(px, py, radius_px + half)]
+        if radius_px > half:
+            rings.append(circle_points(px, py, radius_px - half))
+        return raster.fill_path(rings, to_bytes(item.outline), "evenodd", samples)
+    points = [to_pixel(x, y) for x, y in item.points]
+    if item.kind == "polygon":
+        return raster.fill_path([points] + _hole_paths(item, to_pixel),
+                                to_bytes(item.fill), "evenodd", samples)
+    return raster.stroke_polyline(points, item.width * scale, to_bytes(item.outline), samples)
+
+def render_scene(scene, dpi=300, samples=DEFAULT_SAMPLES):
+    """
+    Rasterize a recorded scene.
+
+    Args:
+        scene: RecordingScreen or compatible scene (width, height, world,
+            background, items)
+        dpi (int, optional): Output resolution; 72 gives one pixel per point
+        samples (int, optional): Sub-scanlines per pixel row for anti-aliasing
+
+    Returns:
+        Raster: The rendered image
+    """
+    width, height = pixel_size(scene, dpi)
+    raster = Raster(width, height, to_bytes(scene.background))
+    to_pixel = pixel_transform(scene, dpi)
+    scale = dpi / 72.0
+    for item in scene.items:
+        draw_item(raster, item, to_pixel, scale, samples)
+    return raster
+
+# ============= Banded Rendering =============
+# Pixel memory of one band; images larger than this are drawn band by band
+DEFAULT_BAND_BYTES = 64 << 20
+
+def band_height(width, max_bytes=DEFAULT_BAND_BYTES):
+    """Rows per band so a band of RGB pixels stays under max_bytes"""
+    return max(1, max_bytes // (3 * width))
+
+def _item_rows(item, to_pixel, scale):
+    """(top, bottom) pixel rows an item can touch"""
+    half = item.width * scale / 2.0 if item.kind == "line" else 0.0
+    if item.circle is not None:
+        _, py, radius_px = _pixel_circle(item.circle, to_pixel)
+        return py - radius_px - half - 1, py + radius_px + half + 1
+    ys = [to_pixel(x, y)[1] for x, y in item.points]
+    return min(ys) - half - 1, max(ys) + half + 1
+
+def render_rows(scene, dpi=300, samples=DEFAULT_SAMPLES, max_bytes=DEFAULT_BAND_BYTES):
+    """
+    Rasterize a scene one horizontal band at a time.
+
+    Each band is a Raster covering a slice of the image rows and only the
+    items reaching into it are drawn there, so memory is bounded by
+    max_bytes whatever the resolution. The rows are identical to those of
+    render_scene().
+
+    Yields:
+        bytearray: RGB pixel rows, top to bottom
+    """
+    width, height = pixel_size(scene, dpi)
+    to_pixel = pixel_transform(scene, dpi)
+    scale = dpi / 72.0
+    background = to_bytes(scene.background)
+    items = [(item, *_item_rows(item, to_pixel, scale))
+             for item in scene.items if len(item.points) >= 2]
+    rows_per_band = band_height(width, max_bytes)
+    for top in range(0, height, rows_per_band):
+        band = Raster(width, min(rows_per_band, height - top), background, top)
+        bottom = top + band.height
+        for item, item_top, item_bottom in items:
+            if item_bottom >= top and item_top < bottom:
+                draw_item(band, item, to_pixel, scale, samples)
+        yield from band.rows
+        del band
+
+def write_png_banded(scene, file, dpi=300, samples=DEFAULT_SAMPLES, max_bytes=DEFAULT_BAND_BYTES):
+    """Stream a scene into an RGB PNG band by band (see render_rows())"""
+    if isinstance(file, (str, bytes)) or hasattr(file, "__fspath__"):
+        with open(file, "wb") as f:
+            write_png_banded(scene, f, dpi, samples, max_bytes)
+        return
+    width, height = pixel_size(scene, dpi)
+    with png_encoder.PNGWriter(file, width, height) as writer:
+        writer.write_rows(render_rows(scene, dpi, samples, max_bytes))
+
+def write_scene_png(scene, file, dpi=300, samples=DEFAULT_SAMPLES):
+    """Write a scene as PNG, in bands when a whole raster would exceed DEFAULT_BAND_BYTES"""
+    width, height = pixel_size(scene, dpi)
+    if 3 * width * height > DEFAULT_BAND_BYTES:
+        write_png_banded(scene, file, dpi, samples)
+    else:
+        render_scene(scene, dpi, samples).write_png(file)
+
+def png_exporter(dpi=300, samples=DEFAULT_SAMPLES, store=None):
+    """
+    Return a headless_turtle exporter writing a PNG next to each EPS file.
+
+    Args:
+        dpi (int, optional): Output resolution. Defaults to 300
+        samples (int, optional): Sub-scanlines per pixel row
+        store (ArtifactStore, optional): Rasterize each distinct scene only
+            once and copy the stored PNG to identical figures
+    """
+    def export(scene, eps_file):
+        if eps_file is None:
+            return
+        png_file = os.path.splitext(str(eps_file))[0] + ".png"
+        if store is None:
+            write_scene_png(scene, png_file, dpi, samples)
+            return
+        key = f"{artifact_store.canonical_digest(scene)}-{dpi}dpi-{samples}s"
+        store.materialize(key, ".png", png_file,
+                          lambda path: write_scene_png(scene, path, dpi, samples))
+    return export
@@ -0,0 +1,122 @@
+'''
+In-memory rendering API.
+
+render() draws a registered figure and returns it as EPS, SVG or PNG bytes
+without creating a single file: the headless backend records the figure
+instead of writing figureN.eps, and PNGs come from Ghostscript reading the
+EPS on stdin and writing the image to stdout (or from the built-in
+rasterizer with engine='raster').
+
+It is safe to call from many threads at once, also alongside code drawing
+through make_figures in the same process. The turtle screen and export
+settings are module globals, so make_figures draws one figure at a time under
+the lock its run_figure(), capture_scene() and configure_exports() share,
+which takes milliseconds; writing the EPS or SVG, rasterizing and the gs
+process run outside it, in the calling thread. Captures draw on a fresh
+headless screen, so the backend selected with make_figures.set_backend() and
+export settings made elsewhere (culling, a store, exporters) neither change
+the result nor see the figure; importing this module leaves them alone too.
+Set TURTLE_BACKEND=headless where tkinter is not installed, as for
+make_figures.
+
+    import render_api
+    png = render_api.render("figure5", "png", dpi=150)
+
+    python3 src/render_api.py figure5 --format png --dpi 150 -o figure5.png
+'''
+
+import argparse
+import importlib
+import io
+import sys
+
+import eps_writer
+import make_figures
+import rasterizer
+import svg_writer
+
+converter = importlib.import_module("eps-to-png-converter")
+
+FORMATS = ("png", "eps", "svg")
+ENGINES = ("gs", "raster")
+
+def figure_scene(name, seed=0):
+    """
+    Draw a figure and return its recorded scene, writing nothing to disk.
+
+    Args:
+        name (str): Figure name from make_figures.FIGURES
+        seed (int, optional): Base seed for the random figures. Defaults to 0
+
+    Returns:
+        Scene: Frozen copy of the figure's display list
+    """
+    if name not in make_figures.FIGURES:
+        raise ValueError(f"Unknown figure {name!r}")
+    return make_figures.capture_scene(name, seed, write=False)
+
+def render(name, format="png", dpi=300, seed=0, engine="gs", profile=None):
+    """
+    Render a figure to bytes, entirely in memory.
+
+    Args:
+        name (str): Figure name from make_figures.FIGURES
+        format (str, optional): 'png', 'eps' or 'svg'. Defaults to 'png'
+        dpi (int, optional): PNG resolution. Defaults to 300
+        seed (int, optional): Base seed for the random figures. Defaults to 0
+        engine (str, optional): 'gs' pipes the EPS through Ghostscript;
+            'raster' uses the built-in rasterizer and needs no gs
+        profile (str or dict, optional): Ghostscript render profile, by name
+            (see load_profiles()) or as an options dict
+
+    Returns:
+        bytes: The encoded figure
+
+    Raises:
+        ValueError: For an unknown figure, format, engine or profile
+        RuntimeError: If gs fails
+    """
+    if format not in FORMATS:
+        raise ValueError(f"Unknown format {format!r}, expected one of {list(FORMATS)}")
+    if engine not in ENGINES:
+        raise ValueError(f"Unknown engine {engine!r}, expected one of {list(ENGINES)}")
+    if isinstance(profile, str):
+        profiles = converter.load_profiles()
+        if profile not in profiles:
+            raise ValueError(f"Unknown profile {profile!r}, expected one of {sorted(profiles)}")
+        profile = profiles[profile]
+
+    scene = figure_scene(name, seed)
+    if format == "eps":
+        return eps_writer.render_eps(scene).encode("latin-1")
+    if format == "svg":
+        return svg_writer.render_svg(scene).encode("utf-8")
+    if engine == "raster":
+        buffer = io.BytesIO()
+        rasterizer.write_scene_png(scene, buffer, dpi)
+        return buffer.getvalue()
+    return converter.convert_eps_bytes(eps_writer.render_eps(scene), dpi, profile=profile)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render one figure to PNG, EPS or SVG "
+                                                 "without temporary files")
+    parser.add_argument("figure", choices=list(make_figures.FIGURES), metavar="figure")
+    parser.add_argument("--format", choices=FORMATS, default="png")
+    parser.add_argument("--dpi", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=0, help="seed for the random figures")
+    parser.add_argument("--engine", choices=ENGINES, default="gs",
+                        help="PNG renderer (default: %(default)s)")
+    parser.add_argument("--profile", default=None, help="Ghostscript render profile")
+    parser.add_argument("-o", "--output", default=None, help="output file (default: stdout)")
+    args = parser.parse_args(argv)
+
+    data = render(args.figure, args.format, args.dpi, args.seed, args.engine, args.profile)
+    if args.output is None:
+        sys.stdout.buffer.write(data)
+    else:
+        with open(args.output, "wb") as f:
+            f.write(data)
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
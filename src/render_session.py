@@ -0,0 +1,302 @@
+'''
+Persistent render session for drawing many figures in one process.
+
+Every create_* function calls turtle.reset(), turtle.clearscreen(),
+setup_screen() and setup_turtle(), and with tracing on Tk redraws the canvas
+after every segment even at speed(0). A RenderSession creates the screen and
+turtle once with tracing off. Between figures it only clears the turtle's
+drawings and restores its default state, and the canvas is flushed once,
+when a figure fetches it for export.
+
+The create_* functions are unchanged: while a session is open, the turtle
+module, setup_screen() and setup_turtle() seen by make_figures are swapped
+for session-aware stand-ins, like figure_profiler.py does.
+
+    python3 src/render_session.py --compare --repeats 5
+'''
+
+import argparse
+import statistics
+import time
+from contextlib import contextmanager
+
+import make_figures
+
+class _SessionScreen:
+    """Screen proxy: getcanvas() flushes pending drawing, clear() is cheap"""
+
+    def __init__(self, session):
+        self._session = session
+
+    def getcanvas(self):
+        # The only canvas update of a figure, right before it is exported
+        self._session.screen.update()
+        return self._session.screen.getcanvas()
+
+    def clear(self):
+        # Keep the screen, its turtle and tracer(0); only drop the drawings
+        self._session.reset()
+
+    clearscreen = clear
+
+    def __getattr__(self, name):
+        return getattr(self._session.screen, name)
+
+class _SessionModule:
+    """Turtle-module proxy whose reset() and clearscreen() keep the session's screen"""
+
+    def __init__(self, session, module):
+        self._session = session
+        self._module = module
+
+    def reset(self):
+        self._session.reset()
+
+    def clearscreen(self):
+        self._session.reset()
+
+    def Screen(self):
+        return self._session.proxy
+
+    def __getattr__(self, name):
+        return getattr(self._module, name)
+
+class RenderSession:
+    """
+    One screen and one turtle shared by every figure drawn while it is open.
+
+    The session holds make_figures' drawing lock from open() to close(), so
+    figures drawn by other threads wait instead of using its screen.
+
+    Args:
+        width (int, optional): Screen width. Defaults to 400, as setup_screen()
+        height (int, optional): Screen height. Defaults to 400
+
+    Example:
+        with RenderSession() as session:
+            for name in make_figures.FIGURES:
+                session.run(name)
+    """
+
+    def __init__(self, width=400, height=400):
+        self.size = (width, height)
+        self.screen = None
+        self.turtle = None
+        self.proxy = _SessionScreen(self)
+        self._saved = None
+        self._dirty = False
+
+    def open(self):
+        """Create the screen and turtle and route make_figures through them"""
+        if self._saved is not None:
+            return self
+        # Held until close(): other threads must not draw through the swapped module
+        make_figures._lock.acquire()
+        try:
+            saved = (make_figures.turtle, make_figures.setup_screen, make_figures.setup_turtle)
+            module, setup_screen, setup_turtle = saved
+            self.screen = setup_screen(*self.size)
+            self.screen.tracer(0)
+            self.turtle = setup_turtle()
+        except BaseException:
+            make_figures._lock.release()
+            raise
+        self._saved = saved
+        make_figures.turtle = _SessionModule(self, module)
+        make_figures.setup_screen = self._setup_screen
+        make_figures.setup_turtle = self._setup_turtle
+        return self
+
+    def close(self):
+        """Restore make_figures; the screen itself is left to turtle.bye()"""
+        if self._saved is None:
+            return
+        try:
+            self.reset()
+        finally:
+            make_figures.turtle, make_figures.setup_screen, make_figures.setup_turtle = self._saved
+            self._saved = None
+            make_figures._lock.release()
+
+    def __enter__(self):
+        return self.open()
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def reset(self):
+        """Clear the turtle's drawings and restore its default state"""
+        if not self._dirty:
+            return
+        self.turtle.reset()
+        self.turtle.speed(0)
+        self.turtle.hideturtle()
+        self.screen.colormode(1.0)
+        self._dirty = False
+
+    def _setup_screen(self, width=400, height=400):
+        if (width, height) != self.size:
+            # Only a different page size needs the full setup again
+            self._saved[1](width, height)
+            self.size = (width, height)
+        if make_figures._output_dir is not None:
+            # run_figure(output_dir=...) writes relative EPS paths there
+            return make_figures._OutputScreen(self.proxy, make_figures._output_dir)
+        return self.proxy
+
+    def _setup_turtle(self):
+        self.reset()
+        self._dirty = True
+        return self.turtle
+
+    def run(self, name, seed=None):
+        """Draw one registered figure on the session's screen (see make_figures.run_figure)"""
+        if self._saved is None:
+            raise RuntimeError("RenderSession is not open")
+        make_figures.run_figure(name, seed)
+
+# ============= Comparison =============
+# Moves after which Tk's turtle, at its default tracer(1), redraws the canvas
+# and then sleeps for the screen delay; circle() draws with tracing off
+TRACED_MOVES = ("goto", "setpos", "setposition", "setx", "sety", "forward", "fd",
+                "back", "bk", "backward", "home")
+# turtle's default screen delay in milliseconds (turtle.delay())
+TK_DELAY_MS = 10
+
+class _CapturedCanvas:
+    """Canvas proxy keeping the exported PostScript instead of writing the file"""
+
+    def __init__(self, canvas, outputs):
+        self._canvas = canvas
+        self._outputs = outputs
+
+    def postscript(self, file=None, **options):
+        self._outputs.append(self._canvas.postscript(**options))
+        return ""
+
+    def __getattr__(self, name):
+        return getattr(self._canvas, name)
+
+class _CapturedScreen:
+    def __init__(self, screen, outputs):
+        self._screen = screen
+        self._outputs = outputs
+
+    def getcanvas(self):
+        return _CapturedCanvas(self._screen.getcanvas(), self._outputs)
+
+    def __getattr__(self, name):
+        return getattr(self._screen, name)
+
+class _CountedTurtle:
+    """Turtle proxy counting the TRACED_MOVES calls"""
+
+    def __init__(self, t, counts):
+        self._turtle = t
+        self._counts = counts
+
+    def __getattr__(self, name):
+        attr = getattr(self._turtle, name)
+        if name in TRACED_MOVES:
+            self._counts[name] = self._counts.get(name, 0) + 1
+        return attr
+
+@contextmanager
+def _captured_exports(outputs, counts=None):
+    """Route make_figures' exports into outputs, and count moves into counts"""
+    with make_figures._lock:
+        setup_screen, setup_turtle = make_figures.setup_screen, make_figures.setup_turtle
+        make_figures.setup_screen = lambda *args: _CapturedScreen(setup_screen(*args), outputs)
+        if counts is not None:
+            make_figures.setup_turtle = lambda: _CountedTurtle(setup_turtle(), counts)
+        try:
+            yield
+        finally:
+            make_figures.setup_screen, make_figures.setup_turtle = setup_screen, setup_turtle
+
+def _best_time(func, repeats):
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return min(samples)
+
+def compare(names=None, repeats=3, seed=0):
+    """
+    Time each figure drawn the way main() draws it and through a RenderSession.
+
+    Both runs export the figure's PostScript in memory instead of writing the
+    EPS file; the outputs are compared so a speedup never comes from drawing
+    something different. Each figure's traced moves are counted too: on Tk
+    at tracer(1) every one sleeps TK_DELAY_MS, so moves * TK_DELAY_MS
+    estimates what a session saves there, whatever the backend timed here.
+    It is derived from the count, not measured.
+
+    Returns:
+        list: Dicts with 'figure', 'baseline' and 'session' (best seconds),
+            'speedup', 'identical', 'moves' and 'tk_floor' (estimated seconds)
+    """
+    names = list(make_figures.FIGURES) if names is None else names
+    results = []
+    outputs = []
+    for name in names:
+        counts = {}
+        with _captured_exports([], counts):
+            make_figures.run_figure(name, seed)
+        moves = sum(counts.values())
+        with _captured_exports(outputs):
+            baseline = _best_time(lambda: make_figures.run_figure(name, seed), repeats)
+        results.append({"figure": name, "baseline": baseline, "output": outputs[-1],
+                        "moves": moves, "tk_floor": moves * TK_DELAY_MS / 1000})
+    with RenderSession() as session, _captured_exports(outputs):
+        for result in results:
+            name = result["figure"]
+            result["session"] = _best_time(lambda: session.run(name, seed), repeats)
+            result["speedup"] = result["baseline"] / result["session"]
+            result["identical"] = outputs[-1] == result.pop("output")
+    return results
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Draw figures in one persistent render session")
+    parser.add_argument("figures", nargs="*", help="figure names (default: all)")
+    parser.add_argument("--backend", choices=sorted(make_figures.BACKENDS),
+                        help="turtle implementation (default: $TURTLE_BACKEND or tk)")
+    parser.add_argument("--seed", type=int, default=None, help="seed for the random figures")
+    parser.add_argument("--compare", action="store_true",
+                        help="report per-figure speedups against main()'s per-figure setup")
+    parser.add_argument("--repeats", type=int, default=3, help="timed runs per figure (--compare)")
+    args = parser.parse_args(argv)
+    if args.backend:
+        make_figures.set_backend(args.backend)
+    names = args.figures or list(make_figures.FIGURES)
+
+    try:
+        if args.compare:
+            results = compare(names, args.repeats, args.seed or 0)
+            for r in results:
+                note = "" if r["identical"] else "  OUTPUT DIFFERS"
+                print(f"{r['figure']:>9}: {r['baseline'] * 1000:8.1f}ms -> "
+                      f"{r['session'] * 1000:8.1f}ms  {r['speedup']:5.2f}x  "
+                      f"{r['moves']:5d} moves, est. Tk saving {r['tk_floor']:6.2f}s{note}")
+            baseline = sum(r["baseline"] for r in results)
+            session = sum(r["session"] for r in results)
+            print(f"{'total':>9}: {baseline * 1000:8.1f}ms -> {session * 1000:8.1f}ms  "
+                  f"{baseline / session:5.2f}x (median per figure "
+                  f"{statistics.median(r['speedup'] for r in results):.2f}x); "
+                  f"estimated Tk tracing delays {sum(r['tk_floor'] for r in results):.1f}s")
+            return 0 if all(r["identical"] for r in results) else 1
+        with RenderSession() as session:
+            for name in names:
+                start = time.perf_counter()
+                session.run(name, args.seed)
+                print(f"  {name}: {time.perf_counter() - start:.2f}s")
+    finally:
+        try:
+            make_figures.turtle.bye()
+        except Exception:
+            pass
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,169 @@
+'''
+SVG writer for display lists recorded by headless_turtle.
+
+Full turtle circles become <circle> elements, filled shapes <polygon> and
+open lines <polyline>. Shapes drawn several times under a translate, rotate
+or scale (rotating squares, moving hexagons, a fill and its outline) are
+defined once in <defs> and placed with <use>. No Tk is involved, so the web
+output needs neither a display nor Ghostscript.
+'''
+
+import math
+import os
+
+import artifact_store
+from eps_writer import shared_shapes
+
+def _num(value, decimals):
+    text = f"{value:.{decimals}f}"
+    if "." in text:
+        text = text.rstrip("0").rstrip(".")
+    return "0" if text in ("", "-0") else text
+
+def _hex(rgb):
+    return "#" + "".join(f"{max(0, min(255, round(c * 255))):02x}" for c in rgb)
+
+def svg_transform(scene):
+    """
+    Return a function mapping world coordinates to SVG user units.
+
+    One canvas pixel is one unit and y points down, as on the Tk canvas.
+    """
+    llx, lly, urx, ury = scene.world
+    sx = scene.width / (urx - llx)
+    sy = scene.height / (ury - lly)
+    height = scene.height
+    return lambda x, y: ((x - llx) * sx, height - (y - lly) * sy)
+
+class _SVGWriter:
+    def __init__(self, scene, decimals):
+        self.decimals = decimals
+        self.to_svg = svg_transform(scene)
+        llx, lly, urx, ury = scene.world
+        sx = scene.width / (urx - llx)
+        self.uniform = abs(sx - scene.height / (ury - lly)) <= 1e-9 * sx
+        self.scale = sx
+
+    def num(self, value):
+        return _num(value, self.decimals)
+
+    def points(self, points, decimals=None):
+        decimals = self.decimals if decimals is None else decimals
+        return " ".join(f"{_num(x, decimals)},{_num(y, decimals)}" for x, y in points)
+
+    def world_points(self, points):
+        return self.points([self.to_svg(x, y) for x, y in points])
+
+    def circle(self, circle):
+        cx, cy, radius = circle
+        x, y = self.to_svg(cx, cy)
+        return x, y, radius * self.scale
+
+    def subpath(self, item):
+        """Path data of one closed outline, for shapes with holes"""
+        if item.circle is not None and self.uniform:
+            x, y, r = self.circle(item.circle)
+            return (f"M{self.num(x + r)},{self.num(y)}"
+                    f"A{self.num(r)},{self.num(r)} 0 1 0 {self.num(x - r)},{self.num(y)}"
+                    f"A{self.num(r)},{self.num(r)} 0 1 0 {self.num(x + r)},{self.num(y)}Z")
+        return "M" + self.world_points(item.points).replace(" ", "L") + "Z"
+
+    def paint(self, item, stroke_scale=1.0):
+        """Presentation attributes for a fill or a stroked line"""
+        if item.kind == "polygon":
+            return f'fill="{_hex(item.fill)}"'
+        width = item.width * self.scale / stroke_scale
+        decimals = self.decimals + max(0, math.ceil(math.log10(stroke_scale)))
+        return (f'fill="none" stroke="{_hex(item.outline)}" '
+                f'stroke-width="{_num(width, decimals)}"')
+
+def _closed(points):
+    (x0, y0), (x1, y1) = points[0], points[-1]
+    return abs(x0 - x1) < 1e-6 and abs(y0 - y1) < 1e-6
+
+def render_svg(scene, decimals=2):
+    """
+    Render a scene's display list as an SVG document.
+
+    Args:
+        scene: RecordingScreen or any object with width, height, world,
+            background and items
+        decimals (int, optional): Decimals kept in coordinates. Defaults to 2
+
+    Returns:
+        str: The SVG document
+    """
+    width, height = scene.width, scene.height
+    out = _SVGWriter(scene, decimals)
+    items = [item for item in scene.items if len(item.points) >= 2]
+    instances, shapes = shared_shapes(items, out.to_svg)
+
+    lines = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'viewBox="0 0 {width} {height}">',
+    ]
+    if shapes:
+        lines.append("<defs>")
+        tolerance = 10.0 ** -decimals
+        for number, (local, longest, radius) in enumerate(shapes):
+            # Enough digits for the largest instance of the shape
+            shape_decimals = max(0, math.ceil(-math.log10(tolerance / longest)))
+            tag = "polygon" if _closed(local) else "polyline"
+            lines.append(f'<{tag} id="s{number}" '
+                         f'points="{out.points(local, shape_decimals)}"/>')
+        lines.append("</defs>")
+    lines.append(f'<rect width="{width}" height="{height}" fill="{_hex(scene.background)}"/>')
+    lines.append('<g fill-rule="evenodd" stroke-linecap="round" stroke-linejoin="round">')
+
+    for index, item in enumerate(items):
+        if index in instances:
+            number, ((x0, y0), angle, length, _) = instances[index]
+            local_radius = shapes[number][2]
+            angle_decimals = max(0, math.ceil(
+                -math.log10(math.degrees(10.0 ** -decimals / (length * local_radius)))))
+            scale_decimals = max(0, math.ceil(-math.log10(10.0 ** -decimals / local_radius)))
+            transform = (f"translate({out.num(x0)} {out.num(y0)}) "
+                         f"rotate({_num(math.degrees(angle), angle_decimals)}) "
+                         f"scale({_num(length, scale_decimals)})")
+            # Stroke widths scale with the <use> transform; undo that
+            lines.append(f'<use href="#s{number}" transform="{transform}" '
+                         f'{out.paint(item, length)}/>')
+        elif item.kind == "polygon" and item.holes:
+            data = "".join(out.subpath(part) for part in [item] + item.holes)
+            lines.append(f'<path d="{data}" {out.paint(item)}/>')
+        elif item.circle is not None and out.uniform:
+            x, y, r = out.circle(item.circle)
+            lines.append(f'<circle cx="{out.num(x)}" cy="{out.num(y)}" r="{out.num(r)}" '
+                         f'{out.paint(item)}/>')
+        else:
+            tag = "polygon" if item.kind == "polygon" or _closed(item.points) else "polyline"
+            lines.append(f'<{tag} points="{out.world_points(item.points)}" '
+                         f'{out.paint(item)}/>')
+    lines.extend(["</g>", "</svg>", ""])
+    return "\n".join(lines)
+
+def write_svg(scene, file, decimals=2):
+    """Write a scene as an SVG file"""
+    with open(file, "w") as f:
+        f.write(render_svg(scene, decimals))
+
+def svg_exporter(decimals=2, store=None):
+    """
+    Return a headless_turtle exporter writing an SVG next to each EPS file.
+
+    Args:
+        decimals (int, optional): Decimals kept in coordinates
+        store (ArtifactStore, optional): Serialise each distinct scene only
+            once and copy the stored SVG to identical figures
+    """
+    def export(scene, eps_file):
+        if eps_file is None:
+            return
+        svg_file = os.path.splitext(str(eps_file))[0] + ".svg"
+        if store is None:
+            write_svg(scene, svg_file, decimals)
+            return
+        key = f"{artifact_store.canonical_digest(scene)}-svg{decimals}"
+        store.materialize(key, ".svg", svg_file,
+                          lambda path: write_svg(scene, path, decimals))
+    return export
@@ -0,0 +1,217 @@
+'''
+Parameter sweeps over the parameterised pattern functions.
+
+A sweep takes a grid (parameter -> list or range of values) for one of the
+targets below, enumerates the combinations lazily, renders them through a
+bounded worker pool and writes one manifest line per combination, mapping
+its parameters to its output files, or to the error that stopped it.
+
+    python3 src/sweep.py rotating_squares --param size=80:160:20 \
+        --param angle_step=15,30,45 \
+        --param color_function=red_white_alternating,angle_based_color \
+        --output-dir sweep --jobs 8
+'''
+
+import argparse
+import inspect
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import make_figures
+
+SWEEP_MANIFEST = "sweep.jsonl"
+
+# Target name -> (function, defaults for required arguments)
+TARGETS = {
+    "rotating_squares": ("draw_rotating_square_pattern",
+                         {"initial_color": "red", "color_function": "red_white_alternating"}),
+    "count_based_spiral": ("create_count_based_spiral", {}),
+    "divided_squares": ("create_divided_squares", {}),
+    "fifth_shape_pattern": ("create_fifth_shape_pattern", {}),
+}
+
+# Color functions are swept by name so parameters stay JSON-serialisable
+COLOR_FUNCTIONS = ("red_white_alternating", "blue_white_alternating",
+                   "white_blue_alternating", "angle_based_color")
+
+def target_parameters(target):
+    """Names of the parameters a target can sweep (everything but filename)"""
+    func = getattr(make_figures, TARGETS[target][0])
+    return [name for name in inspect.signature(func).parameters if name != "filename"]
+
+def combinations(grid):
+    """
+    Yield every combination of a parameter grid as a dict, lazily.
+
+    Each axis is materialised (they are short), the product never is.
+
+    Args:
+        grid (dict): Parameter name -> iterable of values
+    """
+    names = list(grid)
+    axes = [list(grid[name]) for name in names]
+    for values in itertools.product(*axes):
+        yield dict(zip(names, values))
+
+def render_point(target, params, stem, exports=None):
+    """
+    Render one combination in the current process.
+
+    A combination that fails (an invalid value, say) is reported in the
+    result rather than raised, so it never stops the rest of the sweep.
+
+    Args:
+        target (str): Key of TARGETS
+        params (dict): Parameter values; color_function given by name
+        stem (str): Output path without extension
+        exports (dict, optional): configure_exports() arguments applied in
+            this process; used to list the outputs
+
+    Returns:
+        dict: 'params', 'outputs' (empty on failure), 'seconds' and 'error'
+            (None on success)
+    """
+    func_name, defaults = TARGETS[target]
+    arguments = {**defaults, **params}
+    start = time.perf_counter()
+    try:
+        if "color_function" in arguments:
+            if arguments["color_function"] not in COLOR_FUNCTIONS:
+                raise ValueError(f"Unknown color function {arguments['color_function']!r}")
+            arguments["color_function"] = getattr(make_figures, arguments["color_function"])
+        getattr(make_figures, func_name)(filename=f"{stem}.eps", **arguments)
+    except Exception as e:
+        return {"params": params, "outputs": [], "seconds": time.perf_counter() - start,
+                "error": repr(e)}
+    return {
+        "params": params,
+        "outputs": make_figures.figure_outputs(stem, exports),
+        "seconds": time.perf_counter() - start,
+        "error": None,
+    }
+
+def _init_worker(backend, exports):
+    make_figures.set_backend(backend)
+    make_figures.configure_exports(**(exports or {}))
+
+def _render_here(backend, exports, args):
+    """render_point() in this process, leaving its backend and exports as they were"""
+    with make_figures.using_backend(backend, exports):
+        return render_point(*args)
+
+def run_sweep(target, grid, output_dir="sweep", jobs=1, backend="headless", exports=None,
+              max_pending=None):
+    """
+    Render every combination of a grid, yielding results in enumeration order.
+
+    Combinations are pulled from the generator only as workers free up: at
+    most max_pending renders are queued or running at any time, so a sweep
+    of any size runs in constant memory.
+
+    Args:
+        target (str): Key of TARGETS
+        grid (dict): Parameter name -> iterable of values
+        output_dir (str, optional): Directory to write into
+        jobs (int, optional): Worker processes; 1 renders in this process
+        backend (str, optional): Turtle backend. Defaults to 'headless'
+        exports (dict, optional): make_figures.configure_exports() arguments
+        max_pending (int, optional): Backpressure bound. Defaults to 4 per worker
+
+    Yields:
+        dict: render_point() results with an added 'index'
+    """
+    unknown = set(grid) - set(target_parameters(target))
+    if unknown:
+        raise ValueError(f"{target} has no parameter(s) {sorted(unknown)}; "
+                         f"expected {target_parameters(target)}")
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    points = ((target, params, str(Path(output_dir) / f"{target}-{index:06d}"), exports)
+              for index, params in enumerate(combinations(grid)))
+
+    if jobs == 1:
+        results = (_render_here(backend, exports, args) for args in points)
+    else:
+        pool = ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                   initargs=(backend, exports))
+        window = max_pending or 4 * (jobs or os.cpu_count() or 1)
+        results = make_figures.imap_bounded(pool, render_point, points, window)
+    try:
+        for index, result in enumerate(results):
+            yield {"index": index, **result}
+    finally:
+        if jobs != 1:
+            pool.shutdown(cancel_futures=True)
+
+def parse_values(text):
+    """
+    Parse a command-line value list.
+
+    'a:b:s' is the inclusive range a, a+s, ..., b; 'x,y,z' a list. Numbers
+    become int or float, anything else stays a string.
+    """
+    def number(value):
+        for kind in (int, float):
+            try:
+                return kind(value)
+            except ValueError:
+                pass
+        return value
+
+    if ":" in text:
+        start, stop, step = (number(part) for part in text.split(":"))
+        if not all(isinstance(v, (int, float)) for v in (start, stop, step)):
+            raise ValueError(f"range {text!r} needs numeric start:stop:step")
+        if step == 0:
+            raise ValueError(f"range {text!r} has a step of 0")
+        count = int(round((stop - start) / step)) + 1
+        return [start + i * step for i in range(max(0, count))]
+    return [number(value) for value in text.split(",")]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep pattern parameters")
+    parser.add_argument("target", choices=sorted(TARGETS))
+    parser.add_argument("--param", action="append", default=[], metavar="NAME=VALUES",
+                        help="values as start:stop:step (inclusive) or a,b,c; repeatable")
+    parser.add_argument("--output-dir", default="sweep")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--max-pending", type=int, default=None,
+                        help="renders queued at once (default: 4 per worker)")
+    parser.add_argument("--backend", choices=sorted(make_figures.BACKENDS), default="headless")
+    parser.add_argument("--png-dpi", type=int, default=None,
+                        help="also write PNGs with the built-in rasterizer")
+    parser.add_argument("--svg", action="store_true", help="also write SVGs")
+    args = parser.parse_args(argv)
+
+    grid = {}
+    for spec in args.param:
+        name, _, values = spec.partition("=")
+        try:
+            grid[name] = parse_values(values)
+        except ValueError as e:
+            parser.error(f"--param {name}: {e}")
+    exports = {"png_dpi": args.png_dpi, "svg": args.svg}
+    manifest_path = Path(args.output_dir) / SWEEP_MANIFEST
+    Path(args.output_dir).mkdir(parents=True, exist_ok=True)
+    start = time.perf_counter()
+    done = failed = 0
+    with open(manifest_path, "w") as manifest:
+        for result in run_sweep(args.target, grid, args.output_dir, args.jobs, args.backend,
+                                exports, args.max_pending):
+            manifest.write(json.dumps({"target": args.target, **result}) + "\n")
+            done += 1
+            if result["error"]:
+                failed += 1
+                print(f"  {result['index']} {result['params']}: FAILED {result['error']}")
+    elapsed = time.perf_counter() - start
+    print(f"{done} combinations of {args.target} in {elapsed:.1f}s -> {manifest_path}")
+    if failed:
+        print(f"{failed} of {done} combinations failed")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,204 @@
+'''
+Seeded, reproducible variants of the random figures.
+
+Every variant of figure23 (random circles) and figure24 (random concentric
+circles) draws from its own random.Random stream, derived from a base seed,
+the figure name and the variant index. The same (seed, figure, index) always
+regenerates the same image, whichever worker renders it and in whatever
+order, so parallel runs write exactly what a serial run writes.
+
+    python3 src/variants.py figure23 --seed 42 --count 5000 --output-dir catalog --jobs 8
+'''
+
+import argparse
+import hashlib
+import inspect
+import json
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import make_figures
+
+VARIANT_MANIFEST = "variants.jsonl"
+
+def variant_figures():
+    """Names of the figures whose create function accepts an rng"""
+    return [name for name, func in make_figures.FIGURES.items()
+            if "rng" in inspect.signature(func).parameters]
+
+def variant_seed(base_seed, figure, index):
+    """
+    Derive the seed of one variant.
+
+    Hashing keeps neighbouring indices and base seeds statistically
+    independent, unlike base_seed + index.
+
+    Returns:
+        int: 64-bit seed for random.Random
+    """
+    digest = hashlib.sha256(f"{base_seed}:{figure}:{index}".encode()).digest()
+    return int.from_bytes(digest[:8], "big")
+
+def variant_stem(figure, base_seed, index):
+    """File name without extension, e.g. figure23-s42-000017"""
+    return f"{figure}-s{base_seed}-{index:06d}"
+
+def render_variant(figure, base_seed, index, output_dir=".", exports=None):
+    """
+    Draw one variant in the current process.
+
+    A failure is reported in the result rather than raised, so it never
+    stops the rest of the catalog.
+
+    Args:
+        figure (str): Figure name from variant_figures()
+        base_seed (int): Catalog seed
+        index (int): Variant number
+        output_dir (str, optional): Directory to write into
+        exports (dict, optional): make_figures.configure_exports() arguments
+            already applied in this process; used to list the outputs
+
+    Returns:
+        dict: 'figure', 'index', 'seed', 'outputs' (empty on failure),
+            'seconds' and 'error' (None on success)
+    """
+    seed = variant_seed(base_seed, figure, index)
+    stem = str(Path(output_dir) / variant_stem(figure, base_seed, index))
+    result = {"figure": figure, "index": index, "seed": seed, "outputs": [], "error": None}
+    start = time.perf_counter()
+    try:
+        make_figures.FIGURES[figure](rng=random.Random(seed), filename=f"{stem}.eps")
+        result["outputs"] = make_figures.figure_outputs(stem, exports)
+    except Exception as e:
+        result["error"] = repr(e)
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+def _init_worker(backend, exports):
+    make_figures.set_backend(backend)
+    make_figures.configure_exports(**(exports or {}))
+
+def generate_variants(figure, base_seed, count, output_dir=".", jobs=1, backend="headless",
+                      exports=None, first=0):
+    """
+    Render variants first .. first + count - 1, yielding results in index order.
+
+    Work is submitted to the worker pool a few tasks ahead of the results
+    being consumed, so memory stays flat however large count is.
+
+    Args:
+        figure (str): Figure name from variant_figures()
+        base_seed (int): Catalog seed
+        count (int): Number of variants
+        output_dir (str, optional): Directory to write into, created on demand
+        jobs (int, optional): Worker processes; 1 renders in this process
+        backend (str, optional): Turtle backend. Defaults to 'headless'
+        exports (dict, optional): make_figures.configure_exports() arguments
+        first (int, optional): Index of the first variant, to extend a catalog
+
+    Yields:
+        dict: render_variant() results
+    """
+    if figure not in variant_figures():
+        raise ValueError(f"{figure} has no random variants; expected one of {variant_figures()}")
+    Path(output_dir).mkdir(parents=True, exist_ok=True)
+    indices = range(first, first + count)
+    if jobs == 1:
+        # Switch backend per render so the caller's settings are back in
+        # place whenever a result is handed out
+        for index in indices:
+            with make_figures.using_backend(backend, exports):
+                result = render_variant(figure, base_seed, index, output_dir, exports)
+            yield result
+        return
+
+    window = 4 * (jobs or os.cpu_count() or 1)
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                             initargs=(backend, exports)) as pool:
+        yield from make_figures.imap_bounded(
+            pool, render_variant,
+            ((figure, base_seed, index, output_dir, exports) for index in indices), window)
+
+def rewrite_manifest(path, keep, results):
+    """
+    Rewrite a JSON-lines manifest with the entries keep() accepts, then results.
+
+    The new manifest is streamed to a temporary file that replaces the old one
+    at the end, or when the results stop early (an error or Ctrl+C), so
+    whatever was rendered is always recorded.
+
+    Args:
+        path (Path): Manifest location; it need not exist
+        keep: Callable taking an old entry dict, True to carry it over
+        results: Iterable of new entry dicts
+
+    Yields:
+        dict: Each new entry once it has been written
+    """
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "w") as manifest:
+        try:
+            with open(path) as old:
+                for line in old:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        continue
+                    if keep(entry):
+                        manifest.write(line if line.endswith("\n") else line + "\n")
+        except FileNotFoundError:
+            pass
+        try:
+            for entry in results:
+                manifest.write(json.dumps(entry) + "\n")
+                yield entry
+        finally:
+            manifest.close()
+            os.replace(tmp_path, path)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate reproducible random figure variants")
+    parser.add_argument("figure", choices=variant_figures())
+    parser.add_argument("--seed", type=int, required=True, help="base seed of the catalog")
+    parser.add_argument("--count", type=int, default=100)
+    parser.add_argument("--first", type=int, default=0, help="index of the first variant")
+    parser.add_argument("--output-dir", default="variants")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--backend", choices=sorted(make_figures.BACKENDS), default="headless")
+    parser.add_argument("--png-dpi", type=int, default=None,
+                        help="also write PNGs with the built-in rasterizer")
+    parser.add_argument("--svg", action="store_true", help="also write SVGs")
+    args = parser.parse_args(argv)
+
+    exports = {"png_dpi": args.png_dpi, "svg": args.svg}
+    manifest_path = Path(args.output_dir) / VARIANT_MANIFEST
+    start = time.perf_counter()
+    done = failed = 0
+    Path(args.output_dir).mkdir(parents=True, exist_ok=True)
+    indices = range(args.first, args.first + args.count)
+
+    def keep(entry):
+        # Entries for the variants rendered again now are replaced, not duplicated
+        return not (entry.get("base_seed") == args.seed and entry.get("figure") == args.figure
+                    and entry.get("index") in indices)
+    results = ({"base_seed": args.seed, **result} for result in generate_variants(
+        args.figure, args.seed, args.count, args.output_dir, args.jobs, args.backend,
+        exports, args.first))
+    for result in rewrite_manifest(manifest_path, keep, results):
+        done += 1
+        if result["error"]:
+            failed += 1
+            print(f"  variant {result['index']}: FAILED {result['error']}")
+    elapsed = time.perf_counter() - start
+    print(f"{done} variants of {args.figure} in {elapsed:.1f}s "
+          f"({done / elapsed * 60:.0f}/min) -> {manifest_path}")
+    if failed:
+        print(f"{failed} of {done} variants failed")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,124 @@
+import operator
+import os
+import struct
+import sys
+import zlib
+from itertools import repeat
+from pathlib import Path
+
+import pytest
+
+SRC = Path(__file__).resolve().parent.parent / "src"
+EXAMPLES = SRC.parent / "examples"
+sys.path.insert(0, str(SRC))
+# Keep make_figures from importing tkinter when it is first imported
+os.environ.setdefault("TURTLE_BACKEND", "headless")
+
+@pytest.fixture
+def headless(tmp_path, monkeypatch):
+    """make_figures on the headless backend, writing into a temp directory"""
+    import make_figures
+    monkeypatch.chdir(tmp_path)
+    make_figures.set_backend("headless")
+    make_figures.reset_exports()
+    yield make_figures
+    make_figures.reset_exports()
+
+FAKE_GS = '''#!{python}
+# Stand-in for Ghostscript: logs its arguments and writes a red page per input,
+# $FAKE_GS_SIZE (default 4) pixels square, stopping with an error at the first
+# input that contains FAIL
+import os
+import sys
+args = sys.argv[1:]
+with open({log!r}, "a") as f:
+    f.write(" ".join(args) + "\\n")
+size = int(os.environ.get("FAKE_GS_SIZE", 4))
+output = next(a for a in args if a.startswith("-sOutputFile="))[len("-sOutputFile="):]
+device = next(a for a in args if a.startswith("-sDEVICE="))[len("-sDEVICE="):]
+inputs = [a for a in args if not a.startswith("-")]
+for page, name in enumerate(inputs, 1):
+    if b"FAIL" in open(name, "rb").read():
+        sys.stderr.write("Error: /undefined in " + name + "\\n")
+        sys.exit(1)
+    with open(output % page if "%" in output else output, "wb") as f:
+        f.write(b"P6\\n%d %d\\n255\\n" % (size, size) + b"\\xff\\0\\0" * size * size
+                if device.startswith("ppm") else b"\\x89PNG stand-in")
+'''
+
+@pytest.fixture
+def fake_gs(tmp_path, monkeypatch):
+    """Put a logging gs stand-in first on PATH; returns a function listing its calls"""
+    bin_dir = tmp_path / "bin"
+    bin_dir.mkdir()
+    log = tmp_path / "gs.log"
+    log.touch()
+    gs = bin_dir / "gs"
+    gs.write_text(FAKE_GS.format(python=sys.executable, log=str(log)))
+    gs.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{bin_dir}{os.pathsep}{os.environ['PATH']}")
+    return lambda: log.read_text().splitlines()
+
+def read_png(path):
+    """
+    Decode a non-interlaced grayscale or indexed PNG of 1-8 bits, or an
+    8-bit RGB or RGBA PNG.
+
+    Returns:
+        tuple: (width, height, rows), each row bytes of RGB pixels
+    """
+    data = Path(path).read_bytes()
+    assert data[:8] == b"\x89PNG\r\n\x1a\n"
+    offset, idat, palette = 8, [], None
+    while offset < len(data):
+        length, kind = struct.unpack(">I4s", data[offset:offset + 8])
+        body = data[offset + 8:offset + 8 + length]
+        offset += 12 + length
+        if kind == b"IHDR":
+            width, height, depth, color_type, _, _, interlace = struct.unpack(">IIBBBBB", body)
+            assert interlace == 0 and (depth == 8 or color_type in (0, 3))
+        elif kind == b"PLTE":
+            palette = body
+        elif kind == b"IDAT":
+            idat.append(body)
+    channels = {0: 1, 2: 3, 3: 1, 6: 4}[color_type]
+    stride = (width * channels * depth + 7) // 8
+    # Filters work on whole bytes: the left neighbour is one pixel or one byte back
+    step = max(1, channels * depth // 8)
+    raw = zlib.decompress(b"".join(idat))
+    rows, previous = [], bytearray(stride)
+    for y in range(height):
+        start = y * (stride + 1)
+        kind, line = raw[start], bytearray(raw[start + 1:start + 1 + stride])
+        if kind == 2:
+            line = bytearray(map(operator.and_, map(operator.add, line, previous),
+                                 repeat(255, stride)))
+        elif kind != 0:
+            for i in range(stride):
+                left = line[i - step] if i >= step else 0
+                up = previous[i]
+                corner = previous[i - step] if i >= step else 0
+                if kind == 1:
+                    line[i] = (line[i] + left) & 255
+                elif kind == 3:
+                    line[i] = (line[i] + (left + up) // 2) & 255
+                elif kind == 4:
+                    p = left + up - corner
+                    pa, pb, pc = abs(p - left), abs(p - up), abs(p - corner)
+                    predictor = left if pa <= pb and pa <= pc else up if pb <= pc else corner
+                    line[i] = (line[i] + predictor) & 255
+        previous = line
+        if depth < 8:
+            mask = (1 << depth) - 1
+            line = [(byte >> shift) & mask for byte in line
+                    for shift in range(8 - depth, -1, -depth)][:width]
+            if color_type == 0:
+                line = [v * 255 // mask for v in line]
+        if color_type == 0:
+            line = bytes(v for v in line for _ in range(3))
+        elif color_type == 3:
+            line = b"".join(palette[3 * v:3 * v + 3] for v in line)
+        elif color_type == 6:
+            del line[3::4]
+        rows.append(bytes(line))
+    return width, height, rows
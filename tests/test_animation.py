@@ -0,0 +1,70 @@
+import struct
+import zlib
+
+import animation
+import rasterizer
+
+def _chunks(data):
+    assert data[:8] == b"\x89PNG\r\n\x1a\n"
+    pos = 8
+    while pos < len(data):
+        length, kind = struct.unpack(">I4s", data[pos:pos + 8])
+        body = data[pos + 8:pos + 8 + length]
+        assert struct.unpack(">I", data[pos + 8 + length:pos + 12 + length])[0] \
+            == zlib.crc32(kind + body)
+        yield kind, body
+        pos += 12 + length
+
+def _compose(chunks, width, height):
+    """Paint each frame's region onto a canvas, as a viewer with dispose_op 0 does"""
+    canvas = [bytearray(3 * width) for _ in range(height)]
+    for kind, body in chunks:
+        if kind == b"fcTL":
+            _, w, h, x, y = struct.unpack(">IIIII", body[:20])
+        elif kind in (b"IDAT", b"fdAT"):
+            raw = zlib.decompress(body if kind == b"IDAT" else body[4:])
+            for row in range(h):
+                line = raw[row * (3 * w + 1):(row + 1) * (3 * w + 1)]
+                assert line[0] == 0
+                canvas[y + row][3 * x:3 * (x + w)] = line[1:]
+    return [bytes(row) for row in canvas]
+
+def test_chunk_sequence(headless, tmp_path):
+    scene = headless.capture_scene("figure23", write=False)
+    stats = animation.write_apng(tmp_path / "a.png", scene, dpi=24, delay_ms=150)
+    chunks = list(_chunks((tmp_path / "a.png").read_bytes()))
+    kinds = [kind for kind, _ in chunks]
+    assert kinds[:2] == [b"IHDR", b"acTL"] and kinds[-1] == b"IEND"
+    assert kinds.count(b"IDAT") == 1 and kinds.index(b"IDAT") == 3
+    assert struct.unpack(">II", chunks[1][1]) == (stats["frames"], 0)
+    assert kinds.count(b"fcTL") == stats["frames"] > 1
+
+    numbered = [(kind, body) for kind, body in chunks if kind in (b"fcTL", b"fdAT")]
+    assert [struct.unpack(">I", body[:4])[0] for _, body in numbered] \
+        == list(range(len(numbered)))
+    width, height = struct.unpack(">II", chunks[0][1][:8])
+    assert struct.unpack(">IIIII", chunks[2][1][:20])[1:] == (width, height, 0, 0)
+    assert all(struct.unpack(">HH", body[20:24]) == (150, 1000)
+               for kind, body in chunks if kind == b"fcTL")
+    assert stats["encoded_pixels"] < stats["full_pixels"]
+
+def test_frames_build_up_the_figure(headless, tmp_path):
+    scene = headless.capture_scene("figure23", write=False)
+    animation.write_apng(tmp_path / "a.png", scene, dpi=24)
+    raster = rasterizer.render_scene(scene, 24)
+    chunks = list(_chunks((tmp_path / "a.png").read_bytes()))
+    assert _compose(chunks, raster.width, raster.height) == [bytes(r) for r in raster.rows]
+
+def test_scene_without_lines_is_one_blank_frame(headless, tmp_path):
+    scene = headless.capture_scene("figure23", write=False)
+    scene.items = []
+    stats = animation.write_apng(tmp_path / "a.png", scene, dpi=24)
+    assert stats["frames"] == 1
+    kinds = [kind for kind, _ in _chunks((tmp_path / "a.png").read_bytes())]
+    assert kinds == [b"IHDR", b"acTL", b"fcTL", b"IDAT", b"IEND"]
+
+def test_main_leaves_backend_selected(headless, tmp_path):
+    headless.set_backend("tk")
+    assert animation.main(["figure4", "--dpi", "12", "--output-dir", "out"]) == 0
+    assert (tmp_path / "out" / "figure4-animated.png").exists()
+    assert headless.turtle.__name__ == "turtle"
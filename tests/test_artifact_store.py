@@ -0,0 +1,44 @@
+import artifact_store
+import headless_turtle
+
+def _scene(circle):
+    item = headless_turtle.DisplayItem("polygon", [(0, 0), (10, 0), (10, 10)],
+                                       fill=(1, 0, 0), circle=circle)
+    return headless_turtle.Scene(400, 400, (-200, -200, 200, 200), (1, 1, 1), [item])
+
+def test_digest_covers_circles():
+    assert (artifact_store.canonical_digest(_scene(None))
+            != artifact_store.canonical_digest(_scene((0, 0, 10))))
+
+def test_digest_covers_circular_holes():
+    plain, circular = _scene(None), _scene(None)
+    for scene, circle in ((plain, None), (circular, (5, 3, 2))):
+        hole = headless_turtle.DisplayItem("hole", [(3, 3), (7, 3), (5, 5)], circle=circle)
+        scene.items[0].holes.append(hole)
+    assert artifact_store.canonical_digest(plain) != artifact_store.canonical_digest(circular)
+
+def test_identical_figures_share_one_artifact(headless, tmp_path):
+    headless.configure_exports(artifact_dir="store")
+    headless.run_figure("figure8")
+    headless.run_figure("figure10")
+    stored = list((tmp_path / "store").glob("*.eps"))
+    assert len(stored) == 1
+    assert (tmp_path / "figure8.eps").read_bytes() == (tmp_path / "figure10.eps").read_bytes()
+
+def test_rewriting_outputs_leaves_store_intact(headless, tmp_path):
+    headless.configure_exports(artifact_dir="store")
+    headless.run_figure("figure8")
+    headless.run_figure("figure10")
+    original = (tmp_path / "figure8.eps").read_bytes()
+    (blob,) = (tmp_path / "store").glob("*.eps")
+
+    # A run without the store writes straight over the output files
+    headless.configure_exports(cull=True)
+    headless.run_figure("figure8")
+    assert (tmp_path / "figure8.eps").read_bytes() != original
+    assert blob.read_bytes() == original
+    assert (tmp_path / "figure10.eps").read_bytes() == original
+
+    headless.configure_exports(artifact_dir="store")
+    headless.run_figure("figure8")
+    assert (tmp_path / "figure8.eps").read_bytes() == original
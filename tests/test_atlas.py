@@ -0,0 +1,35 @@
+import json
+
+import atlas
+import rasterizer
+from conftest import read_png
+
+NAMES = ["figure1", "figure4", "figure8"]
+
+def test_atlas_writes_only_sheet_and_index(headless, tmp_path):
+    index = atlas.build_atlas("sheet.png", NAMES, dpi=18, layout="shelf", padding=2)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["sheet.json", "sheet.png"]
+    assert json.loads((tmp_path / "sheet.json").read_text()) == index
+    assert set(index["figures"]) == set(NAMES)
+
+def test_atlas_pixels_match_rasterizer(headless, tmp_path):
+    index = atlas.build_atlas("sheet.png", NAMES, dpi=18, columns=2, padding=2)
+    width, height, rows = read_png(tmp_path / "sheet.png")
+    assert (width, height) == (index["width"], index["height"])
+    for name, place in index["figures"].items():
+        raster = rasterizer.render_scene(headless.capture_scene(name, write=False), 18)
+        assert (raster.width, raster.height) == (place["width"], place["height"])
+        x0, y0 = place["x"], place["y"]
+        for y in range(raster.height):
+            assert rows[y0 + y][3 * x0:3 * (x0 + raster.width)] == bytes(raster.rows[y])
+
+def test_configure_exports_without_options_resets(headless, tmp_path):
+    headless.configure_exports(png_dpi=18, svg=True, cull=True)
+    headless.configure_exports()
+    headless.run_figure("figure4")
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["figure4.eps"]
+
+def test_atlas_leaves_backend_selected(headless, tmp_path):
+    headless.set_backend("tk")
+    atlas.build_atlas("sheet.png", NAMES[:1], dpi=18)
+    assert headless.turtle.__name__ == "turtle"
@@ -0,0 +1,80 @@
+import json
+import os
+import subprocess
+import sys
+
+import benchmark_figures
+import make_figures
+from conftest import SRC
+
+def _report(medians):
+    return {"figures": {name: {"phases": {phase: {"median": median}
+                                          for phase, median in phases.items()}}
+                        for name, phases in medians.items()}}
+
+def test_regressions_past_the_threshold_are_reported():
+    baseline = _report({"figure1": {"generate": 0.010, "rasterize": 0.020},
+                        "figure2": {"generate": 0.010}})
+    report = _report({"figure1": {"generate": 0.0125, "rasterize": 0.021},
+                      "figure2": {"generate": 0.011}, "figure3": {"generate": 1.0}})
+    assert benchmark_figures.compare_to_baseline(report, baseline, threshold=0.2) == [
+        ("figure1", "generate", 0.010, 0.0125)]
+
+def test_phases_below_timer_noise_are_ignored():
+    baseline = _report({"figure1": {"generate": 0.0001}})
+    report = _report({"figure1": {"generate": 0.0009, "convert_gs": 5.0}})
+    assert benchmark_figures.compare_to_baseline(report, baseline) == []
+
+def test_gs_converts_the_generated_eps(tmp_path, fake_gs, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    backend = make_figures.turtle
+    report = benchmark_figures.run_benchmarks(["figure4"], dpi=20, repeats=2, warmup=0)
+    result = report["figures"]["figure4"]
+    assert set(result["phases"]) == set(benchmark_figures.PHASES)
+    assert result["phases"]["generate"]["runs"] == 2
+    assert result["primitives"]["polygons"] > 0
+    assert len(fake_gs()) == 2
+    assert all("examples" not in call and "figure4.eps" in call for call in fake_gs())
+    # Nothing is written to the working directory and the backend is unchanged
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["bin", "gs.log"]
+    assert make_figures.turtle is backend
+
+def test_compare_exit_status(tmp_path, fake_gs, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    args = ["figure4", "--dpi", "20", "--repeats", "1", "--warmup", "0"]
+    assert benchmark_figures.main(args + ["--save-baseline", "bench.json"]) == 0
+    assert benchmark_figures.main(args + ["--compare", "bench.json", "--threshold", "100"]) == 0
+    # Starting the gs stand-in alone takes far longer than 2 ms
+    baseline = json.loads((tmp_path / "bench.json").read_text())
+    baseline["figures"]["figure4"]["phases"]["convert_gs"]["median"] = 0.002
+    (tmp_path / "bench.json").write_text(json.dumps(baseline))
+    assert benchmark_figures.main(args + ["--compare", "bench.json"]) == 1
+
+def test_import_leaves_the_backend_alone():
+    env = {k: v for k, v in os.environ.items() if k != "TURTLE_BACKEND"}
+    env["PYTHONPATH"] = str(SRC)
+    output = subprocess.run(
+        [sys.executable, "-c", "import os, benchmark_figures, make_figures; "
+         "print(make_figures.turtle.__name__, os.environ.get('TURTLE_BACKEND'))"],
+        env=env, capture_output=True, text=True, check=True).stdout
+    assert output.split() == ["turtle", "None"]
+
+def test_run_figure_writes_into_output_dir(headless, tmp_path):
+    out = tmp_path / "out"
+    out.mkdir()
+    headless.run_figure("figure4", output_dir=out)
+    headless.run_figure("figure5")
+    assert sorted(p.name for p in out.iterdir()) == ["figure4.eps"]
+    assert (tmp_path / "figure5.eps").exists()
+
+def test_using_backend_restores_backend_and_exports(headless, tmp_path):
+    headless.set_backend("tk")
+    try:
+        with headless.using_backend("headless", {"svg": True}):
+            headless.run_figure("figure4")
+        assert headless.turtle.__name__ == "turtle"
+    finally:
+        headless.set_backend("headless")
+    headless.run_figure("figure5")
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "figure4.eps", "figure4.svg", "figure5.eps"]
@@ -0,0 +1,61 @@
+import math
+
+import pytest
+
+import eps_writer
+import headless_turtle
+import rasterizer
+
+def _draw(*moves):
+    """Record a filled shape drawn by moves on a fresh headless screen"""
+    with headless_turtle.isolated():
+        screen = headless_turtle.Screen()
+        screen.setworldcoordinates(-100, -100, 100, 100)
+        t = headless_turtle.Turtle()
+        t.penup()
+        t.goto(10, -30)
+        t.pendown()
+        t.fillcolor("red")
+        t.begin_fill()
+        for move, *args in moves:
+            getattr(t, move)(*args)
+        t.end_fill()
+        return screen.snapshot()
+
+def _fills(scene):
+    return [item for item in scene.items if item.kind == "polygon"]
+
+def test_full_circle_is_recorded_as_a_circle():
+    (fill,) = _fills(_draw(("circle", 30)))
+    assert fill.circle == pytest.approx((10, 0, 30))
+
+@pytest.mark.parametrize("moves", [
+    [("circle", 30, 180)],
+    [("circle", 30), ("forward", 5)],
+])
+def test_partial_circles_stay_polylines(moves):
+    (fill,) = _fills(_draw(*moves))
+    assert fill.circle is None
+
+def test_eps_writes_circles_as_arcs():
+    scene = _draw(("circle", 30))
+    assert scene.items[0].circle is not None
+    assert " 0 360 arc" in eps_writer.render_eps(scene)
+    assert " arc" not in eps_writer.render_eps(scene, arcs=False)
+
+@pytest.mark.parametrize("radius", [0.5, 3, 40, 900])
+def test_tessellation_stays_within_tolerance(radius):
+    n = rasterizer.circle_segments(radius)
+    assert n >= 8
+    # Distance from a chord's midpoint to the arc
+    assert radius * (1 - math.cos(math.pi / n)) <= rasterizer.CIRCLE_TOLERANCE
+    if radius > 3:
+        assert radius * (1 - math.cos(math.pi / (n - 1))) > rasterizer.CIRCLE_TOLERANCE
+
+def test_rasterized_circle_area():
+    # Pen up: only the fill, no outline
+    scene = _draw(("penup",), ("circle", 30))
+    # 200 world units on a 400 px canvas at 72 DPI: 2 px per unit
+    raster = rasterizer.render_scene(scene, 72)
+    red = sum(1 - (row[x + 1] / 255) for row in raster.rows for x in range(0, len(row), 3))
+    assert red == pytest.approx(math.pi * 60 ** 2, rel=0.01)
@@ -0,0 +1,60 @@
+import math
+import re
+
+import pytest
+
+import eps_writer
+import headless_turtle
+
+def _square(cx, cy, size, angle):
+    corners = []
+    for k in range(5):
+        a = math.radians(angle + 90 * k + 45)
+        corners.append((cx + size * math.cos(a), cy + size * math.sin(a)))
+    return headless_turtle.DisplayItem("line", corners, outline=(0, 0, 0))
+
+def _identity(x, y):
+    return x, y
+
+def test_shared_shapes_group_similar_polylines():
+    items = [_square(0, 0, 10, 0), _square(50, 20, 25, 33), _square(-40, 5, 3, 71),
+             headless_turtle.DisplayItem("line", [(0, 0), (5, 0), (0, 9), (0, 0)]),
+             _square(0, 0, 10, 0)]
+    items[4].circle = (0, 0, 10)
+    instances, shapes = eps_writer.shared_shapes(items, _identity)
+    assert sorted(instances) == [0, 1, 2]
+    assert len(shapes) == 1
+    # Each instance is the shape scaled, rotated and moved onto its item
+    local, longest, radius = shapes[0]
+    assert longest == pytest.approx(25 * math.sqrt(2))
+    for index, (number, ((x0, y0), angle, length, _)) in instances.items():
+        cos, sin = math.cos(angle) * length, math.sin(angle) * length
+        placed = [v for x, y in local for v in (x0 + x * cos - y * sin, y0 + x * sin + y * cos)]
+        assert placed == pytest.approx([v for point in items[index].points for v in point])
+
+@pytest.mark.parametrize("dpi, decimals", [(72, 1), (300, 2), (2400, 3)])
+def test_coordinate_decimals(dpi, decimals):
+    assert eps_writer.coordinate_decimals(dpi) == decimals
+    assert 10.0 ** -decimals <= 72.0 / dpi * 0.1
+
+def test_compact_eps_paints_every_item_once(headless):
+    scene = headless.capture_scene("figure6", write=False)
+    compact = eps_writer.render_compact_eps(scene, dpi=300)
+    items = [item for item in scene.items if len(item.points) >= 2]
+    paints = re.findall(r"^np .* (f|s)$", compact, re.MULTILINE)
+    assert paints == ["f" if item.kind == "polygon" else "s" for item in items]
+    assert len(re.findall(r"^/S\d+ \{", compact, re.MULTILINE)) >= 1
+    assert " I " in compact
+    assert len(compact) < 0.5 * len(eps_writer.render_eps(scene))
+
+def test_colors_are_set_only_when_they_change(headless):
+    scene = headless.capture_scene("figure2", write=False)
+    compact = eps_writer.render_compact_eps(scene, dpi=300)
+    colors = re.findall(r"^([\d.]+ [\d.]+ [\d.]+) rgb$", compact, re.MULTILINE)
+    assert all(a != b for a, b in zip(colors, colors[1:]))
+
+def test_eps_dpi_export_writes_compact_eps(headless, tmp_path):
+    headless.configure_exports(eps_dpi=150)
+    headless.run_figure("figure17")
+    text = (tmp_path / "figure17.eps").read_text()
+    assert text.startswith("%!PS-Adobe-3.0 EPSF-3.0") and "/I {" in text
@@ -0,0 +1,45 @@
+import importlib
+import shutil
+from pathlib import Path
+
+import pytest
+
+from conftest import EXAMPLES
+
+converter = importlib.import_module("eps-to-png-converter")
+
+@pytest.fixture
+def eps_dir(tmp_path):
+    directory = tmp_path / "eps"
+    directory.mkdir()
+    for name in ("figure3.eps", "figure1.eps", "figure2.eps"):
+        shutil.copy(EXAMPLES / name, directory)
+    return directory
+
+def test_results_are_sorted_and_complete(eps_dir, tmp_path, fake_gs):
+    out = tmp_path / "png"
+    results = converter.concurrent_convert_directory(eps_dir, out, dpi=72, workers=2)
+    assert [r["input"] for r in results] == sorted(str(p) for p in eps_dir.glob("*.eps"))
+    for result in results:
+        assert result["success"] and result["stderr"] == ""
+        assert result["output"] == str(out / Path(result["input"]).with_suffix(".png").name)
+        assert result["output_bytes"] == Path(result["output"]).stat().st_size
+    assert len(fake_gs()) == 3
+    assert all("-r72" in call for call in fake_gs())
+
+def test_failures_are_reported_per_file(eps_dir, tmp_path, fake_gs):
+    (eps_dir / "figure2.eps").write_text("%!PS\nFAIL\n")
+    results = converter.concurrent_convert_directory(eps_dir, tmp_path / "png", workers=3)
+    assert [r["success"] for r in results] == [True, False, True]
+    assert "/undefined" in results[1]["stderr"]
+    assert results[1]["output_bytes"] is None
+
+def test_only_listed_files_are_converted(eps_dir, tmp_path, fake_gs):
+    results = converter.concurrent_convert_directory(
+        eps_dir, tmp_path / "png", eps_files=[eps_dir / "figure3.eps"])
+    assert [r["input"] for r in results] == [str(eps_dir / "figure3.eps")]
+
+def test_missing_input_skips_gs(tmp_path, fake_gs):
+    result = converter.convert_eps_to_png_result(tmp_path / "missing.eps")
+    assert not result["success"] and "does not exist" in result["stderr"]
+    assert fake_gs() == []
@@ -0,0 +1,56 @@
+import importlib
+import shutil
+
+import pytest
+
+import eps_watch
+from conftest import EXAMPLES
+
+converter = importlib.import_module("eps-to-png-converter")
+
+@pytest.fixture
+def eps_dir(tmp_path):
+    directory = tmp_path / "eps"
+    directory.mkdir()
+    for name in ("figure1.eps", "figure2.eps"):
+        shutil.copy(EXAMPLES / name, directory)
+    return directory
+
+def _cached(results):
+    return [r["cached"] for r in results]
+
+def test_unchanged_files_are_skipped(eps_dir, fake_gs):
+    assert _cached(converter.incremental_convert_directory(eps_dir)) == [False, False]
+    assert _cached(converter.incremental_convert_directory(eps_dir)) == [True, True]
+    assert len(fake_gs()) == 2
+
+@pytest.mark.parametrize("options", [
+    {"dpi": 150},
+    {"max_memory": 8 << 20},
+    {"profile": converter.PROFILES["fast-preview"]},
+    {"compact": True},
+])
+def test_changed_settings_invalidate(eps_dir, fake_gs, options):
+    converter.incremental_convert_directory(eps_dir)
+    results = converter.incremental_convert_directory(eps_dir, **options)
+    assert _cached(results) == [False, False]
+    assert _cached(converter.incremental_convert_directory(eps_dir, **options)) == [True, True]
+
+def test_changed_contents_invalidate(eps_dir, fake_gs):
+    converter.incremental_convert_directory(eps_dir)
+    (eps_dir / "figure2.eps").write_bytes((EXAMPLES / "figure3.eps").read_bytes())
+    assert _cached(converter.incremental_convert_directory(eps_dir)) == [True, False]
+
+def test_profile_and_max_memory_merge():
+    command = converter.build_gs_command("in.eps", "out.png", max_memory=1024,
+                                         profile=converter.PROFILES["print"])
+    assert [a for a in command if a.startswith("-dMaxBitmap")] == ["-dMaxBitmap=1024"]
+    assert [a for a in command if a.startswith("-dBufferSpace")] == ["-dBufferSpace=1024"]
+
+def test_watch_reconverts_on_changed_settings(eps_dir, tmp_path, fake_gs):
+    out = tmp_path / "png"
+    assert eps_watch.watch_directory(eps_dir, out, once=True, settle=0, polling=True) == 2
+    assert eps_watch.watch_directory(eps_dir, out, once=True, settle=0, polling=True) == 0
+    assert eps_watch.watch_directory(eps_dir, out, once=True, settle=0, polling=True,
+                                     profile=converter.PROFILES["print"]) == 2
+    assert all("-dTextAlphaBits=4" in call for call in fake_gs()[-2:])
@@ -0,0 +1,104 @@
+import importlib
+import random
+import shutil
+import tracemalloc
+
+import pytest
+
+import downsample
+from conftest import EXAMPLES, read_png
+
+converter = importlib.import_module("eps-to-png-converter")
+
+def _exact(pixels, width, height, new_width, new_height, channels):
+    """Float area average of one output sample per (x, y, channel)"""
+    sx, sy = width / new_width, height / new_height
+    out = []
+    for y in range(new_height):
+        for x in range(new_width):
+            for c in range(channels):
+                total = 0.0
+                for j in range(height):
+                    wy = max(0.0, min(j + 1, (y + 1) * sy) - max(j, y * sy))
+                    for i in range(width):
+                        wx = max(0.0, min(i + 1, (x + 1) * sx) - max(i, x * sx))
+                        total += wx * wy * pixels[(j * width + i) * channels + c]
+                out.append(total / (sx * sy))
+    return out
+
+@pytest.mark.parametrize("src, dst", [(10, 5), (300, 72), (7, 3), (5, 5)])
+def test_area_weights_sum_to_one(src, dst):
+    weights = downsample.area_weights(src, dst)
+    assert len(weights) == dst
+    assert all(sum(w) == 1 << downsample.PRECISION for _, w in weights)
+    assert weights[-1][0] + len(weights[-1][1]) == src
+
+@pytest.mark.parametrize("channels", [1, 3])
+def test_downsample_matches_area_average(channels):
+    rng = random.Random(7)
+    width, height, new_width, new_height = 13, 11, 5, 4
+    pixels = bytes(rng.randrange(256) for _ in range(width * height * channels))
+    ours = downsample.downsample(pixels, width, height, new_width, new_height, channels)
+    exact = _exact(pixels, width, height, new_width, new_height, channels)
+    assert all(abs(a - b) <= 1 for a, b in zip(ours, exact))
+
+def test_downsample_rows_spans_several_bands(monkeypatch):
+    monkeypatch.setattr(downsample, "BAND_ROWS", 2)
+    rows = [bytes([y * 10] * 6) for y in range(10)]
+    assert list(downsample.downsample_rows(rows, 2, 10, 1, 5)) == [
+        bytes([5 + 20 * y] * 3) for y in range(5)]
+
+def test_enlarging_is_refused():
+    with pytest.raises(ValueError):
+        list(downsample.downsample_rows([b"\0" * 3], 1, 1, 2, 2))
+
+def test_sizes_come_from_one_render(tmp_path, fake_gs):
+    shutil.copy(EXAMPLES / "figure4.eps", tmp_path)
+    result = converter.convert_multi_resolution(tmp_path / "figure4.eps", tmp_path / "out",
+                                                dpis=(75, 300, 150))
+    assert result["success"]
+    assert len(fake_gs()) == 1 and "-r300" in fake_gs()[0]
+    # The stand-in renders 4x4 pixels whatever the DPI
+    for dpi, size in ((300, 4), (150, 2), (75, 1)):
+        path = tmp_path / "out" / f"figure4-{dpi}dpi.png"
+        assert str(path) in result["output"]
+        assert read_png(path) == (size, size, [b"\xff\0\0" * size] * size)
+    assert sorted(p.name for p in (tmp_path / "out").iterdir()) == [
+        "figure4-150dpi.png", "figure4-300dpi.png", "figure4-75dpi.png"]
+
+def test_ppm_rows_stream_and_start_over(tmp_path):
+    path = tmp_path / "page.pgm"
+    path.write_bytes(b"P5\n# made by hand\n3 2\n# two rows\n255\n" + bytes(range(6)))
+    image = downsample.PPMRows(path)
+    assert (image.width, image.height, image.channels, len(image)) == (3, 2, 1, 2)
+    assert list(image) == list(image) == [b"\0\1\2", b"\3\4\5"]
+    assert downsample.read_ppm(path) == (3, 2, 1, bytes(range(6)))
+
+def test_ppm_rows_reject_truncated_pixels(tmp_path):
+    path = tmp_path / "page.ppm"
+    downsample.write_ppm(path, 2, 2, [b"\1" * 6, b"\2" * 6])
+    assert list(downsample.PPMRows(path)) == [b"\1" * 6, b"\2" * 6]
+    path.write_bytes(path.read_bytes()[:-1])
+    with pytest.raises(ValueError, match="truncated"):
+        list(downsample.PPMRows(path))
+
+def test_gs_render_never_held_in_memory(tmp_path, fake_gs, monkeypatch):
+    size = 1200
+    monkeypatch.setenv("FAKE_GS_SIZE", str(size))
+    monkeypatch.setattr(downsample, "BAND_ROWS", 16)
+    shutil.copy(EXAMPLES / "figure4.eps", tmp_path)
+    tracemalloc.start()
+    try:
+        for compact in (False, True):
+            result = converter.convert_multi_resolution(tmp_path / "figure4.eps",
+                                                        tmp_path / "out", (300, 150),
+                                                        compact=compact)
+            assert result["success"], result["stderr"]
+        assert converter.convert_eps_to_compact_png(tmp_path / "figure4.eps")["success"]
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    # Well under the 4.3 MB raster; reading it whole would exceed it
+    assert peak < 3 * size * size // 4
+    assert read_png(tmp_path / "figure4.png")[:2] == (size, size)
+    assert read_png(tmp_path / "out" / "figure4-150dpi.png")[:2] == (size // 2, size // 2)
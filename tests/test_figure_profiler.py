@@ -0,0 +1,52 @@
+import threading
+
+import pytest
+
+import figure_profiler
+import render_api
+
+def test_profile_counts_primitives_and_phases(headless, tmp_path):
+    report = figure_profiler.profile_figure("figure1", convert="raster", dpi=20).report()
+    assert report["primitives"]["circle"]["count"] == 1
+    assert report["primitives"]["begin_fill"]["count"] == 4
+    assert {"setup_screen", "postscript", "rasterize", "encode_png"} <= set(report["phases"])
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["figure1.eps", "figure1.png"]
+
+def test_folded_stacks_name_the_drawing_functions(headless):
+    profiler = figure_profiler.profile_figure("figure1")
+    lines = profiler.folded_stacks()
+    assert any(line.startswith("figure1;run_figure;create_nested_shapes;draw_circle;circle ")
+               for line in lines)
+
+def test_callers_exporters_survive(headless, tmp_path):
+    exported = []
+    headless.turtle.add_exporter(lambda scene, eps_file: exported.append(eps_file))
+    figure_profiler.profile_figure("figure4", convert="raster", dpi=20)
+    headless.run_figure("figure5")
+    assert exported == ["figure4.eps", "figure5.eps"]
+
+def test_raster_needs_the_headless_backend(headless, capsys):
+    with pytest.raises(SystemExit):
+        figure_profiler.main(["figure4", "--backend", "tk", "--convert", "raster"])
+    assert "--convert raster needs --backend headless" in capsys.readouterr().err
+    assert headless.turtle.__name__ == "headless_turtle"
+
+def test_concurrent_drawing_is_not_profiled(headless):
+    expected = figure_profiler.profile_figure("figure11").report()["primitives"]
+    stop = threading.Event()
+
+    def capture():
+        while not stop.is_set():
+            render_api.figure_scene("figure12")
+    threads = [threading.Thread(target=capture) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    try:
+        for _ in range(3):
+            primitives = figure_profiler.profile_figure("figure11").report()["primitives"]
+            assert {k: v["count"] for k, v in primitives.items()} == {
+                k: v["count"] for k, v in expected.items()}
+    finally:
+        stop.set()
+        for thread in threads:
+            thread.join()
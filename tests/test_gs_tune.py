@@ -0,0 +1,68 @@
+import copy
+import importlib
+import json
+
+import downsample
+import gs_tune
+import rasterizer
+
+converter = importlib.import_module("eps-to-png-converter")
+
+def _thumbnail(scene, tmp_path, samples=rasterizer.DEFAULT_SAMPLES):
+    # 216 DPI to 400 pixels shrinks about as much as 300 DPI to COMPARE_SIZE
+    raster = rasterizer.render_scene(scene, 216, samples)
+    path = tmp_path / "render.ppm"
+    downsample.write_ppm(path, raster.width, raster.height, (bytes(row) for row in raster.rows))
+    return gs_tune.thumbnail(downsample.PPMRows(path), 400)
+
+def test_candidates():
+    candidates = list(gs_tune.candidate_profiles())
+    names = [name for name, _ in candidates]
+    assert names[:len(converter.PROFILES)] == list(converter.PROFILES)
+    assert len(set(names)) == len(names)
+    for name, profile in candidates[len(converter.PROFILES):]:
+        # Rendering threads only work on bands
+        assert "rendering_threads" not in profile or "max_memory" in profile
+        assert ("-mt" in name) == ("rendering_threads" in profile)
+        assert converter.profile_arguments(profile)
+
+def test_anti_aliasing_differences_are_accepted(headless, tmp_path):
+    scene = headless.capture_scene("figure5", write=False)
+    reference = _thumbnail(scene, tmp_path)
+    assert gs_tune.similarity(reference, reference) == 1.0
+    assert gs_tune.similarity(reference, _thumbnail(scene, tmp_path, samples=1)) >= 0.99
+
+def test_missing_shape_is_rejected(headless, tmp_path):
+    scene = headless.capture_scene("figure5", write=False)
+    reference = _thumbnail(scene, tmp_path)
+    broken = copy.copy(scene)
+    broken.items = scene.items[:25] + scene.items[26:]
+    image = _thumbnail(broken, tmp_path)
+    # Averaged over the whole page the difference is too small to notice
+    mean = sum(abs(a - b) for a, b in zip(reference[3], image[3])) / len(image[3])
+    assert 1 - mean / 255 > 0.99
+    assert gs_tune.similarity(reference, image) < 0.99
+
+def test_similarity_edge_cases():
+    white = (2, 1, 3, b"\xff" * 6)
+    assert gs_tune.similarity(white, (1, 2, 3, b"\xff" * 6)) == 0.0
+    assert gs_tune.similarity(white, None) == 0.0
+    # One inked pixel, far off in the other image
+    assert gs_tune.similarity((2, 1, 3, b"\0\0\0" + b"\xff" * 3), white) == 0.0
+    assert gs_tune.similarity((2, 1, 3, b"\xf0" * 3 + b"\xff" * 3), white) == 1.0
+
+def test_sample_files_spread(tmp_path):
+    for i in range(10):
+        (tmp_path / f"f{i}.eps").touch()
+    assert [p.name for p in gs_tune.sample_files(tmp_path, 3)] == ["f0.eps", "f3.eps", "f6.eps"]
+    assert len(gs_tune.sample_files(tmp_path, 20)) == 10
+
+def test_main_saves_the_fastest_accepted(tmp_path, fake_gs):
+    (tmp_path / "in").mkdir()
+    (tmp_path / "in" / "a.eps").write_text("%!PS\n")
+    profiles = tmp_path / "profiles.json"
+    assert gs_tune.main([str(tmp_path / "in"), "--sample", "1", "--repeats", "1",
+                         "--profiles", str(profiles), "--name", "mine"]) == 0
+    saved = json.loads(profiles.read_text())["mine"]
+    assert saved["options"] in [profile for _, profile in gs_tune.candidate_profiles()]
+    assert converter.load_profiles(profiles)["mine"] == saved["options"]
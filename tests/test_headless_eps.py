@@ -0,0 +1,60 @@
+import os
+import re
+import subprocess
+import sys
+
+import pytest
+
+from conftest import EXAMPLES, SRC
+
+# Figures drawn without random colors, so the committed Tk EPS still applies
+FIXED = [f"figure{i}" for i in range(1, 23)]
+
+PAINT = re.compile(r"([\d.]+ [\d.]+ [\d.]+) setrgbcolor(?: AdjustColor)?\s+(eofill|stroke)")
+BOUNDING_BOX = re.compile(r"%%BoundingBox: (\d+) (\d+) (\d+) (\d+)")
+
+def paints(eps_text):
+    """(color, operator) of every fill and stroke, in drawing order"""
+    return PAINT.findall(eps_text)
+
+def page_size(eps_text):
+    llx, lly, urx, ury = map(int, BOUNDING_BOX.search(eps_text).groups())
+    return urx - llx, ury - lly
+
+def tk_display():
+    try:
+        import tkinter
+        tkinter.Tk().destroy()
+    except Exception:
+        return False
+    return True
+
+@pytest.mark.parametrize("name", FIXED)
+def test_headless_eps_paints_like_tk_examples(headless, tmp_path, name):
+    headless.run_figure(name)
+    ours = (tmp_path / f"{name}.eps").read_text()
+    tk = (EXAMPLES / f"{name}.eps").read_text()
+    assert page_size(ours) == page_size(tk)
+    assert paints(ours) == paints(tk)
+
+def test_random_figures_paint_the_same_operations(headless, tmp_path):
+    for name in ["figure23", "figure24"]:
+        headless.run_figure(name, seed=1)
+        ours = paints((tmp_path / f"{name}.eps").read_text())
+        tk = paints((EXAMPLES / f"{name}.eps").read_text())
+        assert [op for _, op in ours] == [op for _, op in tk]
+
+@pytest.mark.skipif(not tk_display(), reason="needs tkinter and a display")
+@pytest.mark.parametrize("name", ["figure1", "figure11", "figure23"])
+def test_headless_eps_paints_like_live_tk(headless, tmp_path, name):
+    tk_dir = tmp_path / "tk"
+    tk_dir.mkdir()
+    env = dict(os.environ, TURTLE_BACKEND="tk", PYTHONPATH=str(SRC))
+    subprocess.run([sys.executable, "-c",
+                    f"import make_figures; make_figures.run_figure({name!r}, seed=3)"],
+                   cwd=tk_dir, env=env, check=True)
+    headless.run_figure(name, seed=3)
+    ours = (tmp_path / f"{name}.eps").read_text()
+    tk = (tk_dir / f"{name}.eps").read_text()
+    assert page_size(ours) == page_size(tk)
+    assert paints(ours) == paints(tk)
@@ -0,0 +1,39 @@
+import pytest
+
+import occlusion
+import rasterizer
+
+# occlusion.py keeps pixels identical from 72 DPI up
+@pytest.mark.parametrize("name", ["figure1", "figure5", "figure11", "figure21", "figure23"])
+def test_culling_keeps_pixels(headless, name):
+    scene = headless.capture_scene(name, seed=2, write=False)
+    culled = occlusion.cull_scene(scene)
+    assert occlusion.fill_area(culled) <= occlusion.fill_area(scene)
+    assert rasterizer.render_scene(culled, 72).rows == rasterizer.render_scene(scene, 72).rows
+
+def test_cull_export_matches_unculled_png(headless, tmp_path):
+    headless.configure_exports(png_dpi=72)
+    headless.run_figure("figure23", seed=2)
+    plain = (tmp_path / "figure23.png").read_bytes()
+    headless.configure_exports(png_dpi=72, cull=True)
+    headless.run_figure("figure23", seed=2)
+    assert (tmp_path / "figure23.png").read_bytes() == plain
+
+def test_hidden_circles_are_dropped_and_nested_fills_get_holes(headless):
+    scene = headless.capture_scene("figure5", write=False)
+    culled = occlusion.cull_scene(scene)
+    fills = [item for item in culled.items if item.kind == "polygon"]
+    # Concentric circles: every fill but the innermost becomes an annulus
+    assert all(len(item.holes) == 1 and item.holes[0].circle is not None for item in fills[:-1])
+    assert fills[-1].holes == []
+    assert occlusion.fill_area(culled) < 0.5 * occlusion.fill_area(scene)
+
+def test_zero_margin_never_keeps_more(headless):
+    scene = headless.capture_scene("figure23", seed=2, write=False)
+    assert len(occlusion.cull_scene(scene, margin=0).items) <= len(
+        occlusion.cull_scene(scene).items)
+
+def test_input_scene_is_not_modified(headless):
+    scene = headless.capture_scene("figure5", write=False)
+    occlusion.cull_scene(scene)
+    assert all(item.holes == [] for item in scene.items)
@@ -0,0 +1,30 @@
+import make_figures
+
+NAMES = ["figure1", "figure5", "figure11", "figure23"]
+
+def test_parallel_writes_what_serial_writes(headless, tmp_path, monkeypatch):
+    serial = tmp_path / "serial"
+    serial.mkdir()
+    monkeypatch.chdir(serial)
+    assert all(r["error"] is None for r in headless.generate_figures_serial(NAMES, seed=5))
+
+    parallel = tmp_path / "parallel"
+    parallel.mkdir()
+    monkeypatch.chdir(parallel)
+    results = headless.generate_figures_parallel(NAMES, jobs=2, backend="headless", seed=5)
+    assert [r["figure"] for r in results] == NAMES
+    assert all(r["error"] is None and r["seconds"] >= 0 for r in results)
+    for name in NAMES:
+        assert (parallel / f"{name}.eps").read_bytes() == (serial / f"{name}.eps").read_bytes()
+
+def test_parallel_reports_failures_per_figure(headless, tmp_path):
+    results = headless.generate_figures_parallel(["figure4", "figure99"], jobs=2,
+                                                 backend="headless")
+    assert results[0]["error"] is None
+    assert results[1]["seconds"] is None and "figure99" in results[1]["error"]
+    assert (tmp_path / "figure4.eps").exists()
+
+def test_main_with_jobs(headless, tmp_path):
+    assert make_figures.main(["--backend", "headless", "--jobs", "2"]) == 0
+    assert sorted(p.name for p in tmp_path.glob("*.eps")) == sorted(
+        f"{name}.eps" for name in make_figures.FIGURES)
@@ -0,0 +1,47 @@
+import threading
+
+import pytest
+
+import pipeline
+from conftest import read_png
+
+def _results(render, convert):
+    return [{"render_seconds": render, "conversion": {"seconds": convert}}]
+
+def test_bottleneck_follows_the_waits():
+    # Rendering took longer in total but spent its time blocked on gs
+    assert pipeline.bottleneck_report(_results(4.0, 2.0), 5.0, 1, 3.0, 0.5)["bottleneck"] \
+        == "convert"
+    assert pipeline.bottleneck_report(_results(1.0, 6.0), 5.0, 4, 0.1, 2.0)["bottleneck"] \
+        == "render"
+
+def test_eps_and_png_go_to_output_dir(headless, tmp_path, fake_gs):
+    results, _ = pipeline.run_pipeline(["figure4", "figure8"], "out", dpi=72, workers=2)
+    assert [r["error"] for r in results] == [None, None]
+    assert sorted(p.name for p in (tmp_path / "out").iterdir()) == [
+        "figure4.eps", "figure4.png", "figure8.eps", "figure8.png"]
+    assert not list(tmp_path.glob("*.eps"))
+    assert all(str(tmp_path / "out") in call for call in fake_gs())
+
+def test_converter_options_are_passed_on(headless, tmp_path, fake_gs):
+    assert pipeline.main(["figure4", "--output-dir", "out", "--workers", "1", "--palette",
+                          "--profile", "fast-preview", "--max-memory", "2"]) == 0
+    (call,) = fake_gs()
+    assert "-sDEVICE=ppmraw" in call and "-dTextAlphaBits=1" in call
+    assert f"-dMaxBitmap={2 << 20}" in call
+    assert read_png(tmp_path / "out" / "figure4.png") == (4, 4, [b"\xff\0\0" * 4] * 4)
+
+def test_unknown_profile_is_rejected(headless, tmp_path):
+    with pytest.raises(SystemExit):
+        pipeline.main(["figure4", "--profile", "no-such-profile"])
+
+def test_screen_closed_on_rendering_thread(headless, tmp_path, fake_gs, monkeypatch):
+    threads = []
+    monkeypatch.setattr(headless.turtle, "bye", lambda: threads.append(threading.current_thread()))
+    pipeline.run_pipeline(["figure4"], "out", dpi=72, workers=1)
+    assert len(threads) == 1 and threads[0] is not threading.main_thread()
+
+def test_session_writes_into_output_dir(headless, tmp_path, fake_gs):
+    results, _ = pipeline.run_pipeline(["figure4"], "out", dpi=72, workers=1, session=True)
+    assert results[0]["error"] is None
+    assert (tmp_path / "out" / "figure4.eps").exists() and not list(tmp_path.glob("*.eps"))
@@ -0,0 +1,90 @@
+import importlib
+import io
+import random
+import struct
+
+import pytest
+
+import png_encoder
+from conftest import read_png
+
+converter = importlib.import_module("eps-to-png-converter")
+
+RED, WHITE, BLUE = b"\xff\0\0", b"\xff\xff\xff", b"\0\0\xff"
+
+def _encode(rows, width):
+    buffer = io.BytesIO()
+    color_type = png_encoder.write_compact_png(buffer, width, len(rows), rows)
+    data = buffer.getvalue()
+    depth = struct.unpack(">B", data[24:25])[0]
+    return color_type, depth, data
+
+def _decoded(data, tmp_path):
+    (tmp_path / "out.png").write_bytes(data)
+    return read_png(tmp_path / "out.png")
+
+def test_find_palette():
+    rows = [RED * 3 + WHITE, BLUE + RED * 3]
+    assert png_encoder.find_palette(rows) == sorted([RED, WHITE, BLUE])
+    assert png_encoder.find_palette(rows, limit=2) is None
+
+@pytest.mark.parametrize("bits", [1, 2, 4, 8])
+def test_pack_row(bits):
+    rng = random.Random(bits)
+    indices = [rng.randrange(1 << bits) for _ in range(13)]
+    bitstring = "".join(format(i, f"0{bits}b") for i in indices)
+    bitstring += "0" * (-len(bitstring) % 8)
+    expected = bytes(int(bitstring[k:k + 8], 2) for k in range(0, len(bitstring), 8))
+    assert png_encoder.pack_row(indices, bits) == expected
+
+def test_indexed_rows_round_trip():
+    palette = [RED, WHITE, BLUE]
+    assert list(png_encoder.indexed_rows([RED + BLUE * 2, WHITE], palette)) == [
+        b"\0\2\2", b"\1"]
+    with pytest.raises(ValueError, match="outside the palette"):
+        list(png_encoder.indexed_rows([RED + b"\1\2\3"], palette))
+
+@pytest.mark.parametrize("colors, bits", [(2, 1), (3, 2), (16, 4), (200, 8)])
+def test_palette_depth_fits_the_colors(tmp_path, colors, bits):
+    palette = [bytes([i, 255 - i, 7]) for i in range(colors)]
+    rows = [b"".join(palette[(x + y) % colors] for x in range(21)) for y in range(5)]
+    color_type, depth, data = _encode(rows, 21)
+    assert (color_type, depth) == (png_encoder.PALETTE, bits)
+    assert _decoded(data, tmp_path) == (21, 5, rows)
+
+def test_grays_and_many_colors(tmp_path):
+    grays = [bytes([v, v, v]) * 4 for v in (0, 90, 255)]
+    color_type, depth, data = _encode(grays, 4)
+    assert (color_type, depth) == (png_encoder.GRAY, 8)
+    assert _decoded(data, tmp_path) == (4, 3, grays)
+
+    rng = random.Random(3)
+    noise = [bytes(rng.randrange(256) for _ in range(3 * 40)) for _ in range(10)]
+    color_type, _, data = _encode(noise, 40)
+    assert color_type == png_encoder.RGB
+    assert _decoded(data, tmp_path) == (40, 10, noise)
+
+def test_rows_must_be_readable_twice():
+    with pytest.raises(TypeError):
+        png_encoder.write_compact_png(io.BytesIO(), 1, 1, iter([RED]))
+
+def test_eps_colors(tmp_path):
+    eps = tmp_path / "a.eps"
+    eps.write_bytes(b"1 0 0 setrgbcolor\n0.5 setgray\n0 0 1 rgb\n10.5 20 moveto\n")
+    assert converter.eps_colors(eps) == {(255, 255, 255), (255, 0, 0), (128, 128, 128),
+                                         (0, 0, 255)}
+
+def test_compact_conversion_picks_palette(tmp_path, fake_gs):
+    eps = tmp_path / "few.eps"
+    eps.write_bytes(b"1 0 0 setrgbcolor\n")
+    result = converter.convert_eps_to_compact_png(eps, dpi=72)
+    assert (result["success"], result["color_type"]) == (True, "palette")
+    assert "-sDEVICE=ppmraw" in fake_gs()[0]
+    assert read_png(tmp_path / "few.png") == (4, 4, [RED * 4] * 4)
+
+def test_many_colors_go_straight_to_png16m(tmp_path, fake_gs):
+    eps = tmp_path / "many.eps"
+    eps.write_bytes(b"".join(b"%.4f 0 0 setrgbcolor\n" % (i / 299) for i in range(300)))
+    result = converter.convert_eps_to_compact_png(eps, dpi=72)
+    assert (result["success"], result["color_type"]) == (True, "rgb")
+    assert "-sDEVICE=png16m" in fake_gs()[0]
@@ -0,0 +1,47 @@
+import pytest
+
+import downsample
+import rasterizer
+from conftest import EXAMPLES, read_png
+
+# The examples are Ghostscript renders of Tk's EPS at 300 DPI. Tk places the
+# figures a few points differently, so compare small thumbnails and only
+# require each figure to be much closer to its own example than a blank page
+# and closer than to any other example
+SAMPLE = ["figure1", "figure5", "figure12", "figure16", "figure21"]
+THUMBNAIL = 42
+
+def thumbnail(rows, width, height):
+    return b"".join(downsample.downsample_rows(
+        (bytes(row) for row in rows), width, height, THUMBNAIL, THUMBNAIL))
+
+def difference(a, b):
+    return sum(abs(x - y) for x, y in zip(a, b)) / (255 * len(a))
+
+@pytest.fixture(scope="module")
+def examples():
+    return {name: thumbnail(*reversed(read_png(EXAMPLES / f"{name}.png")))
+            for name in SAMPLE}
+
+@pytest.mark.parametrize("name", SAMPLE)
+def test_raster_matches_example_png(headless, examples, name):
+    raster = rasterizer.render_scene(headless.capture_scene(name, write=False), 30)
+    ours = thumbnail(raster.rows, raster.width, raster.height)
+    own = difference(ours, examples[name])
+    blank = difference(b"\xff" * len(ours), examples[name])
+    assert own < 0.6 * blank
+    assert all(own < difference(ours, examples[other]) for other in SAMPLE if other != name)
+
+def test_exporter_skips_postscript_without_a_file(headless, tmp_path):
+    headless.configure_exports(png_dpi=18)
+    screen = headless.turtle.Screen()
+    headless.turtle.Turtle().forward(50)
+    assert screen.getcanvas().postscript().startswith("%!PS")
+    assert list(tmp_path.iterdir()) == []
+
+def test_banded_png_matches_whole_raster(headless, tmp_path):
+    scene = headless.capture_scene("figure5", write=False)
+    rasterizer.render_scene(scene, 40).write_png(str(tmp_path / "whole.png"))
+    with open(tmp_path / "banded.png", "wb") as f:
+        rasterizer.write_png_banded(scene, f, 40, max_bytes=3 * 223 * 7)
+    assert read_png(tmp_path / "whole.png") == read_png(tmp_path / "banded.png")
@@ -0,0 +1,60 @@
+import os
+import subprocess
+import sys
+import threading
+
+import render_api
+from conftest import SRC
+
+NAMES = ["figure1", "figure4", "figure8"]
+
+def describe(scene):
+    return (scene.width, scene.height, scene.background, len(scene.items))
+
+def test_capture_ignores_export_settings(headless, tmp_path):
+    expected = describe(render_api.figure_scene("figure4"))
+    headless.configure_exports(png_dpi=18, svg=True, cull=True)
+    assert describe(render_api.figure_scene("figure4")) == expected
+    assert list(tmp_path.iterdir()) == []
+
+def test_captures_race_with_run_figure(headless, tmp_path):
+    expected = {name: describe(render_api.figure_scene(name)) for name in NAMES}
+    headless.configure_exports(svg=True)
+    results, errors = [], []
+
+    def capture():
+        try:
+            for name in NAMES * 3:
+                results.append((name, describe(render_api.figure_scene(name))))
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=capture) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for name in NAMES * 3:
+        headless.run_figure(name)
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert all(scene == expected[name] for name, scene in results)
+    assert len(results) == 4 * 3 * len(NAMES)
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted(
+        [f"{name}.eps" for name in NAMES] + [f"{name}.svg" for name in NAMES])
+
+def test_import_leaves_the_backend_alone():
+    env = {k: v for k, v in os.environ.items() if k != "TURTLE_BACKEND"}
+    env["PYTHONPATH"] = str(SRC)
+    output = subprocess.run(
+        [sys.executable, "-c", "import os, render_api, make_figures; "
+         "print(make_figures.turtle.__name__, os.environ.get('TURTLE_BACKEND'))"],
+        env=env, capture_output=True, text=True, check=True).stdout
+    assert output.split() == ["turtle", "None"]
+
+def test_render_draws_headless_whatever_the_backend(headless, tmp_path):
+    expected = render_api.render("figure4", "eps")
+    headless.set_backend("tk")
+    assert render_api.render("figure4", "eps") == expected
+    assert render_api.render("figure4", "png", dpi=18, engine="raster")[:4] == b"\x89PNG"
+    assert headless.turtle.__name__ == "turtle"
+    assert list(tmp_path.iterdir()) == []
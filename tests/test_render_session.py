@@ -0,0 +1,38 @@
+import threading
+
+import make_figures
+import render_session
+
+def _lock_free_elsewhere():
+    result = []
+    thread = threading.Thread(target=lambda: result.append(_try_lock()))
+    thread.start()
+    thread.join()
+    return result[0]
+
+def _try_lock():
+    if make_figures._lock.acquire(timeout=0.05):
+        make_figures._lock.release()
+        return True
+    return False
+
+def test_session_holds_lock_while_open(headless, tmp_path):
+    setup_screen = make_figures.setup_screen
+    session = render_session.RenderSession().open()
+    try:
+        assert not _lock_free_elsewhere()
+        session.run("figure4")
+    finally:
+        session.close()
+    assert _lock_free_elsewhere()
+    assert make_figures.setup_screen is setup_screen
+    assert (tmp_path / "figure4.eps").exists()
+
+def test_compare_restores_and_releases(headless, tmp_path):
+    setup_screen, setup_turtle = make_figures.setup_screen, make_figures.setup_turtle
+    results = render_session.compare(["figure4", "figure8"], repeats=1)
+    assert [r["identical"] for r in results] == [True, True]
+    assert all(r["tk_floor"] == r["moves"] * render_session.TK_DELAY_MS / 1000 for r in results)
+    assert (make_figures.setup_screen, make_figures.setup_turtle) == (setup_screen, setup_turtle)
+    assert _lock_free_elsewhere()
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,45 @@
+import importlib
+import shutil
+
+import pytest
+
+from conftest import EXAMPLES, read_png
+
+converter = importlib.import_module("eps-to-png-converter")
+
+NAMES = ["figure1.eps", "figure2.eps", "figure3.eps", "figure4.eps"]
+
+@pytest.fixture
+def eps_dir(tmp_path):
+    directory = tmp_path / "eps"
+    directory.mkdir()
+    for name in NAMES:
+        shutil.copy(EXAMPLES / name, directory)
+    return directory
+
+def test_one_gs_process_per_session(eps_dir, tmp_path, fake_gs):
+    out = tmp_path / "png"
+    results = converter.session_convert_directory(eps_dir, out, sessions=2)
+    assert [r["input"] for r in results] == [str(eps_dir / name) for name in NAMES]
+    assert all(r["success"] for r in results)
+    assert sorted(p.name for p in out.iterdir()) == [n.replace(".eps", ".png") for n in NAMES]
+    calls = fake_gs()
+    assert len(calls) == 2
+    assert all(sum(arg.endswith(".eps") for arg in call.split()) == 2 for call in calls)
+
+def test_session_resumes_after_a_failing_file(eps_dir, tmp_path, fake_gs):
+    (eps_dir / "figure2.eps").write_text("%!PS\nFAIL\n")
+    results = converter.session_convert_directory(eps_dir, tmp_path / "png", sessions=1)
+    assert [r["success"] for r in results] == [True, False, True, True]
+    assert "/undefined" in results[1]["stderr"]
+    # The pages before the failure are kept; a second session takes the rest
+    assert len(fake_gs()) == 2
+    assert "figure1.eps" not in fake_gs()[1]
+
+def test_compact_session_encodes_raw_pages(eps_dir, tmp_path, fake_gs):
+    out = tmp_path / "png"
+    results = converter.session_convert_directory(eps_dir, out, sessions=1, compact=True)
+    assert all(r["success"] and r["color_type"] == "palette" for r in results)
+    assert "-sDEVICE=ppmraw" in fake_gs()[0]
+    assert read_png(out / "figure1.png") == (4, 4, [b"\xff\0\0" * 4] * 4)
+    assert not any(p.suffix == ".ppm" for p in out.rglob("*"))
@@ -0,0 +1,65 @@
+import xml.etree.ElementTree as ET
+
+import pytest
+
+import render_api
+import svg_writer
+
+NS = "{http://www.w3.org/2000/svg}"
+
+def paint(item):
+    if item.kind == "polygon":
+        return {"fill": svg_writer._hex(item.fill)}
+    return {"fill": "none", "stroke": svg_writer._hex(item.outline)}
+
+@pytest.mark.parametrize("name", ["figure1", "figure5", "figure13", "figure21", "figure23"])
+def test_svg_export_draws_every_item(headless, tmp_path, name):
+    headless.configure_exports(svg=True)
+    headless.run_figure(name, seed=4)
+    root = ET.parse(tmp_path / f"{name}.svg").getroot()
+    scene = headless.capture_scene(name, seed=4, write=False)
+    assert (root.get("width"), root.get("height")) == (str(scene.width), str(scene.height))
+    assert root.get("viewBox") == f"0 0 {scene.width} {scene.height}"
+
+    shapes = {shape.get("id") for shape in root.iter() if shape.get("id")}
+    elements = list(root.find(f"{NS}g"))
+    items = [item for item in scene.items if len(item.points) >= 2]
+    assert len(elements) == len(items)
+    to_svg = svg_writer.svg_transform(scene)
+    for element, item in zip(elements, items):
+        assert {key: element.get(key) for key in paint(item)} == paint(item)
+        if element.tag == f"{NS}use":
+            assert element.get("href")[1:] in shapes
+        elif element.tag == f"{NS}circle":
+            cx, cy, radius = item.circle
+            x, y = to_svg(cx, cy)
+            assert float(element.get("cx")) == pytest.approx(x, abs=0.01)
+            assert float(element.get("cy")) == pytest.approx(y, abs=0.01)
+
+def test_svg_export_matches_render_api(headless, tmp_path):
+    headless.configure_exports(svg=True)
+    headless.run_figure("figure11", seed=0)
+    assert (tmp_path / "figure11.svg").read_bytes() == render_api.render("figure11", "svg")
+
+def test_svg_store_copies_identical_figures(headless, tmp_path):
+    headless.configure_exports(svg=True, artifact_dir="store")
+    headless.run_figure("figure8")
+    headless.run_figure("figure10")
+    assert len(list((tmp_path / "store").glob("*.svg"))) == 1
+    first, second = tmp_path / "figure8.svg", tmp_path / "figure10.svg"
+    assert first.read_bytes() == second.read_bytes()
+    assert first.stat().st_ino != second.stat().st_ino
+
+def test_svg_skips_postscript_without_a_file(headless, tmp_path):
+    headless.configure_exports(svg=True)
+    headless.turtle.Screen()
+    headless.turtle.Turtle().forward(50)
+    headless.turtle.Screen().getcanvas().postscript()
+    assert list(tmp_path.iterdir()) == []
+
+def test_repeated_shapes_are_defined_once(headless):
+    scene = headless.capture_scene("figure6", write=False)
+    root = ET.fromstring(svg_writer.render_svg(scene))
+    uses = root.findall(f"{NS}g/{NS}use")
+    defined = root.findall(f"{NS}defs/*")
+    assert len(defined) >= 1 and len(uses) > 2 * len(defined)
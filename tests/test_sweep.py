@@ -0,0 +1,42 @@
+import json
+
+import pytest
+
+import sweep
+
+def test_failing_points_are_recorded_not_raised(headless, tmp_path):
+    results = list(sweep.run_sweep("fifth_shape_pattern", {"shapes": [2], "every": [0, 2, 3]},
+                                   "out"))
+    assert [r["index"] for r in results] == [0, 1, 2]
+    assert "ZeroDivisionError" in results[0]["error"]
+    assert results[0]["outputs"] == []
+    assert [r["error"] for r in results[1:]] == [None, None]
+    assert all((tmp_path / out).exists() for r in results[1:] for out in r["outputs"])
+
+def test_pool_keeps_going_after_a_failure(tmp_path):
+    results = list(sweep.run_sweep("rotating_squares",
+                                   {"color_function": ["no_such_function", "angle_based_color"]},
+                                   tmp_path / "out", jobs=2))
+    assert "no_such_function" in results[0]["error"]
+    assert results[1]["error"] is None
+
+def test_main_writes_error_entries(headless, tmp_path):
+    assert sweep.main(["fifth_shape_pattern", "--param", "every=0,5", "--param", "shapes=2",
+                       "--output-dir", "out", "--jobs", "1"]) == 1
+    lines = [json.loads(line) for line in (tmp_path / "out" / "sweep.jsonl").open()]
+    assert [line["error"] is None for line in lines] == [False, True]
+
+@pytest.mark.parametrize("text", ["1:5:0", "a:b:1"])
+def test_bad_ranges_are_rejected(text):
+    with pytest.raises(ValueError):
+        sweep.parse_values(text)
+
+def test_in_process_run_leaves_caller_settings(headless, tmp_path):
+    import headless_turtle
+    import make_figures
+    backend = make_figures.turtle
+    results = list(sweep.run_sweep("fifth_shape_pattern", {"shapes": [2]}, "out",
+                                   exports={"svg": True}))
+    assert [o.endswith(".svg") for o in results[0]["outputs"]] == [False, True]
+    assert make_figures.turtle is backend
+    assert headless_turtle._exporters == []
@@ -0,0 +1,47 @@
+import json
+
+import make_figures
+import variants
+
+def _manifest(path):
+    return [json.loads(line) for line in path.open()]
+
+def test_rerun_replaces_manifest_entries(headless, tmp_path):
+    args = ["figure23", "--seed", "7", "--count", "3", "--output-dir", "cat", "--jobs", "1"]
+    assert variants.main(args) == 0
+    first = _manifest(tmp_path / "cat" / "variants.jsonl")
+    assert variants.main(args) == 0
+    assert variants.main(args[:4] + ["2", "--first", "2"] + args[5:]) == 0
+    entries = _manifest(tmp_path / "cat" / "variants.jsonl")
+    assert sorted(e["index"] for e in entries) == [0, 1, 2, 3]
+    assert [e["seed"] for e in entries if e["index"] < 3] == [e["seed"] for e in first]
+
+def test_variants_are_reproducible(headless, tmp_path):
+    results = list(variants.generate_variants("figure24", 3, 2, "a"))
+    again = list(variants.generate_variants("figure24", 3, 2, "b"))
+    for result, other in zip(results, again):
+        assert ((tmp_path / result["outputs"][0]).read_bytes()
+                == (tmp_path / other["outputs"][0]).read_bytes())
+
+def test_failing_variant_is_recorded(headless, tmp_path, monkeypatch):
+    original = make_figures.FIGURES["figure23"]
+
+    def flaky(rng, filename):
+        if filename.endswith("000001.eps"):
+            raise RuntimeError("boom")
+        original(rng=rng, filename=filename)
+    monkeypatch.setitem(make_figures.FIGURES, "figure23", flaky)
+    assert variants.main(["figure23", "--seed", "1", "--count", "3", "--output-dir", "cat",
+                          "--jobs", "1"]) == 1
+    entries = _manifest(tmp_path / "cat" / "variants.jsonl")
+    assert [e["error"] is None for e in entries] == [True, False, True]
+    assert entries[1]["outputs"] == []
+
+def test_in_process_run_leaves_caller_settings(headless, tmp_path):
+    import headless_turtle
+    backend = make_figures.turtle
+    results = list(variants.generate_variants("figure23", 1, 2, "cat", exports={"svg": True}))
+    assert all(any(o.endswith(".svg") for o in r["outputs"]) for r in results)
+    assert all((tmp_path / o).exists() for r in results for o in r["outputs"])
+    assert make_figures.turtle is backend
+    assert headless_turtle._exporters == []